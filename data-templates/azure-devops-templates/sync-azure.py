@@ -9,82 +9,1217 @@ Descrição: Sincroniza work items e sprints do Azure DevOps
 import os
 import sys
 import json
+import time
+import random
+import sqlite3
+import hashlib
+import argparse
+import threading
 import requests
-from datetime import datetime
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from contextlib import nullcontext
+from datetime import datetime, timedelta, timezone
+from email.utils import parsedate_to_datetime
+from requests.adapters import HTTPAdapter
+
+try:
+    from opentelemetry import context as otel_context, propagate, trace
+except ImportError:  # rastreamento opcional: pip install opentelemetry-api opentelemetry-sdk
+    otel_context = propagate = trace = None
 
 # Configurações
 AZURE_ORG_URL = os.getenv('AZURE_ORG_URL', 'https://dev.azure.com/organization')
 AZURE_PAT = os.getenv('AZURE_PAT', '')
 AZURE_PROJECT = os.getenv('AZURE_PROJECT', 'MyProject')
 API_BASE_URL = os.getenv('API_BASE_URL', 'http://localhost:3000/api')
+# Projeto em estruturas_projeto (vazio = localizar pelo nome AZURE_PROJECT)
+AZURE_PROJETO_ID = os.getenv('AZURE_PROJETO_ID', '')
+
+# Limite de ids por chamada da API workitemsbatch do Azure DevOps
+AZURE_BATCH_MAX = 200
+AZURE_BATCH_SIZE = int(os.getenv('AZURE_BATCH_SIZE', str(AZURE_BATCH_MAX)))
+# Campos buscados nos detalhes (vazio = todos os campos)
+AZURE_FIELDS = [campo.strip() for campo in os.getenv('AZURE_FIELDS', '').split(',') if campo.strip()]
+
+# Consulta WIQL em janelas de ids: o Azure DevOps recusa consultas com mais de 20.000 resultados
+WIQL_MAX = 20000
+WIQL_WINDOW = int(os.getenv('AZURE_WIQL_WINDOW', '10000'))
+
+# Envio em lote para a API local (POST /azure-work-items/bulk, uma transação por lote)
+BULK_MAX = 1000
+BULK_SIZE = int(os.getenv('AZURE_BULK_SIZE', '200'))
+BULK_FLUSH_INTERVAL = float(os.getenv('AZURE_BULK_FLUSH_INTERVAL', '2'))
+
+# Métricas da execução no formato do textfile collector do node-exporter
+SYNC_METRICS_FILE = os.getenv('AZURE_SYNC_METRICS_FILE', '')
+SYNC_OTEL = os.getenv('AZURE_SYNC_OTEL', '').lower() in ('1', 'true', 'yes')
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+# Operações medidas: consulta WIQL, busca de detalhes e envio à API local
+OPERACOES = ('wiql', 'detalhes', 'envio')
+
+# Agendador de vários projetos (--config)
+SYNC_CONFIG = os.getenv('AZURE_SYNC_CONFIG', '')
+PARALLEL_PROJECTS = 4
+PROJECT_INTERVAL = 900
+
+# Concorrência e controle de taxa
+SYNC_CONCURRENCY = int(os.getenv('AZURE_SYNC_CONCURRENCY', '8'))
+MAX_RPS = float(os.getenv('AZURE_MAX_RPS', '0'))
+MAX_RETRIES = int(os.getenv('AZURE_MAX_RETRIES', '5'))
+REQUEST_TIMEOUT = float(os.getenv('AZURE_REQUEST_TIMEOUT', '30'))
+# Respostas que indicam sobrecarga/limite de taxa e são repetidas com backoff;
+# 429 e 503 pausam todas as threads (o limite do Azure é por usuário, não por conexão)
+RETRY_STATUS = (429, 502, 503, 504)
+THROTTLE_STATUS = (429, 503)
+RETRY_BASE_WAIT = 1.0
+RETRY_MAX_WAIT = 60.0
+
+# Sincronização incremental: marca d'água de System.ChangedDate por projeto
+SYNC_STATE_FILE = os.getenv(
+    'AZURE_SYNC_STATE_FILE',
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), '.sync-azure-state.json'))
+SYNC_INCREMENTAL = os.getenv('AZURE_SYNC_INCREMENTAL', '').lower() in ('1', 'true', 'yes')
+# Horas entre reconciliações completas no modo incremental (0 = nunca)
+FULL_SYNC_HOURS = float(os.getenv('AZURE_FULL_SYNC_HOURS', '24'))
+# Margem subtraída da marca d'água para absorver diferença de relógio com o Azure
+WATERMARK_OVERLAP = int(os.getenv('AZURE_WATERMARK_OVERLAP', '300'))
+WATERMARK_FORMAT = '%Y-%m-%dT%H:%M:%SZ'
+
+# Revisão e hash de conteúdo de cada work item já enviado (SQLite)
+SYNC_STATE_DB = os.getenv(
+    'AZURE_SYNC_STATE_DB',
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), '.sync-azure-state.db'))
+# Tentativas por work item antes de ir para a lista de descarte (dead-letter)
+MAX_ITEM_ATTEMPTS = int(os.getenv('AZURE_MAX_ITEM_ATTEMPTS', '3'))
+# Campos gravados pela API local (server/api.js); os demais não são enviados
+SYNC_FIELDS = [
+    'System.WorkItemType', 'System.Title', 'System.State', 'System.AssignedTo',
+    'Microsoft.VSTS.Common.Activity', 'System.AreaPath', 'System.IterationPath',
+    'System.CreatedDate', 'System.ChangedDate', 'System.ClosedDate',
+    'Microsoft.VSTS.Common.Priority', 'Microsoft.VSTS.Scheduling.Effort',
+    'Microsoft.VSTS.Scheduling.RemainingWork', 'Microsoft.VSTS.Scheduling.CompletedWork',
+    'Microsoft.VSTS.Scheduling.StoryPoints',
+]
+# Mudam a cada revisão: ficam fora do hash e só são enviados junto com outra alteração
+VOLATILE_FIELDS = ('System.ChangedDate',)
+
+class RateLimiter:
+    """Ritmo das requisições, compartilhado entre as threads
+
+    Espaça as requisições para no máximo max_rps por segundo (0 = sem
+    limite) e, quando o servidor responde 429/503, pausa todas as threads
+    pelo Retry-After em vez de só a que recebeu a resposta. Com parent, cada
+    requisição também respeita o limite de parent (orçamento global do
+    agendador), mas pausas por 429/503 ficam só neste limitador.
+    """
+
+    def __init__(self, max_rps=0, parent=None):
+        self.intervalo = 1.0 / max_rps if max_rps else 0.0
+        self.proxima = 0.0
+        self.pausa_ate = 0.0
+        self.lock = threading.Lock()
+        self.parent = parent
+
+    def wait(self):
+        if self.parent:
+            self.parent.wait()
+        with self.lock:
+            agora = time.monotonic()
+            inicio = max(agora, self.proxima, self.pausa_ate)
+            self.proxima = inicio + self.intervalo
+        if inicio > agora:
+            time.sleep(inicio - agora)
+
+    def pause(self, segundos):
+        with self.lock:
+            self.pausa_ate = max(self.pausa_ate, time.monotonic() + segundos)
+
+def retry_wait(response, tentativa):
+    """Segundos até a próxima tentativa: Retry-After, ou backoff exponencial com jitter"""
+    valor = response.headers.get('Retry-After') if response is not None else None
+    if valor:
+        try:
+            return max(0.0, float(valor))
+        except ValueError:
+            try:
+                return max(0.0, (parsedate_to_datetime(valor) - datetime.now(timezone.utc)).total_seconds())
+            except (TypeError, ValueError):
+                pass
+    return min(RETRY_MAX_WAIT, RETRY_BASE_WAIT * 2 ** tentativa) * random.uniform(0.5, 1.0)
+
+class HttpClient:
+    """Sessão HTTP com pool de conexões keep-alive, limite de taxa e novas tentativas
+
+    Uma instância é compartilhada por todas as threads que falam com o
+    mesmo serviço (Azure DevOps ou API local). slots (semáforo) limita as
+    requisições simultâneas somando todos os clientes que o compartilham.
+    """
+
+    def __init__(self, headers=None, pool_size=SYNC_CONCURRENCY, limiter=None, retries=MAX_RETRIES, slots=None):
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=max(1, pool_size))
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+        self.session.headers.update(headers or {})
+        self.limiter = limiter or RateLimiter()
+        self.retries = retries
+        self.slots = slots
 
-def get_azure_work_items():
-    """Busca work items do Azure DevOps"""
-    headers = {
+    def request(self, method, url, **kwargs):
+        """Executa a requisição repetindo em 429/5xx transitórios e falhas de conexão"""
+        for tentativa in range(self.retries + 1):
+            self.limiter.wait()
+            try:
+                with self.slots or nullcontext():
+                    response = self.session.request(method, url, timeout=REQUEST_TIMEOUT, **kwargs)
+            except (requests.exceptions.ConnectionError, requests.exceptions.Timeout):
+                if tentativa == self.retries:
+                    raise
+                time.sleep(retry_wait(None, tentativa))
+                continue
+
+            if response.status_code in RETRY_STATUS and tentativa < self.retries:
+                espera = retry_wait(response, tentativa)
+                if response.status_code in THROTTLE_STATUS:
+                    self.limiter.pause(espera)
+                else:
+                    time.sleep(espera)
+                continue
+
+            response.raise_for_status()
+            return response
+
+    def close(self):
+        self.session.close()
+
+def azure_client(pool_size=SYNC_CONCURRENCY, limiter=None, retries=MAX_RETRIES, pat=None, slots=None):
+    """Cliente para a API do Azure DevOps"""
+    return HttpClient({
         'Content-Type': 'application/json',
-        'Authorization': f'Basic {AZURE_PAT}'
+        'Authorization': f'Basic {pat or AZURE_PAT}'
+    }, pool_size, limiter, retries, slots)
+
+def local_client(pool_size=SYNC_CONCURRENCY, retries=MAX_RETRIES, slots=None):
+    """Cliente para a API local (sem limite de taxa)"""
+    return HttpClient({'Content-Type': 'application/json'}, pool_size, RateLimiter(), retries, slots)
+
+def env_target():
+    """Projeto definido pelas variáveis de ambiente (modo de um projeto só)"""
+    return {
+        'org_url': AZURE_ORG_URL,
+        'project': AZURE_PROJECT,
+        'pat': AZURE_PAT,
+        'projeto_id': AZURE_PROJETO_ID,
     }
-    
-    url = f"{AZURE_ORG_URL}/{AZURE_PROJECT}/_apis/wit/wiql?api-version=7.0"
-    
+
+def project_key(target=None):
+    """Chave do projeto no arquivo de estado"""
+    target = target or env_target()
+    return f"{target['org_url'].rstrip('/')}/{target['project']}"
+
+def load_state(state_file=SYNC_STATE_FILE):
+    """Lê o arquivo de estado ({projeto: {'watermark', 'ultima_completa'}})"""
+    try:
+        with open(state_file, encoding='utf-8') as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+    except (OSError, ValueError) as e:
+        print(f"⚠ Estado de sincronização ilegível ({state_file}): {e}; executando sincronização completa")
+        return {}
+
+def save_state(state, state_file=SYNC_STATE_FILE):
+    """Grava o arquivo de estado de forma atômica"""
+    temporario = f"{state_file}.tmp"
+    with open(temporario, 'w', encoding='utf-8') as f:
+        json.dump(state, f, indent=2, sort_keys=True)
+    os.replace(temporario, state_file)
+
+# Projetos sincronizados em paralelo gravam o mesmo arquivo de estado
+STATE_LOCK = threading.Lock()
+
+def update_project_state(chave, projeto, state_file=SYNC_STATE_FILE):
+    """Relê o arquivo de estado e grava a entrada de um projeto"""
+    with STATE_LOCK:
+        state = load_state(state_file)
+        state[chave] = projeto
+        save_state(state, state_file)
+
+def incremental_since(projeto, full_hours=FULL_SYNC_HOURS, overlap=WATERMARK_OVERLAP):
+    """Data a partir da qual buscar alterações, ou None para sincronização completa
+
+    Retorna None quando ainda não há marca d'água ou quando a última
+    sincronização completa tem mais de full_hours horas.
+    """
+    watermark = projeto.get('watermark')
+    if not watermark:
+        return None
+    agora = datetime.now(timezone.utc)
+    ultima_completa = projeto.get('ultima_completa')
+    if full_hours and (not ultima_completa or
+                       agora - datetime.strptime(ultima_completa, WATERMARK_FORMAT).replace(tzinfo=timezone.utc)
+                       >= timedelta(hours=full_hours)):
+        return None
+    desde = datetime.strptime(watermark, WATERMARK_FORMAT).replace(tzinfo=timezone.utc)
+    return (desde - timedelta(seconds=overlap)).strftime(WATERMARK_FORMAT)
+
+class SyncState:
+    """Estado local da sincronização de um projeto (SQLite)
+
+    - work_items: última revisão, hash do conteúdo relevante e hash de cada
+      campo dos itens aceitos pela API local, para pular itens inalterados e
+      enviar só os campos que mudaram
+    - fila: ids consultados e ainda não confirmados pela API local
+      ('pendente'), que falharam e serão tentados de novo ('retry') ou que
+      esgotaram as tentativas ('descarte')
+    - execucao: execução em andamento (since, marca d'água e cursor da
+      consulta WIQL), para --resume continuar de onde parou
+
+    Cada janela consultada e cada lote confirmado é gravado em uma transação,
+    então o estado sobrevive a uma interrupção a qualquer momento. Usado
+    apenas pela thread principal de cada projeto.
+    """
+
+    def __init__(self, path, projeto):
+        self.conn = sqlite3.connect(path, timeout=30)
+        self.conn.executescript("""
+            CREATE TABLE IF NOT EXISTS work_items (
+                projeto TEXT NOT NULL,
+                id INTEGER NOT NULL,
+                rev INTEGER,
+                hash TEXT NOT NULL,
+                campos TEXT NOT NULL,
+                sincronizado_em TEXT NOT NULL,
+                PRIMARY KEY (projeto, id)
+            );
+            CREATE TABLE IF NOT EXISTS fila (
+                projeto TEXT NOT NULL,
+                id INTEGER NOT NULL,
+                status TEXT NOT NULL DEFAULT 'pendente',
+                tentativas INTEGER NOT NULL DEFAULT 0,
+                erro TEXT,
+                atualizado_em TEXT NOT NULL,
+                PRIMARY KEY (projeto, id)
+            );
+            CREATE TABLE IF NOT EXISTS execucao (
+                projeto TEXT PRIMARY KEY,
+                since TEXT,
+                inicio TEXT NOT NULL,
+                ultimo_id INTEGER NOT NULL DEFAULT 0,
+                consulta_fim INTEGER NOT NULL DEFAULT 0
+            );
+        """)
+        self.conn.commit()
+        self.projeto = projeto
+
+    def get(self, ids):
+        """{id: (rev, hash, {campo: hash})} dos ids já sincronizados"""
+        if not ids:
+            return {}
+        marcadores = ','.join('?' * len(ids))
+        linhas = self.conn.execute(
+            f"SELECT id, rev, hash, campos FROM work_items WHERE projeto = ? AND id IN ({marcadores})",
+            [self.projeto, *ids])
+        return {id_: (rev, hash_, json.loads(campos)) for id_, rev, hash_, campos in linhas}
+
+    def save(self, registros, concluidos=()):
+        """Grava [(id, rev, hash, {campo: hash})] e tira os ids concluidos da fila, em uma transação"""
+        agora = datetime.now(timezone.utc).strftime(WATERMARK_FORMAT)
+        with self.conn:
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO work_items (projeto, id, rev, hash, campos, sincronizado_em) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                [(self.projeto, id_, rev, hash_, json.dumps(campos, sort_keys=True), agora)
+                 for id_, rev, hash_, campos in registros])
+            self.conn.executemany(
+                "DELETE FROM fila WHERE projeto = ? AND id = ?",
+                [(self.projeto, id_) for id_ in concluidos])
+
+    def load_run(self):
+        """Execução interrompida do projeto ({'since', 'inicio', 'ultimo_id', 'consulta_fim'}) ou None"""
+        linha = self.conn.execute(
+            "SELECT since, inicio, ultimo_id, consulta_fim FROM execucao WHERE projeto = ?",
+            [self.projeto]).fetchone()
+        if linha is None:
+            return None
+        return {'since': linha[0], 'inicio': linha[1], 'ultimo_id': linha[2], 'consulta_fim': bool(linha[3])}
+
+    def start_run(self, since, inicio, retry_dead=False):
+        """Começa uma execução nova: descarta os pendentes da anterior e mantém os itens a repetir"""
+        agora = datetime.now(timezone.utc).strftime(WATERMARK_FORMAT)
+        with self.conn:
+            self.conn.execute("DELETE FROM fila WHERE projeto = ? AND status = 'pendente'", [self.projeto])
+            if retry_dead:
+                self.conn.execute(
+                    "UPDATE fila SET status = 'retry', tentativas = 0, atualizado_em = ? "
+                    "WHERE projeto = ? AND status = 'descarte'", [agora, self.projeto])
+            self.conn.execute(
+                "INSERT OR REPLACE INTO execucao (projeto, since, inicio, ultimo_id, consulta_fim) "
+                "VALUES (?, ?, ?, 0, 0)", [self.projeto, since, inicio])
+
+    def finish_run(self):
+        """Encerra a execução: a próxima começa do zero"""
+        with self.conn:
+            self.conn.execute("DELETE FROM execucao WHERE projeto = ?", [self.projeto])
+
+    def queued_ids(self, status=('pendente', 'retry')):
+        """Ids da fila com os status pedidos, em ordem"""
+        marcadores = ','.join('?' * len(status))
+        return [id_ for id_, in self.conn.execute(
+            f"SELECT id FROM fila WHERE projeto = ? AND status IN ({marcadores}) ORDER BY id",
+            [self.projeto, *status])]
+
+    def enqueue(self, ids, ultimo_id, consulta_fim):
+        """Grava os ids de uma janela WIQL e avança o cursor da consulta"""
+        agora = datetime.now(timezone.utc).strftime(WATERMARK_FORMAT)
+        with self.conn:
+            self.conn.executemany(
+                "INSERT OR IGNORE INTO fila (projeto, id, atualizado_em) VALUES (?, ?, ?)",
+                [(self.projeto, id_, agora) for id_ in ids])
+            self.conn.execute(
+                "UPDATE execucao SET ultimo_id = ?, consulta_fim = ? WHERE projeto = ?",
+                [ultimo_id, int(consulta_fim), self.projeto])
+
+    def fail(self, ids, erro, max_attempts=MAX_ITEM_ATTEMPTS, descartar=False):
+        """Marca ids para nova tentativa, ou descarta os que esgotaram max_attempts"""
+        agora = datetime.now(timezone.utc).strftime(WATERMARK_FORMAT)
+        with self.conn:
+            self.conn.executemany(
+                "INSERT OR IGNORE INTO fila (projeto, id, atualizado_em) VALUES (?, ?, ?)",
+                [(self.projeto, id_, agora) for id_ in ids])
+            self.conn.executemany(
+                "UPDATE fila SET tentativas = tentativas + 1, erro = ?, atualizado_em = ?, "
+                "status = CASE WHEN ? OR tentativas + 1 >= ? THEN 'descarte' ELSE 'retry' END "
+                "WHERE projeto = ? AND id = ?",
+                [(str(erro), agora, int(descartar), max_attempts, self.projeto, id_) for id_ in ids])
+
+    def counts(self):
+        """{status: quantidade} da fila do projeto"""
+        return dict(self.conn.execute(
+            "SELECT status, COUNT(*) FROM fila WHERE projeto = ? GROUP BY status", [self.projeto]))
+
+    def close(self):
+        self.conn.close()
+
+def field_hash(valor):
+    """Hash curto do valor de um campo"""
+    return hashlib.sha256(json.dumps(valor, sort_keys=True).encode('utf-8')).hexdigest()[:16]
+
+def diff_work_item(details, anterior, campos=SYNC_FIELDS):
+    """Compara um work item com o último estado enviado
+
+    Retorna (item a enviar ou None se nada relevante mudou, registro de estado).
+    Itens novos vão com todos os campos relevantes; os já conhecidos só com
+    os campos alterados (None para campos que deixaram de existir no Azure).
+    """
+    fields = details.get('fields', {})
+    rev = details.get('rev')
+    if anterior and rev is not None and anterior[0] == rev:
+        return None, None
+
+    atuais = {campo: fields[campo] for campo in campos if campo in fields}
+    hashes = {campo: field_hash(valor) for campo, valor in atuais.items()}
+    conteudo = hashlib.sha256(json.dumps(
+        {campo: hashes[campo] for campo in hashes if campo not in VOLATILE_FIELDS},
+        sort_keys=True).encode('utf-8')).hexdigest()
+    registro = (details['id'], rev, conteudo, hashes)
+
+    if anterior is None:
+        return {'id': details['id'], 'rev': rev, 'url': details.get('url'), 'fields': atuais}, registro
+    if anterior[1] == conteudo:
+        return None, registro
+
+    hashes_anteriores = anterior[2]
+    alterados = {campo: valor for campo, valor in atuais.items()
+                 if hashes_anteriores.get(campo) != hashes[campo]}
+    for campo in hashes_anteriores:
+        if campo not in atuais and campo in campos:
+            alterados[campo] = None
+    return {'id': details['id'], 'rev': rev, 'fields': alterados}, registro
+
+def setup_tracing():
+    """Configura o SDK do OpenTelemetry para --otel
+
+    Exporta por OTLP/HTTP (OTEL_EXPORTER_OTLP_ENDPOINT) quando
+    opentelemetry-exporter-otlp está instalado, senão no console. Sem --otel,
+    os spans usam o provedor global (por exemplo, de opentelemetry-instrument).
+    Retorna o TracerProvider, ou None se o SDK não estiver instalado.
+    """
+    try:
+        from opentelemetry.sdk.resources import Resource
+        from opentelemetry.sdk.trace import TracerProvider
+        from opentelemetry.sdk.trace.export import BatchSpanProcessor, ConsoleSpanExporter
+    except ImportError:
+        print("⚠ --otel requer: pip install opentelemetry-api opentelemetry-sdk")
+        return None
+    try:
+        from opentelemetry.exporter.otlp.proto.http.trace_exporter import OTLPSpanExporter
+        exporter = OTLPSpanExporter()
+    except ImportError:
+        exporter = ConsoleSpanExporter()
+    provider = TracerProvider(resource=Resource.create(
+        {'service.name': os.getenv('OTEL_SERVICE_NAME', 'sync-azure')}))
+    provider.add_span_processor(BatchSpanProcessor(exporter))
+    trace.set_tracer_provider(provider)
+    return provider
+
+def start_span(nome, contexto=None, atributos=None):
+    """Span do OpenTelemetry (sem a biblioteca, não faz nada)"""
+    if trace is None:
+        return nullcontext()
+    return trace.get_tracer('sync-azure').start_as_current_span(nome, context=contexto, attributes=atributos)
+
+class SyncMetrics:
+    """Latência por operação e totais de uma execução de um projeto"""
+
+    def __init__(self, projeto):
+        self.projeto = projeto
+        self.duracoes = {operacao: [] for operacao in OPERACOES}
+        self.erros = {operacao: 0 for operacao in OPERACOES}
+        self.resultado = {}
+        self.duracao = 0.0
+        self.fim = None
+        self.lock = threading.Lock()
+
+    def observe(self, operacao, segundos, erro=False):
+        with self.lock:
+            self.duracoes[operacao].append(segundos)
+            if erro:
+                self.erros[operacao] += 1
+
+    def finish(self, resultado, duracao):
+        self.resultado = dict(resultado)
+        self.duracao = duracao
+        self.fim = time.time()
+
+    def itens_por_segundo(self):
+        return self.resultado.get('sincronizados', 0) / self.duracao if self.duracao else 0.0
+
+    def summary(self):
+        """Linhas do resumo: requisições, erros e latência p50/p95/máxima por operação"""
+        linhas = []
+        for operacao in OPERACOES:
+            duracoes = sorted(self.duracoes[operacao])
+            if not duracoes:
+                continue
+            p50 = duracoes[int(0.50 * (len(duracoes) - 1))]
+            p95 = duracoes[int(0.95 * (len(duracoes) - 1))]
+            linhas.append(f"{operacao:<9} {len(duracoes):>6} req  {self.erros[operacao]:>4} erros  "
+                          f"p50 {p50 * 1000:>7.0f} ms  p95 {p95 * 1000:>7.0f} ms  máx {duracoes[-1] * 1000:>7.0f} ms")
+        return linhas
+
+def prometheus_metrics(metricas):
+    """Métricas de várias execuções (uma por projeto) no formato texto do Prometheus"""
+    def rotulos(metrica, **extra):
+        pares = {'projeto': metrica.projeto, **extra}
+        # json.dumps escapa aspas, barras e quebras de linha como o Prometheus espera
+        return ','.join(f'{chave}={json.dumps(str(valor), ensure_ascii=False)}' for chave, valor in pares.items())
+
+    linhas = [
+        '# HELP azure_sync_request_duration_seconds Latência das requisições da última execução',
+        '# TYPE azure_sync_request_duration_seconds histogram',
+    ]
+    for metrica in metricas:
+        for operacao in OPERACOES:
+            duracoes = metrica.duracoes[operacao]
+            for limite in LATENCY_BUCKETS:
+                quantidade = sum(1 for duracao in duracoes if duracao <= limite)
+                linhas.append(f'azure_sync_request_duration_seconds_bucket{{{rotulos(metrica, operacao=operacao, le=limite)}}} {quantidade}')
+            linhas.append(f'azure_sync_request_duration_seconds_bucket{{{rotulos(metrica, operacao=operacao, le="+Inf")}}} {len(duracoes)}')
+            linhas.append(f'azure_sync_request_duration_seconds_sum{{{rotulos(metrica, operacao=operacao)}}} {sum(duracoes):.6f}')
+            linhas.append(f'azure_sync_request_duration_seconds_count{{{rotulos(metrica, operacao=operacao)}}} {len(duracoes)}')
+
+    familias = [
+        ('azure_sync_request_errors', 'Requisições com falha na última execução, por operação',
+         lambda metrica: [(rotulos(metrica, operacao=operacao), metrica.erros[operacao]) for operacao in OPERACOES]),
+        ('azure_sync_items', 'Work items da última execução, por resultado',
+         lambda metrica: [(rotulos(metrica, resultado=chave), metrica.resultado.get(chave, 0))
+                          for chave in ('consultados', 'sincronizados', 'novos', 'atualizados', 'inalterados', 'erros')]),
+        ('azure_sync_items_per_second', 'Work items sincronizados por segundo na última execução',
+         lambda metrica: [(rotulos(metrica), round(metrica.itens_por_segundo(), 3))]),
+        ('azure_sync_run_duration_seconds', 'Duração da última execução',
+         lambda metrica: [(rotulos(metrica), round(metrica.duracao, 3))]),
+        ('azure_sync_last_run_success', '1 se a última execução terminou sem erros',
+         lambda metrica: [(rotulos(metrica), int(not metrica.resultado.get('erros')))]),
+        ('azure_sync_last_run_timestamp_seconds', 'Fim da última execução (epoch)',
+         lambda metrica: [(rotulos(metrica), int(metrica.fim or 0))]),
+    ]
+    for nome, ajuda, valores in familias:
+        linhas.append(f'# HELP {nome} {ajuda}')
+        linhas.append(f'# TYPE {nome} gauge')
+        for metrica in metricas:
+            for rotulo, valor in valores(metrica):
+                linhas.append(f'{nome}{{{rotulo}}} {valor}')
+    return '\n'.join(linhas) + '\n'
+
+# Última execução de cada projeto, para o arquivo de métricas do agendador
+ULTIMAS_METRICAS = {}
+METRICS_LOCK = threading.Lock()
+
+def save_metrics(metrica, metrics_file):
+    """Registra a execução e regrava o arquivo de métricas (atômico) com todos os projetos"""
+    with METRICS_LOCK:
+        ULTIMAS_METRICAS[metrica.projeto] = metrica
+        if not metrics_file:
+            return
+        temporario = f"{metrics_file}.tmp"
+        with open(temporario, 'w', encoding='utf-8') as f:
+            f.write(prometheus_metrics(list(ULTIMAS_METRICAS.values())))
+        os.replace(temporario, metrics_file)
+
+def run_traced(metrics, operacao, contexto, atributos, funcao, *args):
+    """Executa funcao(*args) em um span filho de contexto, medindo a latência
+
+    Usado nas tarefas do pool, que não herdam o contexto da thread do projeto.
+    Exceção ou retorno None (falha da consulta WIQL) contam como erro.
+    """
+    inicio = time.monotonic()
+    erro = True
+    with start_span(f"azure_sync.{operacao}", contexto, atributos):
+        try:
+            retorno = funcao(*args)
+            erro = retorno is None
+            return retorno
+        finally:
+            if metrics:
+                metrics.observe(operacao, time.monotonic() - inicio, erro)
+
+def get_azure_work_items(azure=None, since=None, target=None, after_id=0, top=WIQL_WINDOW):
+    """Busca uma janela de work items do Azure DevOps
+
+    Traz até top ids maiores que after_id, em ordem crescente de id; a janela
+    seguinte começa no maior id retornado. Com since (UTC, WATERMARK_FORMAT),
+    traz só os alterados depois dessa data.
+    """
+    azure = azure or azure_client()
+    target = target or env_target()
+    top = max(1, min(top, WIQL_MAX))
+
+    url = f"{target['org_url']}/{target['project']}/_apis/wit/wiql?api-version=7.0&$top={top}"
+
+    filtro = "[System.WorkItemType] = 'User Story'"
+    if after_id:
+        filtro += f" AND [System.Id] > {int(after_id)}"
+    if since:
+        # timePrecision: sem ele o WIQL compara só a data, ignorando a hora
+        url += "&timePrecision=true"
+        filtro += f" AND [System.ChangedDate] > '{since}'"
+
     query = {
-        "query": "SELECT [System.Id], [System.Title], [System.State] FROM WorkItems WHERE [System.WorkItemType] = 'User Story' ORDER BY [System.CreatedDate] DESC"
+        "query": f"SELECT [System.Id] FROM WorkItems WHERE {filtro} ORDER BY [System.Id]"
     }
-    
+
     try:
-        response = requests.post(url, headers=headers, json=query)
-        response.raise_for_status()
+        response = azure.request('POST', url, json=query)
         return response.json()
     except requests.exceptions.RequestException as e:
         print(f"Erro ao buscar work items: {e}")
         return None
 
-def sync_to_local_api(work_items):
-    """Sincroniza work items com a API local"""
-    headers = {'Content-Type': 'application/json'}
-    
-    for item in work_items.get('workItems', []):
-        work_item_id = item['id']
-        
-        # Buscar detalhes do work item
-        detail_url = f"{AZURE_ORG_URL}/_apis/wit/workitems/{work_item_id}?api-version=7.0"
-        
+def get_work_items_batch(ids, fields=None, azure=None, target=None):
+    """Busca os detalhes de até 200 work items em uma chamada (workitemsbatch)
+
+    Retorna {id: detalhes}; ids inexistentes ou sem permissão ficam de fora.
+    """
+    azure = azure or azure_client()
+    target = target or env_target()
+
+    url = f"{target['org_url']}/{target['project']}/_apis/wit/workitemsbatch?api-version=7.0"
+
+    body = {"ids": ids, "errorPolicy": "omit"}
+    if fields:
+        body["fields"] = fields
+
+    response = azure.request('POST', url, json=body)
+    return {item['id']: item for item in response.json().get('value', []) if item}
+
+def post_work_items_bulk(items, local=None, target=None):
+    """Envia um lote de work items para a API local em uma requisição
+
+    A API grava o lote em uma transação e devolve um resultado por item;
+    retorna a lista [{'id', 'success', 'error'?}].
+    """
+    local = local or local_client()
+    target = target or env_target()
+    body = {'items': items}
+    if target.get('projeto_id'):
+        body['projetoId'] = target['projeto_id']
+    else:
+        body['projetoNome'] = target['project']
+    headers = {}
+    if propagate is not None:
+        # traceparent do span do envio; a API local só o usa se extrair o contexto
+        propagate.inject(headers)
+    response = local.request('POST', f"{API_BASE_URL}/azure-work-items/bulk", json=body, headers=headers)
+    return response.json().get('results', [])
+
+def post_sync_log(resultado, inicio, fim, local=None, target=None):
+    """Registra a execução em /azure-work-items/sync-logs (tabela azure_sync_log)"""
+    local = local or local_client()
+    target = target or env_target()
+    body = {
+        'inicioSync': inicio,
+        'fimSync': fim,
+        'status': 'erro' if resultado['erros'] else 'sucesso',
+        'totalWorkItems': resultado['consultados'],
+        'novosWorkItems': resultado['novos'],
+        'atualizadosWorkItems': resultado['atualizados'],
+        'erroMensagem': f"{resultado['erros']} work items com erro" if resultado['erros'] else None,
+    }
+    if target.get('projeto_id'):
+        body['projetoId'] = target['projeto_id']
+    else:
+        body['projetoNome'] = target['project']
+    headers = {}
+    if propagate is not None:
+        propagate.inject(headers)
+    local.request('POST', f"{API_BASE_URL}/azure-work-items/sync-logs", json=body, headers=headers)
+
+def sync_to_local_api(since=None, batch_size=AZURE_BATCH_SIZE, fields=None,
+                      azure=None, local=None, concurrency=SYNC_CONCURRENCY,
+                      bulk_size=BULK_SIZE, flush_interval=BULK_FLUSH_INTERVAL,
+                      target=None, item_state=None, force=False, window=WIQL_WINDOW,
+                      max_attempts=MAX_ITEM_ATTEMPTS, metrics=None):
+    """Sincroniza work items com a API local
+
+    Os ids vêm de consultas WIQL em janelas de window ids (get_azure_work_items),
+    feitas no mesmo pool: os ids de uma janela já vão para a busca de detalhes
+    enquanto a próxima é consultada, que só começa quando restam menos de
+    window ids na fila. Os detalhes são buscados em lotes de batch_size ids (máximo 200) e
+    acumulados em um buffer enviado à API local em lotes de bulk_size itens,
+    ou quando o item mais antigo do buffer espera mais de flush_interval
+    segundos. Buscas e envios rodam em um pool de `concurrency` threads, com
+    sessões keep-alive compartilhadas; novos lotes só são buscados enquanto
+    houver menos de 2 × concurrency tarefas pendentes, limitando a memória.
+
+    Com item_state (SyncState), itens inalterados desde o último envio aceito
+    são pulados e os demais levam só os campos alterados (com force, todos vão
+    completos); o estado de cada item é gravado quando a API local confirma
+    o lote. A fila em disco de item_state é a fonte dos ids: a consulta WIQL
+    continua do cursor da execução registrada (start_run/load_run), os ids
+    pendentes e a repetir entram primeiro, e falhas vão para nova tentativa
+    ou, depois de max_attempts, para a lista de descarte.
+
+    Cada consulta, busca e envio roda em um span filho do span atual e tem a
+    latência registrada em metrics (SyncMetrics).
+    Retorna {'consultados': n, 'sincronizados': n, 'novos': n, 'atualizados': n,
+    'inalterados': n, 'erros': n};
+    uma janela WIQL com falha conta como um erro e encerra as consultas.
+    """
+    azure = azure or azure_client(concurrency)
+    local = local or local_client(concurrency)
+    target = target or env_target()
+    batch_size = max(1, min(batch_size, AZURE_BATCH_MAX))
+    bulk_size = max(1, min(bulk_size, BULK_MAX))
+    window = max(1, min(window, WIQL_MAX))
+    # Ids consultados que ainda não tiveram os detalhes buscados
+    fila = deque()
+    janela = {'ultimo_id': 0, 'consultando': False, 'fim': False}
+    resultado = {'consultados': 0, 'sincronizados': 0, 'novos': 0, 'atualizados': 0, 'inalterados': 0, 'erros': 0}
+    # As threads do pool não herdam o contexto: os spans recebem o pai explicitamente
+    contexto = otel_context.get_current() if otel_context else None
+    limite = max(1, concurrency) * 2
+    campos = fields or SYNC_FIELDS
+    buffer = []
+    buffer_desde = None
+    # Registros de estado dos itens enviados, gravados quando a API local confirma
+    aguardando = {}
+
+    # Itens cujo envio anterior falhou vão completos, sem comparar com o estado
+    repetir = set()
+    if item_state:
+        execucao = item_state.load_run() or {}
+        janela['ultimo_id'] = execucao.get('ultimo_id', 0)
+        janela['fim'] = execucao.get('consulta_fim', False)
+        fila.extend(item_state.queued_ids())
+        repetir.update(item_state.queued_ids(('retry',)))
+
+    def falhou(ids, erro, descartar=False):
+        resultado['erros'] += len(ids)
+        if item_state:
+            item_state.fail(ids, erro, max_attempts, descartar)
+
+    with ThreadPoolExecutor(max_workers=max(1, concurrency)) as executor:
+        pendentes = {}
+
+        def consultar_janela():
+            if janela['fim'] or janela['consultando'] or len(fila) >= window:
+                return
+            janela['consultando'] = True
+            pendentes[executor.submit(
+                run_traced, metrics, 'wiql', contexto, {'azure.after_id': janela['ultimo_id']},
+                get_azure_work_items, azure, since, target, janela['ultimo_id'], window)] = ('janela', janela['ultimo_id'])
+
+        def buscar_lotes():
+            while len(pendentes) < limite and fila:
+                if len(fila) < batch_size and janela['consultando']:
+                    # Lote incompleto: espera a janela em consulta
+                    return
+                lote = [fila.popleft() for _ in range(min(batch_size, len(fila)))]
+                pendentes[executor.submit(
+                    run_traced, metrics, 'detalhes', contexto, {'azure.work_items': len(lote)},
+                    get_work_items_batch, lote, fields, azure, target)] = ('lote', lote)
+
+        def enviar(quantidade):
+            nonlocal buffer, buffer_desde
+            envio, buffer = buffer[:quantidade], buffer[quantidade:]
+            buffer_desde = time.monotonic() if buffer else None
+            pendentes[executor.submit(
+                run_traced, metrics, 'envio', contexto, {'azure.work_items': len(envio)},
+                post_work_items_bulk, envio, local, target)] = ('envio', [item['id'] for item in envio])
+
+        consultar_janela()
+        while pendentes or buffer or fila:
+            espera = None
+            if buffer:
+                espera = max(0.0, buffer_desde + flush_interval - time.monotonic())
+            feitos, _ = wait(list(pendentes), timeout=espera, return_when=FIRST_COMPLETED)
+            for future in feitos:
+                tipo, alvo = pendentes.pop(future)
+                if tipo == 'janela':
+                    janela['consultando'] = False
+                    resposta = future.result()
+                    if resposta is None:
+                        # get_azure_work_items já mostrou o erro
+                        print(f"✗ Consulta WIQL interrompida após o id {alvo}")
+                        resultado['erros'] += 1
+                        janela['fim'] = True
+                        continue
+                    ids = [item['id'] for item in resposta.get('workItems', [])]
+                    # Itens a repetir já entraram na fila no início
+                    fila.extend(id_ for id_ in ids if id_ not in repetir)
+                    resultado['consultados'] += len(ids)
+                    if len(ids) < window:
+                        janela['fim'] = True
+                    else:
+                        janela['ultimo_id'] = max(ids)
+                    if item_state:
+                        item_state.enqueue(ids, janela['ultimo_id'], janela['fim'])
+                    continue
+                try:
+                    retorno = future.result()
+                except requests.exceptions.RequestException as e:
+                    if tipo == 'lote':
+                        print(f"✗ Erro ao buscar detalhes de {len(alvo)} work items ({alvo[0]}..{alvo[-1]}): {e}")
+                    else:
+                        print(f"✗ Erro ao enviar lote de {len(alvo)} work items ({alvo[0]}..{alvo[-1]}): {e}")
+                        for work_item_id in alvo:
+                            aguardando.pop(work_item_id, None)
+                    falhou(alvo, e)
+                    continue
+
+                if tipo == 'envio':
+                    recebidos = set()
+                    confirmados = []
+                    concluidos = []
+                    for item in retorno:
+                        recebidos.add(item.get('id'))
+                        if item.get('success'):
+                            print(f"✓ Work Item {item.get('id')} sincronizado com sucesso")
+                            resultado['sincronizados'] += 1
+                            if item.get('acao') == 'inserido':
+                                resultado['novos'] += 1
+                            elif item.get('acao') == 'atualizado':
+                                resultado['atualizados'] += 1
+                            concluidos.append(item.get('id'))
+                            if item.get('id') in aguardando:
+                                confirmados.append(aguardando[item.get('id')])
+                        else:
+                            print(f"✗ Erro ao sincronizar work item {item.get('id')}: {item.get('error')}")
+                            falhou([item.get('id')], item.get('error'))
+                    for work_item_id in alvo:
+                        aguardando.pop(work_item_id, None)
+                        if work_item_id not in recebidos:
+                            print(f"✗ Work Item {work_item_id} sem resultado na resposta da API local")
+                            falhou([work_item_id], 'sem resultado na resposta da API local')
+                    # Checkpoint: o lote confirmado sai da fila junto com o estado dos itens
+                    if item_state and concluidos:
+                        item_state.save(confirmados, concluidos)
+                    continue
+
+                anteriores = item_state.get(alvo) if item_state and not force else {}
+                inalterados = []
+                pulados = []
+                for work_item_id in alvo:
+                    details = retorno.get(work_item_id)
+                    if details is None:
+                        print(f"✗ Work Item {work_item_id} não encontrado no Azure DevOps")
+                        # Excluído ou sem permissão: nova tentativa não resolve
+                        falhou([work_item_id], 'não encontrado no Azure DevOps', descartar=True)
+                        continue
+                    if item_state:
+                        anterior = None if work_item_id in repetir else anteriores.get(work_item_id)
+                        envio, registro = diff_work_item(details, anterior, campos)
+                        if envio is None:
+                            resultado['inalterados'] += 1
+                            pulados.append(work_item_id)
+                            if registro:
+                                inalterados.append(registro)
+                            continue
+                        aguardando[work_item_id] = registro
+                        details = envio
+                    if not buffer:
+                        buffer_desde = time.monotonic()
+                    buffer.append(details)
+                if pulados:
+                    # Revisão nova sem mudança nos campos relevantes só atualiza a revisão
+                    item_state.save(inalterados, pulados)
+
+            while len(buffer) >= bulk_size:
+                enviar(bulk_size)
+            consultar_janela()
+            buscar_lotes()
+            # Sem mais consultas e buscas pendentes, ou com o buffer parado há flush_interval: envia o que sobrou
+            if buffer and (not fila and not any(tipo in ('janela', 'lote') for tipo, _ in pendentes.values())
+                           or time.monotonic() - buffer_desde >= flush_interval):
+                enviar(len(buffer))
+
+    return resultado
+
+def parse_args(argv=None):
+    """Lê as opções de linha de comando (padrões vêm das variáveis de ambiente)"""
+    parser = argparse.ArgumentParser(description="Sincroniza work items do Azure DevOps com a API local")
+    parser.add_argument(
+        '--batch-size', type=int, default=AZURE_BATCH_SIZE, metavar='N',
+        help=f"Work items por chamada de detalhes (máximo {AZURE_BATCH_MAX}; env AZURE_BATCH_SIZE)")
+    parser.add_argument(
+        '--fields', default=','.join(AZURE_FIELDS), metavar='CAMPOS',
+        help="Campos buscados, separados por vírgula, ex.: System.Title,System.State "
+             "(padrão: todos; env AZURE_FIELDS)")
+    parser.add_argument(
+        '--concurrency', type=int, default=SYNC_CONCURRENCY, metavar='N',
+        help="Requisições simultâneas ao Azure e à API local (env AZURE_SYNC_CONCURRENCY; padrão: 8)")
+    parser.add_argument(
+        '--max-rps', type=float, default=MAX_RPS, metavar='N',
+        help="Máximo de requisições por segundo ao Azure DevOps (env AZURE_MAX_RPS; 0 = sem limite)")
+    parser.add_argument(
+        '--retries', type=int, default=MAX_RETRIES, metavar='N',
+        help="Novas tentativas em 429/5xx e falhas de conexão (env AZURE_MAX_RETRIES; padrão: 5)")
+    parser.add_argument(
+        '--wiql-window', type=int, default=WIQL_WINDOW, metavar='N',
+        help=f"Ids por consulta WIQL; a consulta é paginada por id (máximo {WIQL_MAX}; "
+             "env AZURE_WIQL_WINDOW; padrão: 10000)")
+    parser.add_argument(
+        '--bulk-size', type=int, default=BULK_SIZE, metavar='N',
+        help=f"Work items por envio à API local (máximo {BULK_MAX}; env AZURE_BULK_SIZE; padrão: 200)")
+    parser.add_argument(
+        '--flush-interval', type=float, default=BULK_FLUSH_INTERVAL, metavar='SEGUNDOS',
+        help="Envia um lote incompleto depois de SEGUNDOS no buffer (env AZURE_BULK_FLUSH_INTERVAL; padrão: 2)")
+    parser.add_argument(
+        '--state-db', default=SYNC_STATE_DB, metavar='ARQUIVO',
+        help="Banco SQLite com a revisão e o hash de cada work item enviado (env AZURE_SYNC_STATE_DB)")
+    parser.add_argument(
+        '--force', action='store_true',
+        help="Envia todos os work items com todos os campos, ignorando o estado local "
+             "(use depois de limpar azure_work_items)")
+    parser.add_argument(
+        '--resume', action='store_true',
+        help="Continua a última execução interrompida ou com erros a partir da fila em --state-db")
+    parser.add_argument(
+        '--max-attempts', type=int, default=MAX_ITEM_ATTEMPTS, metavar='N',
+        help="Tentativas por work item antes da lista de descarte (env AZURE_MAX_ITEM_ATTEMPTS; padrão: 3)")
+    parser.add_argument(
+        '--retry-dead', action='store_true',
+        help="Devolve os work items da lista de descarte para nova tentativa")
+    parser.add_argument(
+        '--projeto-id', default=AZURE_PROJETO_ID, metavar='ID',
+        help="ID do projeto em estruturas_projeto (env AZURE_PROJETO_ID; padrão: localizar pelo nome AZURE_PROJECT)")
+    parser.add_argument(
+        '--metrics-file', default=SYNC_METRICS_FILE, metavar='ARQUIVO',
+        help="Grava latências, itens/s e erros da execução no formato do Prometheus, para o "
+             "textfile collector do node-exporter (env AZURE_SYNC_METRICS_FILE)")
+    parser.add_argument(
+        '--otel', action='store_true', default=SYNC_OTEL,
+        help="Exporta spans do OpenTelemetry (OTLP se instalado, senão console; env AZURE_SYNC_OTEL=1)")
+    parser.add_argument(
+        '--config', default=SYNC_CONFIG, metavar='ARQUIVO',
+        help="JSON com organizações e projetos a sincronizar em paralelo, cada um no seu intervalo "
+             "(env AZURE_SYNC_CONFIG); sem ele, sincroniza só AZURE_ORG_URL/AZURE_PROJECT")
+    parser.add_argument(
+        '--once', action='store_true',
+        help="Com --config, sincroniza cada projeto uma vez e termina")
+    parser.add_argument(
+        '--incremental', action='store_true', default=SYNC_INCREMENTAL,
+        help="Busca só os work items alterados desde a última sincronização sem erros "
+             "(env AZURE_SYNC_INCREMENTAL=1)")
+    parser.add_argument(
+        '--full', action='store_true',
+        help="Força uma sincronização completa mesmo com --incremental")
+    parser.add_argument(
+        '--full-every', type=float, default=FULL_SYNC_HOURS, metavar='HORAS',
+        help="No modo incremental, faz uma sincronização completa quando a última tiver mais "
+             "de HORAS horas (env AZURE_FULL_SYNC_HOURS; padrão: 24; 0 = nunca)")
+    parser.add_argument(
+        '--state-file', default=SYNC_STATE_FILE, metavar='ARQUIVO',
+        help="Arquivo com a marca d'água de cada projeto (env AZURE_SYNC_STATE_FILE)")
+    return parser.parse_args(argv)
+
+def sync_project(target, args, azure, local, fields):
+    """Sincroniza um projeto: consulta WIQL, envio à API local e marca d'água
+
+    Opções de target (incremental, full_every) têm precedência sobre args.
+    A execução fica em um span (com as consultas, buscas e envios como filhos),
+    é registrada em /azure-work-items/sync-logs e, com args.metrics_file,
+    no arquivo de métricas do Prometheus.
+    Retorna o resultado de sync_to_local_api.
+    """
+    with start_span('azure_sync.project', atributos={'azure.project': target['project'],
+                                                     'azure.organization': target['org_url']}):
+        return _sync_project(target, args, azure, local, fields)
+
+def _sync_project(target, args, azure, local, fields):
+    chave = project_key(target)
+    nome = target['project']
+    incremental = target.get('incremental', args.incremental)
+    projeto = load_state(args.state_file).get(chave, {})
+    try:
+        item_state = SyncState(args.state_db, chave)
+    except sqlite3.Error as e:
+        print(f"⚠ Estado local indisponível ({args.state_db}): {e}; enviando todos os work items")
+        item_state = None
+
+    execucao = item_state.load_run() if item_state else None
+    if execucao and args.resume:
+        # Continua a execução interrompida com o mesmo filtro e a mesma marca d'água
+        since = execucao['since']
+        inicio_execucao = execucao['inicio']
+        if execucao['consulta_fim']:
+            print(f"[{nome}] Retomando a execução de {inicio_execucao} (consulta WIQL já concluída)")
+        else:
+            print(f"[{nome}] Retomando a execução de {inicio_execucao} após o id {execucao['ultimo_id']}")
+    else:
+        if execucao:
+            print(f"⚠ [{nome}] Execução interrompida em {execucao['inicio']} descartada (use --resume para continuar)")
+        elif args.resume:
+            print(f"[{nome}] Nenhuma execução interrompida: começando do início")
+        since = None
+        if incremental and not args.full:
+            since = incremental_since(projeto, target.get('full_every', args.full_every))
+            if since is None:
+                print(f"[{nome}] Modo incremental: sincronização completa de reconciliação")
+        # Capturada antes da consulta: alterações feitas durante a execução entram na próxima
+        inicio_execucao = datetime.now(timezone.utc).strftime(WATERMARK_FORMAT)
+        if item_state:
+            item_state.start_run(since, inicio_execucao, args.retry_dead)
+
+    if since:
+        print(f"[{nome}] Sincronizando work items alterados desde {since}...")
+    else:
+        print(f"[{nome}] Sincronizando work items do Azure DevOps...")
+    metrics = SyncMetrics(chave)
+    inicio_sync = datetime.now(timezone.utc).isoformat()
+    inicio = time.monotonic()
+    try:
+        resultado = sync_to_local_api(since, args.batch_size, fields, azure, local, args.concurrency,
+                                      args.bulk_size, args.flush_interval, target,
+                                      item_state, args.force, args.wiql_window, args.max_attempts,
+                                      metrics)
+        if item_state:
+            fila = item_state.counts()
+            if not resultado['erros']:
+                item_state.finish_run()
+    finally:
+        if item_state:
+            item_state.close()
+    duracao = time.monotonic() - inicio
+    metrics.finish(resultado, duracao)
+    print(f"[{nome}] Consultados: {resultado['consultados']}  "
+          f"Sincronizados: {resultado['sincronizados']}  Inalterados: {resultado['inalterados']}  "
+          f"Erros: {resultado['erros']}  ({metrics.itens_por_segundo():.1f} itens/s)")
+    for linha in metrics.summary():
+        print(f"[{nome}]   {linha}")
+
+    try:
+        save_metrics(metrics, args.metrics_file)
+    except OSError as e:
+        print(f"⚠ Não foi possível gravar as métricas em {args.metrics_file}: {e}")
+    try:
+        post_sync_log(resultado, inicio_sync, datetime.now(timezone.utc).isoformat(), local, target)
+    except requests.exceptions.RequestException as e:
+        print(f"⚠ [{nome}] Não foi possível registrar a sincronização em sync-logs: {e}")
+
+    if item_state and fila.get('retry'):
+        print(f"⚠ [{nome}] {fila['retry']} work items aguardando nova tentativa (--resume continua esta execução)")
+    if item_state and fila.get('descarte'):
+        print(f"⚠ [{nome}] {fila['descarte']} work items na lista de descarte após {args.max_attempts} tentativas "
+              f"(--retry-dead para tentar de novo)")
+
+    if resultado['erros']:
+        print(f"⚠ [{nome}] Marca d'água mantida: a próxima execução repete as alterações desde a anterior")
+    else:
+        projeto['watermark'] = inicio_execucao
+        if not since:
+            projeto['ultima_completa'] = inicio_execucao
         try:
-            response = requests.get(detail_url, headers={'Authorization': f'Basic {AZURE_PAT}'})
-            response.raise_for_status()
-            details = response.json()
-            
-            # Enviar para API local
-            api_url = f"{API_BASE_URL}/azure-work-items"
-            local_response = requests.post(api_url, headers=headers, json=details)
-            local_response.raise_for_status()
-            
-            print(f"✓ Work Item {work_item_id} sincronizado com sucesso")
-        except requests.exceptions.RequestException as e:
-            print(f"✗ Erro ao sincronizar work item {work_item_id}: {e}")
-
-def main():
+            update_project_state(chave, projeto, args.state_file)
+            print(f"✓ [{nome}] Marca d'água atualizada para {inicio_execucao}")
+        except OSError as e:
+            print(f"⚠ Não foi possível gravar o estado em {args.state_file}: {e}")
+    return resultado
+
+def load_config(path):
+    """Lê o arquivo de configuração do agendador
+
+    Formato:
+        {
+          "parallel_projects": 4,      # projetos sincronizando ao mesmo tempo
+          "concurrency": 16,           # requisições simultâneas somando todos os projetos
+          "max_rps": 20,               # requisições/s ao Azure somando todas as organizações
+          "defaults": {"interval": 900, "priority": 0, "incremental": true},
+          "organizations": [
+            {"url": "https://dev.azure.com/contoso", "pat_env": "AZURE_PAT_CONTOSO", "max_rps": 10,
+             "projects": ["Portal", {"name": "Backoffice", "projeto_id": "...", "interval": 300, "priority": 10}]}
+          ]
+        }
+
+    O PAT vem de "pat" ou da variável de ambiente "pat_env" (padrão: AZURE_PAT).
+    Retorna (opções globais, lista de projetos).
+    """
+    with open(path, encoding='utf-8') as f:
+        config = json.load(f)
+
+    padroes = config.get('defaults', {})
+    projetos = []
+    for org in config.get('organizations', []):
+        pat = org.get('pat') or os.getenv(org.get('pat_env', 'AZURE_PAT'), '')
+        for item in org.get('projects', []):
+            if isinstance(item, str):
+                item = {'name': item}
+            target = dict(padroes, **{chave: valor for chave, valor in item.items() if chave != 'name'})
+            target.update({
+                'org_url': org['url'].rstrip('/'),
+                'project': item['name'],
+                'pat': pat,
+                'org_max_rps': org.get('max_rps', 0),
+            })
+            target.setdefault('interval', PROJECT_INTERVAL)
+            target.setdefault('priority', 0)
+            projetos.append(target)
+
+    opcoes = {
+        'parallel_projects': config.get('parallel_projects', PARALLEL_PROJECTS),
+        'concurrency': config.get('concurrency', 0),
+        'max_rps': config.get('max_rps', 0),
+    }
+    return opcoes, projetos
+
+def run_scheduler(opcoes, projetos, args, fields):
+    """Sincroniza vários projetos, cada um no seu intervalo
+
+    Até parallel_projects projetos rodam ao mesmo tempo; entre os que estão
+    no horário, os de maior priority começam primeiro. Um projeto nunca tem
+    duas execuções simultâneas: a próxima só é agendada quando a atual
+    termina (interval segundos depois do início, ou logo, se já passou).
+    Todas as requisições dividem o orçamento global de concurrency e max_rps;
+    cada organização pode ter um max_rps menor, e um 429 pausa só ela.
+    Com once, cada projeto roda uma vez. Retorna o número de projetos com falha
+    na última execução.
+    """
+    slots = threading.BoundedSemaphore(opcoes['concurrency']) if opcoes['concurrency'] else None
+    limite_global = RateLimiter(opcoes['max_rps'])
+    paralelos = max(1, opcoes['parallel_projects'])
+    local = local_client(paralelos * args.concurrency, args.retries, slots)
+
+    # Um cliente (e um limitador) por organização, compartilhado pelos seus projetos
+    clientes = {}
+    for target in projetos:
+        chave_org = (target['org_url'], target['pat'])
+        if chave_org not in clientes:
+            clientes[chave_org] = azure_client(
+                paralelos * args.concurrency, RateLimiter(target['org_max_rps'], limite_global),
+                args.retries, target['pat'], slots)
+
+    proxima = {project_key(target): 0.0 for target in projetos}
+    falhas = {}
+    rodando = {}
+
+    def executar(target):
+        try:
+            return sync_project(target, args, clientes[(target['org_url'], target['pat'])], local, fields)
+        except Exception as e:  # uma falha não pode parar os outros projetos
+            print(f"✗ [{target['project']}] Erro inesperado na sincronização: {e}")
+            return None
+
+    with ThreadPoolExecutor(max_workers=paralelos) as executor:
+        while True:
+            agora = time.monotonic()
+            em_execucao = {project_key(target) for target, _ in rodando.values()}
+            devidos = sorted(
+                (target for target in projetos
+                 if proxima[project_key(target)] <= agora and project_key(target) not in em_execucao),
+                key=lambda target: -target['priority'])
+            for target in devidos[:paralelos - len(rodando)]:
+                rodando[executor.submit(executar, target)] = (target, agora)
+
+            if not rodando and args.once:
+                break
+
+            futuras = [tempo for tempo in proxima.values() if tempo != float('inf')]
+            espera = max(0.0, min(futuras) - time.monotonic()) if futuras else None
+            if not rodando:
+                if espera is None:
+                    break
+                time.sleep(espera)
+                continue
+
+            feitos, _ = wait(list(rodando), timeout=espera, return_when=FIRST_COMPLETED)
+            for future in feitos:
+                target, inicio = rodando.pop(future)
+                resultado = future.result()
+                chave = project_key(target)
+                falhas[chave] = resultado is None or resultado['erros'] > 0
+                proxima[chave] = float('inf') if args.once else inicio + target['interval']
+
+    for cliente in clientes.values():
+        cliente.close()
+    local.close()
+    return sum(falhas.values())
+
+def main(argv=None):
     """Função principal"""
+    args = parse_args(argv)
+    provider = setup_tracing() if args.otel else None
+    try:
+        run(args)
+    finally:
+        if provider:
+            provider.shutdown()
+
+def run(args):
+    """Sincroniza o projeto do ambiente ou, com --config, os projetos do agendador"""
+    fields = [campo.strip() for campo in args.fields.split(',') if campo.strip()]
+
     print("=== Sincronização com Azure DevOps ===")
     print(f"Data/Hora: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
     print()
-    
+
+    if args.config:
+        try:
+            opcoes, projetos = load_config(args.config)
+        except (OSError, ValueError, KeyError) as e:
+            print(f"ERRO: Configuração inválida ({args.config}): {e}")
+            sys.exit(1)
+        sem_pat = [project_key(target) for target in projetos if not target['pat']]
+        if not projetos or sem_pat:
+            print(f"ERRO: Nenhum projeto configurado ou PAT ausente: {', '.join(sem_pat)}")
+            sys.exit(1)
+        print(f"Agendando {len(projetos)} projetos ({opcoes['parallel_projects']} em paralelo)")
+        falhas = run_scheduler(opcoes, projetos, args, fields)
+        print("Sincronização concluída!" if not falhas else f"Sincronização concluída com {falhas} projetos com falha")
+        sys.exit(1 if falhas else 0)
+
     if not AZURE_PAT:
         print("ERRO: Azure PAT não configurado!")
         sys.exit(1)
-    
-    print("Buscando work items do Azure DevOps...")
-    work_items = get_azure_work_items()
-    
-    if work_items:
-        print(f"Encontrados {len(work_items.get('workItems', []))} work items")
-        print()
-        print("Sincronizando com a API local...")
-        sync_to_local_api(work_items)
-        print()
-        print("Sincronização concluída!")
-    else:
-        print("Nenhum work item encontrado ou erro na busca")
+
+    target = dict(env_target(), projeto_id=args.projeto_id)
+    azure = azure_client(args.concurrency, RateLimiter(args.max_rps), args.retries)
+    local = local_client(args.concurrency, args.retries)
+
+    resultado = sync_project(target, args, azure, local, fields)
+    print("Sincronização concluída!")
+    if resultado['erros']:
         sys.exit(1)
 
 if __name__ == "__main__":
@@ -0,0 +1,138 @@
+// Busca de operações do Catálogo de APIs
+// Usa o índice pré-gerado por scripts/generate-api-catalog.py (api-catalog/search/):
+// index.json diz em quais shards cada termo aparece; os shards por aplicação
+// só são baixados quando a busca precisa deles.
+(function() {
+  var LIMITE_RESULTADOS = 50
+
+  function tokenizar(texto) {
+    return texto
+      .replace(/([a-z0-9])([A-Z])/g, "$1 $2")
+      .toLowerCase()
+      .split(/[^0-9a-zà-ÿ]+/)
+      .filter(function(termo) { return termo.length >= 2 })
+  }
+
+  // Posições (shards ou operações) dos termos que começam com o prefixo
+  function buscarPrefixo(termos, chaves, prefixo) {
+    var inicio = 0, fim = chaves.length
+    while (inicio < fim) {
+      var meio = (inicio + fim) >> 1
+      if (chaves[meio] < prefixo) inicio = meio + 1
+      else fim = meio
+    }
+    var posicoes = new Set()
+    for (var i = inicio; i < chaves.length && chaves[i].indexOf(prefixo) === 0; i++) {
+      termos[chaves[i]].forEach(function(posicao) { posicoes.add(posicao) })
+    }
+    return posicoes
+  }
+
+  function intersecao(termos, chaves, consulta) {
+    var resultado = null
+    consulta.forEach(function(prefixo) {
+      var posicoes = buscarPrefixo(termos, chaves, prefixo)
+      resultado = resultado === null
+        ? posicoes
+        : new Set(Array.from(resultado).filter(function(p) { return posicoes.has(p) }))
+    })
+    return Array.from(resultado || []).sort(function(a, b) { return a - b })
+  }
+
+  function carregarJSON(url) {
+    return fetch(url).then(function(resposta) {
+      if (!resposta.ok) throw new Error(url + ": " + resposta.status)
+      return resposta.json()
+    })
+  }
+
+  function iniciar(container) {
+    var base = new URL(container.dataset.index, document.baseURI)
+    var campo = container.querySelector("input")
+    var lista = container.querySelector(".api-search-resultados")
+    var indice = null
+    var shards = {}
+    var espera = null
+
+    function obterIndice() {
+      if (!indice) {
+        indice = carregarJSON(base).then(function(dados) {
+          dados.chaves = Object.keys(dados.termos).sort()
+          return dados
+        })
+      }
+      return indice
+    }
+
+    function obterShard(arquivo) {
+      if (!shards[arquivo]) {
+        shards[arquivo] = carregarJSON(new URL(arquivo, base)).then(function(shard) {
+          shard.chaves = Object.keys(shard.termos).sort()
+          return shard
+        })
+      }
+      return shards[arquivo]
+    }
+
+    function exibir(resultados) {
+      lista.innerHTML = ""
+      resultados.slice(0, LIMITE_RESULTADOS).forEach(function(r) {
+        var op = r.operacao
+        var item = document.createElement("li")
+        var pagina = document.createElement("a")
+        var destino = (r.shard.paginas && r.shard.paginas[op[0]]) || r.shard.pagina
+        pagina.href = new URL("../" + destino, base).href
+        pagina.textContent = r.shard.aplicacao + " / " + op[0]
+        var spec = document.createElement("a")
+        spec.href = new URL("../" + op[6], base).href
+        spec.textContent = "spec"
+        var descricao = document.createElement("span")
+        descricao.textContent = " " + op[1] + " " + op[2] +
+          (op[3] ? " (" + op[3] + ")" : "") + (op[4] ? " — " + op[4] : "") + " "
+        item.appendChild(pagina)
+        item.appendChild(descricao)
+        item.appendChild(spec)
+        lista.appendChild(item)
+      })
+      if (resultados.length > LIMITE_RESULTADOS) {
+        var mais = document.createElement("li")
+        mais.textContent = "… e mais " + (resultados.length - LIMITE_RESULTADOS) + " operações"
+        lista.appendChild(mais)
+      }
+    }
+
+    function buscar() {
+      var consulta = tokenizar(campo.value)
+      if (consulta.length === 0) {
+        lista.innerHTML = ""
+        return
+      }
+      obterIndice().then(function(dados) {
+        var arquivos = intersecao(dados.termos, dados.chaves, consulta).map(function(posicao) {
+          return dados.shards[posicao][1]
+        })
+        return Promise.all(arquivos.map(obterShard))
+      }).then(function(carregados) {
+        var resultados = []
+        carregados.forEach(function(shard) {
+          intersecao(shard.termos, shard.chaves, consulta).forEach(function(posicao) {
+            resultados.push({ shard: shard, operacao: shard.operacoes[posicao] })
+          })
+        })
+        exibir(resultados)
+      }).catch(function(erro) {
+        lista.innerHTML = ""
+        console.error("Busca de operações indisponível:", erro)
+      })
+    }
+
+    campo.addEventListener("input", function() {
+      clearTimeout(espera)
+      espera = setTimeout(buscar, 150)
+    })
+  }
+
+  app.document$.subscribe(function() {
+    document.querySelectorAll(".api-search").forEach(iniciar)
+  })
+})()
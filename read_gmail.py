@@ -1,15 +1,35 @@
 import os.path
+import time
+import json
 import base64
+import sqlite3
+import argparse
 from email.message import EmailMessage
 
 from google.auth.transport.requests import Request
 from google.oauth2.credentials import Credentials
 from google_auth_oauthlib.flow import InstalledAppFlow
 from googleapiclient.discovery import build
+from googleapiclient.errors import HttpError
 
 # Escopo permitido (somente leitura)
 SCOPES = ['https://www.googleapis.com/auth/gmail.readonly']
 
+# Limite de chamadas por requisição batch da API do Gmail
+BATCH_MAX = 100
+# Máximo de ids por página de messages().list
+PAGE_MAX = 500
+METADATA_HEADERS = ['From', 'Subject', 'Date']
+# Rótulos que messages().list omite por padrão (includeSpamTrash): também ficam fora do cache
+OCULTAS = ('SPAM', 'TRASH')
+# Chamadas do batch recusadas por limite de taxa ou erro transitório são repetidas
+RETRY_STATUS = (429, 500, 503)
+MAX_TENTATIVAS = 3
+
+# Cache local dos metadados e do último historyId; opcional, pois a primeira
+# sincronização carrega a caixa inteira (vazio = sem cache)
+CACHE_DB = os.getenv('GMAIL_CACHE_DB', '')
+
 def autenticar():
     creds = None
 
@@ -33,37 +53,325 @@ def autenticar():
 
     return creds
 
-def listar_emails(max_results=10):
-    creds = autenticar()
-    service = build('gmail', 'v1', credentials=creds)
+def listar_ids(service, limite=None):
+    """Ids das mensagens, mais recentes primeiro, seguindo nextPageToken até limite (None = todas)"""
+    page_token = None
+    total = 0
+    while limite is None or total < limite:
+        results = service.users().messages().list(
+            userId='me',
+            maxResults=PAGE_MAX if limite is None else min(PAGE_MAX, limite - total),
+            pageToken=page_token
+        ).execute()
+
+        for msg in results.get('messages', []):
+            yield msg['id']
+            total += 1
 
-    results = service.users().messages().list(
-        userId='me',
-        maxResults=max_results
-    ).execute()
+        page_token = results.get('nextPageToken')
+        if not page_token:
+            return
 
-    messages = results.get('messages', [])
+def buscar_lote(service, ids):
+    """Metadados de até BATCH_MAX mensagens em uma única requisição batch
 
-    if not messages:
-        print('Nenhum e-mail encontrado.')
-        return
+    Chamadas recusadas com 429/5xx são repetidas (com espera crescente) em
+    um novo batch só com elas.
+    """
+    pendentes = list(dict.fromkeys(ids))
+    for tentativa in range(MAX_TENTATIVAS):
+        respostas = {}
+        repetir = []
+
+        def callback(request_id, response, exception):
+            if exception is None:
+                respostas[request_id] = response
+            elif isinstance(exception, HttpError) and exception.resp.status in RETRY_STATUS:
+                repetir.append(request_id)
+            else:
+                print(f"✗ Erro ao buscar a mensagem {request_id}: {exception}")
+
+        batch = service.new_batch_http_request(callback=callback)
+        for msg_id in pendentes:
+            batch.add(service.users().messages().get(
+                userId='me',
+                id=msg_id,
+                format='metadata',
+                metadataHeaders=METADATA_HEADERS
+            ), request_id=msg_id)
+        batch.execute()
+
+        for msg_id in pendentes:
+            if msg_id in respostas:
+                yield respostas[msg_id]
+
+        if not repetir:
+            return
+        pendentes = repetir
+        if tentativa < MAX_TENTATIVAS - 1:
+            time.sleep(2 ** tentativa)
+
+    print(f"⚠ {len(pendentes)} mensagens não foram buscadas (limite de taxa do Gmail)")
+
+def buscar_metadados(service, ids):
+    """Metadados das mensagens de ids, em batches de BATCH_MAX chamadas
+
+    Gerador: só um batch fica em memória por vez.
+    """
+    lote = []
+    for msg_id in ids:
+        lote.append(msg_id)
+        if len(lote) == BATCH_MAX:
+            yield from buscar_lote(service, lote)
+            lote = []
+    if lote:
+        yield from buscar_lote(service, lote)
+
+def resumo(msg_data):
+    headers = msg_data.get('payload', {}).get('headers', [])
+    email_info = {h['name']: h['value'] for h in headers}
+    return {
+        'id': msg_data['id'],
+        'threadId': msg_data.get('threadId'),
+        'From': email_info.get('From'),
+        'Subject': email_info.get('Subject'),
+        'Date': email_info.get('Date'),
+        'labels': msg_data.get('labelIds', []),
+        'internalDate': int(msg_data.get('internalDate', 0)),
+    }
+
+def listar_emails(max_results=10, service=None):
+    """Gera os metadados das últimas max_results mensagens (None = todas)"""
+    if service is None:
+        service = build('gmail', 'v1', credentials=autenticar())
+
+    for msg_data in buscar_metadados(service, listar_ids(service, max_results)):
+        yield resumo(msg_data)
+
+def oculta(labels):
+    return any(label in OCULTAS for label in labels)
+
+def listar_emails_por_id(service, ids):
+    for msg_data in buscar_metadados(service, ids):
+        yield resumo(msg_data)
+
+class CacheEmails:
+    """Metadados das mensagens e último historyId sincronizado (SQLite)"""
+
+    def __init__(self, path):
+        self.conn = sqlite3.connect(path)
+        self.conn.executescript("""
+            CREATE TABLE IF NOT EXISTS mensagens (
+                id TEXT PRIMARY KEY,
+                thread_id TEXT,
+                remetente TEXT,
+                assunto TEXT,
+                data TEXT,
+                labels TEXT,
+                data_interna INTEGER
+            );
+            CREATE INDEX IF NOT EXISTS idx_mensagens_data ON mensagens (data_interna);
+            CREATE TABLE IF NOT EXISTS estado (chave TEXT PRIMARY KEY, valor TEXT);
+        """)
+
+    def history_id(self):
+        row = self.conn.execute("SELECT valor FROM estado WHERE chave = 'history_id'").fetchone()
+        return row[0] if row else None
+
+    def salvar(self, emails):
+        self.conn.executemany(
+            "INSERT OR REPLACE INTO mensagens VALUES (?, ?, ?, ?, ?, ?, ?)",
+            [(e['id'], e['threadId'], e['From'], e['Subject'], e['Date'],
+              json.dumps(e['labels']), e['internalDate']) for e in emails])
 
-    for msg in messages:
-        msg_data = service.users().messages().get(
+    def atualizar_labels(self, labels):
+        """labels: {id: [labelIds]}; mensagens fora do cache são ignoradas"""
+        self.conn.executemany(
+            "UPDATE mensagens SET labels = ? WHERE id = ?",
+            [(json.dumps(ids), msg_id) for msg_id, ids in labels.items()])
+
+    def remover(self, ids):
+        self.conn.executemany("DELETE FROM mensagens WHERE id = ?", [(msg_id,) for msg_id in ids])
+
+    def limpar(self):
+        self.conn.execute("DELETE FROM mensagens")
+        self.conn.execute("DELETE FROM estado WHERE chave = 'history_id'")
+
+    def concluir(self, history_id):
+        """Grava o historyId junto com as alterações da sincronização (uma transação)"""
+        self.conn.execute("INSERT OR REPLACE INTO estado VALUES ('history_id', ?)", (str(history_id),))
+        self.conn.commit()
+
+    def recentes(self, limite=None):
+        """Mensagens mais recentes, sem as de SPAM/TRASH (como a listagem da API)"""
+        filtro = ' AND '.join('labels NOT LIKE ?' for _ in OCULTAS)
+        rows = self.conn.execute(
+            "SELECT id, thread_id, remetente, assunto, data, labels, data_interna FROM mensagens "
+            f"WHERE {filtro} ORDER BY data_interna DESC LIMIT ?",
+            [f'%{json.dumps(label)}%' for label in OCULTAS] + [limite or -1])
+        for row in rows:
+            yield {'id': row[0], 'threadId': row[1], 'From': row[2], 'Subject': row[3],
+                   'Date': row[4], 'labels': json.loads(row[5]), 'internalDate': row[6]}
+
+    def total(self):
+        return self.conn.execute("SELECT COUNT(*) FROM mensagens").fetchone()[0]
+
+    def close(self):
+        self.conn.close()
+
+def visiveis(emails, ocultas):
+    """Filtra as mensagens que já estão em SPAM/TRASH, juntando os ids delas em ocultas"""
+    for email_info in emails:
+        if oculta(email_info['labels']):
+            ocultas.add(email_info['id'])
+        else:
+            yield email_info
+
+def salvar_em_lotes(cache, emails):
+    lote = []
+    for email_info in emails:
+        lote.append(email_info)
+        if len(lote) == BATCH_MAX:
+            cache.salvar(lote)
+            lote = []
+    if lote:
+        cache.salvar(lote)
+
+def sincronizacao_completa(service, cache, limite=None):
+    """Recarrega o cache com as mensagens mais recentes (None = a caixa inteira)"""
+    # O historyId é lido antes da listagem: o que chegar durante ela entra na próxima sincronização
+    history_id = service.users().getProfile(userId='me').execute()['historyId']
+    cache.limpar()
+    salvar_em_lotes(cache, visiveis(listar_emails(limite, service=service), set()))
+    cache.concluir(history_id)
+    return {'completa': True, 'novas': cache.total(), 'removidas': 0, 'alteradas': 0}
+
+def sincronizacao_incremental(service, cache, history_id):
+    """Aplica no cache o histórico desde history_id, página a página
+
+    Mensagens que entram em SPAM/TRASH saem do cache e as que saem de lá
+    são buscadas de novo, como se fossem novas. Levanta HttpError 404
+    quando o historyId expirou (o Gmail guarda cerca de uma semana de
+    histórico).
+    """
+    resultado = {'completa': False, 'novas': 0, 'removidas': 0, 'alteradas': 0}
+    page_token = None
+    while True:
+        results = service.users().history().list(
             userId='me',
-            id=msg['id'],
-            format='metadata',
-            metadataHeaders=['From', 'Subject', 'Date']
+            startHistoryId=history_id,
+            maxResults=PAGE_MAX,
+            pageToken=page_token
         ).execute()
 
-        headers = msg_data['payload']['headers']
-        email_info = {h['name']: h['value'] for h in headers}
+        # Registros em ordem: o estado final de cada mensagem na página vence
+        novas = {}
+        removidas = set()
+        labels = {}
+        for registro in results.get('history', []):
+            for item in registro.get('messagesAdded', []):
+                msg_id = item['message']['id']
+                if oculta(item['message'].get('labelIds', [])):
+                    novas.pop(msg_id, None)
+                    removidas.add(msg_id)
+                else:
+                    novas[msg_id] = True
+                    removidas.discard(msg_id)
+            for item in registro.get('messagesDeleted', []):
+                novas.pop(item['message']['id'], None)
+                labels.pop(item['message']['id'], None)
+                removidas.add(item['message']['id'])
+            for item in registro.get('labelsAdded', []) + registro.get('labelsRemoved', []):
+                msg = item['message']
+                atuais = msg.get('labelIds', [])
+                if oculta(atuais):
+                    # Movida para SPAM/TRASH: sai do cache
+                    novas.pop(msg['id'], None)
+                    labels.pop(msg['id'], None)
+                    removidas.add(msg['id'])
+                elif oculta(item.get('labelIds', [])):
+                    # Saiu de SPAM/TRASH: pode não estar no cache, então é buscada
+                    labels.pop(msg['id'], None)
+                    removidas.discard(msg['id'])
+                    novas[msg['id']] = True
+                elif msg['id'] not in novas and msg['id'] not in removidas:
+                    labels[msg['id']] = atuais
+
+        # Mensagens buscadas que já foram para SPAM/TRASH depois do registro também saem
+        ocultas = set()
+        salvar_em_lotes(cache, visiveis(listar_emails_por_id(service, novas), ocultas))
+        removidas |= ocultas
+        cache.remover(removidas)
+        cache.atualizar_labels(labels)
+        resultado['novas'] += len(novas) - len(ocultas)
+        resultado['removidas'] += len(removidas)
+        resultado['alteradas'] += len(labels)
+
+        page_token = results.get('nextPageToken')
+        if not page_token:
+            # Só grava o novo historyId no fim: uma sincronização interrompida é refeita
+            cache.concluir(results['historyId'])
+            return resultado
+
+def sincronizar(service, cache, completa=False, limite=None):
+    """Atualiza o cache pelo histórico do Gmail ou, sem historyId válido, por uma sincronização completa"""
+    history_id = cache.history_id()
+    if history_id and not completa:
+        try:
+            return sincronizacao_incremental(service, cache, history_id)
+        except HttpError as e:
+            if e.resp.status != 404:
+                raise
+            cache.conn.rollback()
+            print(f"⚠ historyId {history_id} expirou, refazendo a sincronização completa")
+    return sincronizacao_completa(service, cache, limite)
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description='Lista os e-mails mais recentes da conta Gmail')
+    parser.add_argument(
+        '--limite', type=int, default=int(os.getenv('GMAIL_LIMITE', '5')),
+        help='Total de mensagens listadas, seguindo a paginação (0 = todas; env GMAIL_LIMITE)')
+    parser.add_argument(
+        '--cache', default=CACHE_DB, metavar='ARQUIVO',
+        help='Ativa o cache SQLite dos metadados (ex.: gmail-cache.db); a primeira execução '
+             'carrega a caixa (veja --limite-sync) e as seguintes buscam só o que mudou pelo '
+             'histórico do Gmail (env GMAIL_CACHE_DB; padrão: sem cache)')
+    parser.add_argument(
+        '--sem-cache', dest='cache', action='store_const', const='',
+        help='Busca as mensagens direto da API, mesmo com GMAIL_CACHE_DB definido')
+    parser.add_argument(
+        '--completa', action='store_true',
+        help='Descarta o cache e refaz a sincronização completa')
+    parser.add_argument(
+        '--limite-sync', type=int, default=int(os.getenv('GMAIL_LIMITE_SYNC', '0')),
+        help='Mensagens carregadas na sincronização completa (0 = a caixa inteira; env GMAIL_LIMITE_SYNC)')
+    return parser.parse_args(argv)
 
+def main(argv=None):
+    args = parse_args(argv)
+
+    if args.cache:
+        service = build('gmail', 'v1', credentials=autenticar())
+        cache = CacheEmails(args.cache)
+        resultado = sincronizar(service, cache, args.completa, args.limite_sync or None)
+        print(f"✓ Cache {'recarregado' if resultado['completa'] else 'atualizado'}: "
+              f"{resultado['novas']} novas, {resultado['removidas']} removidas, "
+              f"{resultado['alteradas']} com rótulos alterados ({cache.total()} em cache)")
+        emails = list(cache.recentes(args.limite or None))
+        cache.close()
+    else:
+        emails = listar_emails(args.limite or None)
+
+    encontrados = 0
+    for email_info in emails:
+        encontrados += 1
         print('-' * 50)
-        print(f"From: {email_info.get('From')}")
-        print(f"Subject: {email_info.get('Subject')}")
-        print(f"Date: {email_info.get('Date')}")
+        print(f"From: {email_info['From']}")
+        print(f"Subject: {email_info['Subject']}")
+        print(f"Date: {email_info['Date']}")
 
-if __name__ == '__main__':
-    listar_emails(5)
+    if not encontrados:
+        print('Nenhum e-mail encontrado.')
 
+if __name__ == '__main__':
+    main()
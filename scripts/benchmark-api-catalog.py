@@ -0,0 +1,280 @@
+#!/usr/bin/env python3
+"""
+Benchmark de carga sintética do gerador de catálogo de APIs
+Cria um banco SQLite com N aplicações × M payloads (specs JSON/YAML de
+kilobytes a dezenas de megabytes) e executa scripts/generate-api-catalog.py
+contra ele, medindo tempo, pico de RSS e bytes gravados por fase
+"""
+
+import argparse
+import json
+import os
+import random
+import re
+import shutil
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import yaml
+
+GENERATOR_FILE = Path(__file__).parent / 'generate-api-catalog.py'
+
+SCHEMA = """
+    CREATE TABLE aplicacoes (
+        id TEXT PRIMARY KEY,
+        sigla TEXT NOT NULL,
+        descricao TEXT,
+        fase_ciclo_vida TEXT,
+        criticidade_negocio TEXT,
+        updated_at TEXT
+    );
+    CREATE TABLE payloads (
+        id TEXT PRIMARY KEY,
+        aplicacao_id TEXT NOT NULL REFERENCES aplicacoes(id),
+        sigla TEXT NOT NULL,
+        definicao TEXT,
+        descricao TEXT,
+        formato_arquivo TEXT,
+        conteudo_arquivo TEXT,
+        versao_openapi TEXT,
+        arquivo_valido INTEGER,
+        data_inicio TEXT,
+        data_termino TEXT,
+        updated_at TEXT
+    );
+"""
+
+FASES_CICLO_VIDA = ['Produção', 'Desenvolvimento', 'Homologação', 'Manutenção', 'Desativação']
+
+def parse_size(texto):
+    """Converte '4KB', '1.5MB', '512' em bytes"""
+    match = re.fullmatch(r'\s*([\d.]+)\s*([KMG]?B?)\s*', texto.upper())
+    if not match:
+        raise argparse.ArgumentTypeError(f"Tamanho inválido: {texto}")
+    fator = {'': 1, 'B': 1, 'K': 1024, 'KB': 1024, 'M': 1024 ** 2, 'MB': 1024 ** 2,
+             'G': 1024 ** 3, 'GB': 1024 ** 3}[match.group(2)]
+    return int(float(match.group(1)) * fator)
+
+def format_size(total):
+    for unidade in ('B', 'KB', 'MB', 'GB'):
+        if total < 1024 or unidade == 'GB':
+            return f"{total:.1f} {unidade}" if unidade != 'B' else f"{total} B"
+        total /= 1024
+
+def synthetic_spec(rng, nome, tamanho):
+    """Spec OpenAPI sintética com aproximadamente `tamanho` bytes em JSON"""
+    def operacao(i):
+        return {
+            'get': {
+                'operationId': f"listar{nome}Recurso{i}",
+                'summary': f"Lista o recurso {i} de {nome}",
+                'tags': [f"grupo{i % 7}"],
+                'parameters': [{'name': 'pagina', 'in': 'query', 'schema': {'type': 'integer'}}],
+                'responses': {'200': {'description': 'OK', 'content': {'application/json': {
+                    'schema': {'$ref': f"#/components/schemas/Recurso{i % 50}"}}}}}
+            },
+            'post': {
+                'operationId': f"criar{nome}Recurso{i}",
+                'summary': f"Cria o recurso {i} ({rng.randint(0, 10 ** 6)})",
+                'responses': {'201': {'description': 'Criado'}}
+            }
+        }
+
+    tamanho_path = len(json.dumps(operacao(0)))
+    total_paths = max(1, tamanho // tamanho_path)
+    return {
+        'openapi': '3.0.3',
+        'info': {'title': f"API {nome}", 'version': '1.0.0'},
+        'servers': [{'url': f"https://api.exemplo.gov.br/{nome.lower()}"}],
+        'tags': [{'name': f"grupo{i}"} for i in range(7)],
+        'paths': {f"/{nome.lower()}/recursos/{i}": operacao(i) for i in range(total_paths)},
+        'components': {'schemas': {
+            f"Recurso{i}": {'type': 'object', 'properties': {'id': {'type': 'integer'}}}
+            for i in range(min(50, total_paths))
+        }}
+    }
+
+def build_fixture(db_path, aplicacoes, payloads, tamanhos, formato, seed):
+    """Cria o banco SQLite sintético; retorna o total de bytes de specs"""
+    rng = random.Random(seed)
+    dumper = getattr(yaml, 'CSafeDumper', yaml.SafeDumper)
+    conn = sqlite3.connect(db_path)
+    conn.executescript(SCHEMA)
+    total_bytes = 0
+    for a in range(aplicacoes):
+        app_id = f"app-{a}"
+        conn.execute(
+            "INSERT INTO aplicacoes VALUES (?, ?, ?, ?, ?, ?)",
+            (app_id, f"APP{a:05d}", f"Aplicação sintética {a}",
+             FASES_CICLO_VIDA[a % len(FASES_CICLO_VIDA)], 'Alta', '2025-01-01 00:00:00')
+        )
+        for p in range(payloads):
+            nome = f"A{a}P{p}"
+            spec = synthetic_spec(rng, nome, tamanhos[(a * payloads + p) % len(tamanhos)])
+            fmt = formato if formato != 'misto' else ('JSON' if p % 2 == 0 else 'YAML')
+            fmt = fmt.upper()
+            if fmt == 'JSON':
+                conteudo = json.dumps(spec, separators=(',', ':'))
+            else:
+                conteudo = yaml.dump(spec, Dumper=dumper, allow_unicode=True, sort_keys=False)
+            total_bytes += len(conteudo.encode('utf-8'))
+            conn.execute(
+                "INSERT INTO payloads VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (f"{app_id}-p{p}", app_id, f"PAYLOAD{p:04d}", f"API sintética {nome}",
+                 f"Descrição longa de {nome}" if p % 3 == 0 else None, fmt, conteudo,
+                 '3.0.3', 1, f"2024-{1 + p % 12:02d}-01", None, '2025-01-01 00:00:00')
+            )
+        conn.commit()
+    conn.close()
+    return total_bytes
+
+def touch_payloads(db_path, percentual, seed):
+    """Altera uma fração dos payloads para simular edição entre execuções"""
+    conn = sqlite3.connect(db_path)
+    ids = [row[0] for row in conn.execute("SELECT id FROM payloads ORDER BY id")]
+    alterados = random.Random(seed).sample(ids, max(1, int(len(ids) * percentual / 100)))
+    conn.executemany(
+        "UPDATE payloads SET definicao = definicao || ' (editado)', "
+        "updated_at = '2026-01-01 00:00:00' WHERE id = ?",
+        [(i,) for i in alterados]
+    )
+    conn.commit()
+    conn.close()
+    return len(alterados)
+
+def snapshot(diretorio):
+    """Tamanho e mtime de cada arquivo do diretório de saída"""
+    estado = {}
+    for raiz, _, arquivos in os.walk(diretorio):
+        for nome in arquivos:
+            caminho = os.path.join(raiz, nome)
+            info = os.stat(caminho)
+            estado[caminho] = (info.st_size, info.st_mtime_ns)
+    return estado
+
+def run_phase(nome, comando, output_dir, report_file):
+    """Executa o gerador em um subprocesso e mede tempo, pico de RSS e bytes gravados"""
+    antes = snapshot(output_dir)
+    inicio = time.perf_counter()
+    processo = subprocess.Popen(comando, stdout=subprocess.PIPE, stderr=subprocess.STDOUT)
+    saida = processo.stdout.read()
+    _, status, uso = os.wait4(processo.pid, 0)
+    processo.returncode = os.waitstatus_to_exitcode(status)
+    duracao = time.perf_counter() - inicio
+    depois = snapshot(output_dir)
+
+    alterados = [caminho for caminho, info in depois.items() if antes.get(caminho) != info]
+    resultado = {
+        'fase': nome,
+        'tempo_s': round(duracao, 3),
+        # ru_maxrss é em KB no Linux e em bytes no macOS
+        'rss_pico_bytes': uso.ru_maxrss * (1 if sys.platform == 'darwin' else 1024),
+        'bytes_escritos': sum(depois[caminho][0] for caminho in alterados),
+        'arquivos_escritos': len(alterados),
+        'arquivos_removidos': len(set(antes) - set(depois)),
+        'codigo_saida': processo.returncode
+    }
+    # Tempo por fase medido pelo próprio gerador (--report-file)
+    try:
+        with open(report_file, 'r', encoding='utf-8') as f:
+            resultado['fases_gerador'] = {
+                nome: fase['segundos'] for nome, fase in json.load(f)['fases'].items()
+            }
+    except (OSError, ValueError, KeyError):
+        resultado['fases_gerador'] = {}
+    if processo.returncode != 0:
+        print(saida.decode('utf-8', errors='replace'))
+        print(f"✗ Fase {nome} terminou com código {processo.returncode}")
+    return resultado
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Benchmark de carga sintética de generate-api-catalog.py",
+        epilog="Argumentos após '--' são repassados ao gerador (ex.: -- --workers 4 --stream)")
+    parser.add_argument('--aplicacoes', type=int, default=20, help="Número de aplicações (padrão: 20)")
+    parser.add_argument('--payloads', type=int, default=10, help="Payloads por aplicação (padrão: 10)")
+    parser.add_argument('--tamanhos', type=parse_size, nargs='+', default=[parse_size('8KB')],
+                        metavar='TAMANHO',
+                        help="Tamanhos das specs, usados em rodízio (ex.: 4KB 1MB 20MB; padrão: 8KB)")
+    parser.add_argument('--formato', choices=['json', 'yaml', 'misto'], default='misto',
+                        help="Formato das specs (padrão: misto)")
+    parser.add_argument('--alterar', type=float, default=1.0, metavar='PCT',
+                        help="Percentual de payloads editados antes da fase delta (padrão: 1)")
+    parser.add_argument('--output-dir', metavar='DIR',
+                        help="Diretório de trabalho (padrão: diretório temporário)")
+    parser.add_argument('--manter', action='store_true',
+                        help="Não apaga o diretório de trabalho ao final")
+    parser.add_argument('--json-report', metavar='ARQUIVO', help="Grava os resultados em JSON")
+    parser.add_argument('--seed', type=int, default=42)
+    args, extras = parser.parse_known_args()
+    extras = [arg for arg in extras if arg != '--']
+
+    trabalho = Path(args.output_dir or tempfile.mkdtemp(prefix='api-catalog-bench-'))
+    trabalho.mkdir(parents=True, exist_ok=True)
+    db_path = trabalho / 'payloads.sqlite'
+    output_dir = trabalho / 'api-catalog'
+    mkdocs_file = trabalho / 'mkdocs.yml'
+    report_file = trabalho / 'catalog-run.json'
+    if db_path.exists():
+        db_path.unlink()
+    shutil.rmtree(output_dir, ignore_errors=True)
+    output_dir.mkdir()
+    mkdocs_file.write_text('site_name: benchmark\nnav:\n  - "Catálogo de APIs":\n'
+                           '      - "Visão Geral": "api-catalog/index.md"\n', encoding='utf-8')
+
+    print(f"Gerando fixture: {args.aplicacoes} aplicações × {args.payloads} payloads "
+          f"({args.formato}, {', '.join(format_size(t) for t in args.tamanhos)})...")
+    inicio = time.perf_counter()
+    bytes_specs = build_fixture(db_path, args.aplicacoes, args.payloads, args.tamanhos,
+                                args.formato, args.seed)
+    print(f"✓ Fixture criada em {time.perf_counter() - inicio:.1f}s "
+          f"({format_size(bytes_specs)} de specs em {db_path})\n")
+
+    comando = [
+        sys.executable, str(GENERATOR_FILE),
+        '--sqlite', str(db_path),
+        '--output-dir', str(output_dir),
+        '--mkdocs-file', str(mkdocs_file),
+        '--cache-file', str(trabalho / 'specs-cache.sqlite'),
+        '--report-file', str(report_file),
+        *extras
+    ]
+
+    resultados = [run_phase('completa', comando + ['--delta'], output_dir, report_file)]
+    resultados.append(run_phase('sem-alteracoes', comando, output_dir, report_file))
+    alterados = touch_payloads(db_path, args.alterar, args.seed)
+    resultados.append(run_phase(f"delta ({alterados} editados)", comando + ['--delta'],
+                                output_dir, report_file))
+
+    print(f"{'fase':<24} {'tempo (s)':>10} {'RSS pico':>12} {'escritos':>12} {'arquivos':>9}")
+    for r in resultados:
+        print(f"{r['fase']:<24} {r['tempo_s']:>10.2f} {format_size(r['rss_pico_bytes']):>12} "
+              f"{format_size(r['bytes_escritos']):>12} {r['arquivos_escritos']:>9}")
+        fases = sorted(r['fases_gerador'].items(), key=lambda item: -item[1])[:4]
+        if fases:
+            print(f"{'':<24} " + '  '.join(f"{nome} {segundos:.2f}s" for nome, segundos in fases))
+
+    if args.json_report:
+        with open(args.json_report, 'w', encoding='utf-8') as f:
+            json.dump({
+                'parametros': {
+                    'aplicacoes': args.aplicacoes, 'payloads': args.payloads,
+                    'tamanhos': args.tamanhos, 'formato': args.formato,
+                    'bytes_specs': bytes_specs, 'argumentos_gerador': extras
+                },
+                'fases': resultados
+            }, f, indent=2, ensure_ascii=False)
+        print(f"\n✓ Relatório gravado em {args.json_report}")
+
+    if not args.manter and not args.output_dir:
+        shutil.rmtree(trabalho, ignore_errors=True)
+
+    if any(r['codigo_saida'] != 0 for r in resultados):
+        sys.exit(1)
+
+if __name__ == '__main__':
+    main()
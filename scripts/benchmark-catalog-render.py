@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmark da renderização das páginas do catálogo de APIs
+Mede o tempo de render_aplicacao_page / render_index_page para aplicações
+sintéticas com 10, 1.000 e 10.000 payloads (sem banco e sem gravar em disco)
+"""
+
+import argparse
+import importlib.util
+import time
+from datetime import date
+from pathlib import Path
+
+GENERATOR_FILE = Path(__file__).parent / 'generate-api-catalog.py'
+
+def load_generator():
+    """Importa scripts/generate-api-catalog.py como módulo"""
+    spec = importlib.util.spec_from_file_location('generate_api_catalog', GENERATOR_FILE)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+def synthetic_payloads(total, sigla='BENCH'):
+    """Gera payloads sintéticos de uma aplicação (specs YAML mínimas)"""
+    return [
+        {
+            'id': f"{sigla}-{i}",
+            'aplicacao_id': sigla,
+            'payload_sigla': f"PAYLOAD{i:05d}",
+            'descricao_curta': f"API sintética {i}",
+            'descricao_longa': f"Descrição longa da API sintética {i}" if i % 2 else None,
+            'formato_arquivo': 'YAML',
+            'conteudo_arquivo': f"openapi: 3.0.0\ninfo:\n  title: API {i}\n  version: '1.0'\npaths: {{}}\n",
+            'versao_openapi': '3.0.0',
+            'arquivo_valido': True,
+            'data_inicio': date(2024, 1, 1),
+            'data_termino': date(2025, 1, 1) if i % 10 == 0 else None,
+            'aplicacao_sigla': sigla,
+            'aplicacao_descricao': 'Aplicação sintética de benchmark',
+            'fase_ciclo_vida': 'Produção',
+            'criticidade_negocio': 'Alta',
+        }
+        for i in range(total)
+    ]
+
+def bench(fn, repeticoes):
+    """Executa fn repetidas vezes e retorna o melhor tempo em segundos"""
+    melhor = float('inf')
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        fn()
+        melhor = min(melhor, time.perf_counter() - inicio)
+    return melhor
+
+def main():
+    parser = argparse.ArgumentParser(description="Micro-benchmark da renderização do catálogo de APIs")
+    parser.add_argument('--tamanhos', type=int, nargs='+', default=[10, 1000, 10000],
+                        help="Quantidades de payloads por aplicação (padrão: 10 1000 10000)")
+    parser.add_argument('--repeticoes', type=int, default=5,
+                        help="Repetições por medição; reporta o melhor tempo (padrão: 5)")
+    parser.add_argument('--templates-dir', metavar='DIR',
+                        help="Diretório de templates, como em generate-api-catalog.py")
+    args = parser.parse_args()
+
+    generator = load_generator()
+    templates = generator.load_templates(args.templates_dir)
+
+    print(f"{'payloads':>10} {'página (ms)':>12} {'µs/payload':>11} {'bytes':>12} {'índice (ms)':>12}")
+    for total in args.tamanhos:
+        payloads = synthetic_payloads(total)
+        pagina = generator.render_aplicacao_page('BENCH', payloads, templates)
+        t_pagina = bench(lambda: generator.render_aplicacao_page('BENCH', payloads, templates), args.repeticoes)
+
+        # Índice com uma aplicação por payload, para o mesmo volume de linhas
+        resumos = {f"APP{i:05d}": {'aplicacao_descricao': 'Aplicação sintética', 'total_apis': 1}
+                   for i in range(total)}
+        t_indice = bench(lambda: generator.render_index_page(resumos, templates), args.repeticoes)
+
+        print(f"{total:>10} {t_pagina * 1000:>12.2f} {t_pagina / total * 1e6:>11.2f} "
+              f"{len(pagina['content'].encode('utf-8')):>12} {t_indice * 1000:>12.2f}")
+
+if __name__ == '__main__':
+    main()
@@ -4,13 +4,37 @@ Script para gerar catálogo de APIs no MkDocs
 Lê payloads da tabela e gera páginas organizadas por aplicação
 """
 
-import mysql.connector
+import argparse
+import gzip
 import os
 import json
+import hashlib
+import io
+import itertools
+import re
+import shutil
+import sqlite3
+import time
 import yaml
+from collections import deque
+from contextlib import contextmanager
+from string import Template
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime
+from json.decoder import scanstring
 from pathlib import Path
 
+try:
+    import mysql.connector
+    import mysql.connector.pooling
+except ImportError:  # permite usar --sqlite sem o conector MySQL instalado
+    mysql = None
+
+try:
+    import brotli
+except ImportError:  # sem o pacote brotli, --precompress gera apenas .gz
+    brotli = None
+
 # Configuração do banco de dados
 DB_CONFIG = {
     'host': os.getenv('MYSQL_HOST', 'localhost'),
@@ -21,61 +45,959 @@ DB_CONFIG = {
     'charset': 'utf8mb4'
 }
 
+class DataSourceError(Exception):
+    """Falha ao obter conexão com a origem dos payloads"""
+
+# Erros de banco tratados pelo gerador (MySQL e SQLite)
+DB_ERRORS = (DataSourceError, sqlite3.Error) + ((mysql.connector.Error,) if mysql else ())
+
 # Diretórios
 DOCS_DIR = Path(__file__).parent.parent / 'docs' / 'api-catalog'
 OPENAPI_DIR = DOCS_DIR / 'openapi'
+SEARCH_DIR = DOCS_DIR / 'search'
+MANIFEST_FILE = DOCS_DIR / '.catalog-manifest.json'
+STATE_FILE = DOCS_DIR / '.catalog-state.json'
+MKDOCS_FILE = Path(__file__).parent.parent / 'mkdocs.yml'
+
+# Delimitadores do bloco de navegação gerado em mkdocs.yml
+NAV_INICIO = '# >>> api-catalog'
+NAV_FIM = '# <<< api-catalog'
+SPEC_CACHE_FILE = Path(__file__).parent.parent / '.cache' / 'api-catalog' / 'specs.sqlite'
+# Relatório da execução: fora de docs/ para execuções sem alteração não tocarem no site
+RUN_REPORT_FILE = SPEC_CACHE_FILE.parent / 'catalog-run.json'
+# Incrementar quando o formato do resumo mudar (invalida o cache)
+SPEC_CACHE_VERSION = 3
+
+# Variantes das specs geradas com --precompress (.min.json, .gz, .br).
+# Abaixo deste tamanho a compressão não compensa (como gzip_min_length do nginx)
+PRECOMPRESS_MIN_BYTES = 1024
+
+# Conteúdos únicos das specs com --dedup (openapi/.blobs/<sha256>.<ext>);
+# diretórios ocultos não são publicados pelo MkDocs
+SPEC_BLOBS_DIR = '.blobs'
+
+# Specs JSON acima deste tamanho são reformatadas em partes (--stream-json-threshold)
+JSON_STREAM_THRESHOLD = 8 * 1024 * 1024
+
+HTTP_METHODS = ('get', 'put', 'post', 'delete', 'options', 'head', 'patch', 'trace')
+
+# Payloads válidos com sua aplicação; a ordenação por sigla permite
+# agrupar por aplicação em fluxo contínuo (modo --stream)
+PAYLOADS_QUERY = """
+    SELECT 
+        p.id,
+        p.aplicacao_id,
+        p.sigla as payload_sigla,
+        p.definicao as descricao_curta,
+        p.descricao as descricao_longa,
+        p.formato_arquivo,
+        p.conteudo_arquivo,
+        p.versao_openapi,
+        p.arquivo_valido,
+        p.data_inicio,
+        p.data_termino,
+        a.sigla as aplicacao_sigla,
+        a.descricao as aplicacao_descricao,
+        a.fase_ciclo_vida,
+        a.criticidade_negocio
+    FROM payloads p
+    INNER JOIN aplicacoes a ON p.aplicacao_id = a.id
+    WHERE p.arquivo_valido = TRUE{filtro}
+    ORDER BY a.sigla, p.data_inicio DESC
+"""
+
+# Consulta leve para o modo --delta: um marcador por payload calculado no
+# próprio banco (MD5 das colunas usadas na renderização, incluindo o MD5 do
+# conteúdo), sem trafegar conteudo_arquivo
+PAYLOADS_METADATA_QUERY = """
+    SELECT 
+        p.id,
+        a.sigla as aplicacao_sigla,
+        a.descricao as aplicacao_descricao,
+        MD5(CONCAT_WS('|',
+            p.sigla, p.definicao, p.descricao, p.formato_arquivo,
+            p.versao_openapi, p.data_inicio, p.data_termino,
+            a.descricao, a.fase_ciclo_vida, a.criticidade_negocio,
+            MD5(p.conteudo_arquivo)
+        )) as marcador
+    FROM payloads p
+    INNER JOIN aplicacoes a ON p.aplicacao_id = a.id
+    WHERE p.arquivo_valido = TRUE
+    ORDER BY a.sigla, p.data_inicio DESC
+"""
+
+
+# Impressão digital barata do conjunto de payloads, consultada a cada ciclo
+# do modo --watch antes de rodar a consulta de metadados do --delta
+CATALOG_FINGERPRINT_QUERY = """
+    SELECT 
+        COUNT(*) as total,
+        MAX(p.updated_at) as payloads_atualizados_em,
+        MAX(a.updated_at) as aplicacoes_atualizadas_em
+    FROM payloads p
+    INNER JOIN aplicacoes a ON p.aplicacao_id = a.id
+    WHERE p.arquivo_valido = TRUE
+"""
+
+# Templates das páginas (string.Template). Cada um pode ser sobrescrito por
+# um arquivo <nome>.md no diretório indicado em --templates-dir
+TEMPLATE_SOURCES = {
+    'aplicacao': """# ${aplicacao_sigla} - Catálogo de APIs
+
+## Aplicação: ${aplicacao_sigla}
+
+**Descrição:** ${aplicacao_descricao}  
+**Criticidade:** ${criticidade}  
+**Total de APIs:** ${total_apis}
+
+---
+
+## APIs Disponíveis
+
+""",
+    'payload': """### ${payload_sigla}
+
+**Status:** ${status}  
+**Descrição Curta:** ${descricao_curta}  
+${descricao_longa_linha}**Versão OpenAPI:** ${versao_openapi}  
+**Data de Início:** ${data_inicio}  
+${data_termino_linha}${endpoints_linha}${openapi_secao}---
+
+""",
+    'payload_descricao_longa': """**Descrição Longa:** ${descricao_longa}  
+""",
+    'payload_data_termino': """**Data de Término:** ${data_termino}  
+""",
+    'aplicacao_shard_item': """- [${payload_sigla}](${pagina}) — ${status} — ${descricao_curta}
+""",
+    'payload_pagina': """# ${aplicacao_sigla} / ${payload_sigla}
+
+[← ${aplicacao_sigla}](../${aplicacao_pagina})
+
+""",
+    'payload_endpoints': """**Endpoints:** ${operacoes} operações em ${paths} paths  
+""",
+    'payload_openapi': """
+#### Especificação OpenAPI
+
+```yaml
+Arquivo: ${openapi_path}
+```
+
+!!! tip "Testar API"
+    Para testar esta API interativamente, você pode:
+    
+    1. Baixar o arquivo OpenAPI: [${openapi_path}](/${openapi_path})
+    2. Importar no [Swagger Editor](https://editor.swagger.io/)
+    3. Ou usar ferramentas como Postman, Insomnia ou curl
+
+""",
+    'index': """# Catálogo de APIs - Governança e Testes
+
+## Visão Geral
+
+Este catálogo apresenta todas as APIs documentadas no formato OpenAPI, organizadas por aplicação.
+
+### Governança
+
+Cada API possui:
+
+- ✅ **Status operacional**: Indica se a API está ativa, em desenvolvimento ou depreciada
+- 📋 **Metadados**: Nome, sigla, versão, datas de início e término
+- 📖 **Documentação**: Descrição curta e longa para contexto completo
+- 🔧 **Especificação OpenAPI**: Arquivo JSON/YAML para integração e testes
+
+### Como usar este catálogo
+
+1. Navegue pelas aplicações listadas abaixo
+2. Acesse a página de cada aplicação para ver suas APIs
+3. Baixe os arquivos OpenAPI para integração
+4. Use ferramentas como Swagger Editor ou Postman para testar
+
+---
+
+## Aplicações
+
+**Total de Aplicações:** ${total_aplicacoes}  
+**Total de APIs:** ${total_apis}
+
+${busca_secao}""",
+    'index_busca': """### Buscar operações
+
+<div class="api-search" data-index="search/index.json" markdown="0">
+  <input type="search" placeholder="Path, método, operationId, tag ou resumo" aria-label="Buscar operações">
+  <ul class="api-search-resultados"></ul>
+</div>
+
+""",
+    'index_aplicacao': """### [${aplicacao_sigla}](${pagina})
+
+**Descrição:** ${aplicacao_descricao}  
+**APIs disponíveis:** ${total_apis}
+
+""",
+}
+
+def load_templates(templates_dir=None, avisar=True):
+    """Compila os templates das páginas, aplicando sobrescritas de templates_dir"""
+    sources = dict(TEMPLATE_SOURCES)
+    if templates_dir:
+        for nome in sources:
+            override = Path(templates_dir) / f"{nome}.md"
+            if override.is_file():
+                sources[nome] = override.read_text(encoding='utf-8')
+                if avisar:
+                    print(f"✓ Template sobrescrito: {override}")
+    return {nome: Template(texto) for nome, texto in sources.items()}
+
+
+class DigestWriter:
+    """Arquivo binário que acumula o SHA-256 e o tamanho do que é gravado"""
+
+    def __init__(self, arquivo):
+        self.arquivo = arquivo
+        self.sha = hashlib.sha256()
+        self.bytes = 0
+
+    def write(self, data):
+        self.arquivo.write(data)
+        self.sha.update(data)
+        self.bytes += len(data)
+        return len(data)
+
+class CatalogManifest:
+    """Manifesto de hashes dos arquivos gerados
+
+    Guarda o SHA-256 de cada página/especificação gerada para que execuções
+    seguintes só reescrevam o que mudou (preservando o mtime dos demais
+    arquivos e evitando rebuild completo do MkDocs).
+    """
+
+    def __init__(self, path=None):
+        self.path = Path(path) if path else MANIFEST_FILE
+        self.entries = {}
+        # aplicação -> chaves dos seus arquivos, para keep/pages sem percorrer o manifesto
+        self.por_aplicacao = {}
+        self.seen = set()
+        self.stats = {'escritos': 0, 'inalterados': 0, 'removidos': 0, 'bytes_escritos': 0}
+        self.dirty = False
+
+    @classmethod
+    def load(cls, path=None):
+        """Carrega o manifesto da última execução (vazio se não existir)"""
+        manifest = cls(path)
+        try:
+            with open(manifest.path, 'r', encoding='utf-8') as f:
+                manifest.entries = json.load(f).get('arquivos', {})
+        except FileNotFoundError:
+            pass
+        except (OSError, ValueError) as e:
+            print(f"⚠ Manifesto inválido, regenerando tudo: {e}")
+        for key, entry in manifest.entries.items():
+            if entry.get('aplicacao'):
+                manifest.por_aplicacao.setdefault(entry['aplicacao'], set()).add(key)
+        return manifest
+
+    def _key(self, filepath):
+        return Path(filepath).relative_to(DOCS_DIR).as_posix()
+
+    def _set_aplicacao(self, key, aplicacao):
+        """Associa a entrada de key a uma aplicação (None = nenhuma), atualizando o índice"""
+        entry = self.entries[key]
+        anterior = entry.get('aplicacao')
+        if anterior == aplicacao:
+            return
+        if anterior:
+            self.por_aplicacao.get(anterior, set()).discard(key)
+        if aplicacao:
+            entry['aplicacao'] = aplicacao
+            self.por_aplicacao.setdefault(aplicacao, set()).add(key)
+        else:
+            del entry['aplicacao']
+        self.dirty = True
+
+    def _set_entry(self, key, entry, aplicacao=None):
+        if key in self.entries:
+            self._set_aplicacao(key, None)
+        self.entries[key] = entry
+        self._set_aplicacao(key, aplicacao)
+
+    def write(self, filepath, content, aplicacao=None):
+        """Grava o arquivo apenas se o conteúdo mudou. Retorna True se gravou."""
+        key = self._key(filepath)
+        data = content if isinstance(content, bytes) else content.encode('utf-8')
+        digest = hashlib.sha256(data).hexdigest()
+        self.seen.add(key)
+
+        entry = self.entries.get(key)
+        if entry and entry.get('blob'):
+            # Era um link para um blob (--dedup): desfazer antes de gravar,
+            # para não alterar o blob e os demais links
+            Path(filepath).unlink(missing_ok=True)
+        elif entry and entry.get('sha256') == digest:
+            try:
+                if Path(filepath).stat().st_size == entry.get('bytes'):
+                    if aplicacao:
+                        self._set_aplicacao(key, aplicacao)
+                    self.stats['inalterados'] += 1
+                    return False
+            except OSError:
+                pass
+
+        # Temporário renomeado no final: quem lê (mkdocs serve, --watch) nunca vê
+        # o arquivo pela metade, e um link para blob (--dedup) sem entrada no
+        # manifesto é substituído em vez de ter o blob sobrescrito
+        filepath = Path(filepath)
+        filepath.parent.mkdir(parents=True, exist_ok=True)
+        temporario = filepath.with_name(f".{filepath.name}.{os.getpid()}.tmp")
+        try:
+            with open(temporario, 'wb') as f:
+                f.write(data)
+            os.replace(temporario, filepath)
+        except BaseException:
+            temporario.unlink(missing_ok=True)
+            raise
+        self._set_entry(key, {'sha256': digest, 'bytes': len(data)}, aplicacao)
+        self.stats['escritos'] += 1
+        self.stats['bytes_escritos'] += len(data)
+        self.dirty = True
+        return True
+
+    def write_stream(self, filepath, origem, gerar, aplicacao=None):
+        """Grava um arquivo em partes, sem montá-lo em memória
+
+        origem identifica a entrada (ex.: SHA-256 da spec original): se não
+        mudou e o arquivo existe com o mesmo tamanho, nada é gravado.
+        gerar(f) escreve o conteúdo em f; a saída vai para um temporário
+        renomeado no final, e se gerar falhar o temporário é descartado e o
+        arquivo anterior fica intacto. Retorna True se gravou.
+        """
+        filepath = Path(filepath)
+        key = self._key(filepath)
+        self.seen.add(key)
+        entry = self.entries.get(key)
+        if entry and entry.get('blob'):
+            filepath.unlink(missing_ok=True)
+        elif entry and entry.get('origem') == origem:
+            try:
+                if filepath.stat().st_size == entry.get('bytes'):
+                    if aplicacao:
+                        self._set_aplicacao(key, aplicacao)
+                    self.stats['inalterados'] += 1
+                    return False
+            except OSError:
+                pass
+        
+        filepath.parent.mkdir(parents=True, exist_ok=True)
+        temporario = filepath.with_name(f".{filepath.name}.{os.getpid()}.tmp")
+        try:
+            with open(temporario, 'wb') as f:
+                saida = DigestWriter(f)
+                gerar(saida)
+            os.replace(temporario, filepath)
+        except BaseException:
+            temporario.unlink(missing_ok=True)
+            raise
+        self._set_entry(key, {'sha256': saida.sha.hexdigest(), 'bytes': saida.bytes, 'origem': origem},
+                        aplicacao)
+        self.stats['escritos'] += 1
+        self.stats['bytes_escritos'] += saida.bytes
+        self.dirty = True
+        return True
+
+    def link(self, filepath, content, aplicacao=None, modo='hardlink'):
+        """Grava o conteúdo uma única vez em openapi/.blobs/ e cria filepath como link
+
+        O blob é endereçado pelo SHA-256 do conteúdo, então specs idênticas
+        compartilham o mesmo arquivo. modo é 'hardlink' ou 'symlink'
+        (relativo); se o sistema de arquivos não suportar, copia o blob.
+        Retorna True se filepath foi (re)criado.
+        """
+        filepath = Path(filepath)
+        data = content if isinstance(content, bytes) else content.encode('utf-8')
+        digest = hashlib.sha256(data).hexdigest()
+        blob = OPENAPI_DIR / SPEC_BLOBS_DIR / f"{digest}{filepath.suffix}"
+        blob_key = self._key(blob)
+        if blob_key not in self.seen:
+            self.write(blob, data)
+        
+        key = self._key(filepath)
+        self.seen.add(key)
+        entry = self.entries.get(key)
+        if entry and entry.get('blob') == blob_key and entry.get('modo') == modo:
+            try:
+                if filepath.stat().st_size == len(data):
+                    if aplicacao:
+                        self._set_aplicacao(key, aplicacao)
+                    self.stats['inalterados'] += 1
+                    return False
+            except OSError:
+                pass
+        
+        filepath.parent.mkdir(parents=True, exist_ok=True)
+        filepath.unlink(missing_ok=True)
+        try:
+            if modo == 'symlink':
+                os.symlink(os.path.relpath(blob, filepath.parent), filepath)
+            else:
+                os.link(blob, filepath)
+        except OSError:
+            # Sistema de arquivos sem suporte a links (ou blob em outro volume)
+            shutil.copyfile(blob, filepath)
+            self.stats['copias'] = self.stats.get('copias', 0) + 1
+        self._set_entry(key, {'sha256': digest, 'bytes': len(data), 'blob': blob_key, 'modo': modo},
+                        aplicacao)
+        self.stats['escritos'] += 1
+        self.dirty = True
+        return True
+
+    def dedup_stats(self):
+        """(links, conteúdos únicos) das specs deduplicadas nesta execução"""
+        blobs = [self.entries[key]['blob'] for key in self.seen
+                 if key in self.entries and self.entries[key].get('blob')]
+        return len(blobs), len(set(blobs))
 
-def connect_db():
+    def derived(self, filepath):
+        """Arquivos derivados (--precompress) registrados na entrada de filepath"""
+        return self.entries.get(self._key(filepath), {}).get('derivados')
+
+    def set_derived(self, filepath, derivados):
+        entry = self.entries.get(self._key(filepath))
+        if entry is not None and entry.get('derivados') != derivados:
+            entry['derivados'] = derivados
+            self.dirty = True
+
+    def reuse(self, filepath):
+        """Mantém um arquivo derivado sem regravá-lo. Retorna False se ele sumiu do disco."""
+        key = self._key(filepath)
+        entry = self.entries.get(key)
+        try:
+            if entry is None or Path(filepath).stat().st_size != entry.get('bytes'):
+                return False
+        except OSError:
+            return False
+        self.seen.add(key)
+        self.stats['inalterados'] += 1
+        if entry.get('blob') and entry['blob'] not in self.seen:
+            self.seen.add(entry['blob'])
+            self.stats['inalterados'] += 1
+        return True
+
+    def pages(self, aplicacao):
+        """Páginas markdown geradas para uma aplicação (para o nav do mkdocs.yml)"""
+        return sorted(key for key in self.por_aplicacao.get(aplicacao, ()) if key.endswith('.md'))
+
+    def keep(self, aplicacao):
+        """Mantém os arquivos de uma aplicação não regenerada. Retorna quantos foram mantidos."""
+        keys = [key for key in self.por_aplicacao.get(aplicacao, ()) if (DOCS_DIR / key).exists()]
+        self.seen.update(keys)
+        # Blobs (--dedup) referenciados pelos arquivos mantidos
+        self.seen.update(self.entries[key]['blob'] for key in keys if self.entries[key].get('blob'))
+        self.stats['inalterados'] += len(keys)
+        return len(keys)
+
+    def prune(self):
+        """Remove arquivos gerados anteriormente que não foram produzidos nesta execução"""
+        for key in sorted(set(self.entries) - self.seen):
+            filepath = DOCS_DIR / key
+            try:
+                filepath.unlink()
+                print(f"✓ Removido: {key}")
+                if filepath.parent not in (DOCS_DIR, OPENAPI_DIR, SEARCH_DIR) \
+                        and not any(filepath.parent.iterdir()):
+                    filepath.parent.rmdir()
+            except FileNotFoundError:
+                pass
+            except OSError as e:
+                print(f"✗ Erro ao remover {key}: {e}")
+                continue
+            self._set_aplicacao(key, None)
+            del self.entries[key]
+            self.stats['removidos'] += 1
+            self.dirty = True
+
+    def save(self):
+        """Persiste o manifesto ao lado dos arquivos gerados"""
+        if not self.dirty and self.path.exists():
+            return
+        data = {'arquivos': dict(sorted(self.entries.items()))}
+        try:
+            with open(self.path, 'w', encoding='utf-8') as f:
+                json.dump(data, f, indent=2, ensure_ascii=False)
+        except OSError as e:
+            print(f"⚠ Aviso: Não foi possível salvar o manifesto: {e}")
+
+class SpecCache:
+    """Cache local (SQLite) das especificações já processadas
+
+    A chave é o SHA-256 do formato + conteudo_arquivo. Guarda a
+    especificação já normalizada (JSON reformatado) e o resumo extraído
+    (operações, paths, tags, schemas, servers), para que specs inalteradas
+    não sejam parseadas novamente. Cada processo abre sua própria conexão.
+    A data de uso das entradas lidas é gravada em lote por flush(), no
+    máximo uma vez por dia para cada spec.
+    """
+
+    def __init__(self, path=None):
+        self.path = Path(path) if path else SPEC_CACHE_FILE
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.conn = sqlite3.connect(str(self.path), timeout=30, isolation_level=None)
+        self.hoje = datetime.now().date().isoformat()
+        self.usados = set()
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS specs (
+                hash TEXT PRIMARY KEY,
+                conteudo TEXT,
+                resumo TEXT,
+                usado_em TEXT NOT NULL
+            )
+        """)
+
+    @staticmethod
+    def key(formato, conteudo):
+        return hashlib.sha256(
+            f"{SPEC_CACHE_VERSION}\0{formato}\0{conteudo}".encode('utf-8')
+        ).hexdigest()
+
+    def get(self, key):
+        """Retorna (conteúdo normalizado ou None, resumo ou None), ou None se ausente"""
+        row = self.conn.execute(
+            "SELECT conteudo, resumo, usado_em FROM specs WHERE hash = ?", (key,)
+        ).fetchone()
+        if row is None:
+            return None
+        if row[2] != self.hoje:
+            self.usados.add(key)
+        return row[0], json.loads(row[1]) if row[1] else None
+
+    def put(self, key, conteudo, resumo):
+        self.conn.execute(
+            "INSERT OR REPLACE INTO specs (hash, conteudo, resumo, usado_em) VALUES (?, ?, ?, ?)",
+            (key, conteudo, json.dumps(resumo) if resumo is not None else None, self.hoje)
+        )
+
+    def flush(self):
+        """Grava, em uma única transação, a data de uso das entradas lidas desde o último flush"""
+        if not self.usados:
+            return
+        self.conn.execute("BEGIN")
+        try:
+            self.conn.executemany("UPDATE specs SET usado_em = ? WHERE hash = ?",
+                                  [(self.hoje, key) for key in self.usados])
+            self.conn.execute("COMMIT")
+        except sqlite3.Error:
+            self.conn.execute("ROLLBACK")
+            raise
+        self.usados.clear()
+
+    def purge(self, dias=30):
+        """Remove entradas não usadas há mais de `dias` dias"""
+        self.flush()
+        limite = datetime.fromordinal(datetime.now().toordinal() - dias).date().isoformat()
+        return self.conn.execute("DELETE FROM specs WHERE usado_em < ?", (limite,)).rowcount
+
+    def close(self):
+        self.flush()
+        self.conn.close()
+
+# Uma conexão de cache por processo (o pool de --workers usa processos separados)
+_spec_caches = {}
+
+def get_spec_cache(path):
+    """Retorna o cache de specs deste processo para o arquivo indicado (None = sem cache)"""
+    if not path:
+        return None
+    if path not in _spec_caches:
+        try:
+            _spec_caches[path] = SpecCache(path)
+        except sqlite3.Error as e:
+            print(f"⚠ Cache de specs indisponível ({path}): {e}")
+            _spec_caches[path] = None
+    return _spec_caches[path]
+
+class RunMetrics:
+    """Instrumentação de uma execução do gerador
+
+    Acumula o tempo de cada fase (conexão, consultas, renderização,
+    gravação, índices, nav) e os contadores de payloads e bytes lidos;
+    os bytes e arquivos gravados vêm das estatísticas do manifesto.
+    Com --workers, o tempo de 'render' é a soma dos processos do pool.
+    """
+
+    def __init__(self):
+        self.inicio = time.time()
+        self.relogio = time.perf_counter()
+        self.fases = {}
+        self.aplicacoes = {}
+        self.payloads = 0
+        self.bytes_lidos = 0
+
+    @contextmanager
+    def fase(self, nome):
+        """Cronometra um trecho, somando ao total da fase"""
+        inicio = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(nome, time.perf_counter() - inicio)
+
+    def add(self, nome, segundos):
+        fase = self.fases.setdefault(nome, {'segundos': 0.0, 'chamadas': 0})
+        fase['segundos'] += segundos
+        fase['chamadas'] += 1
+
+    def aplicacao(self, pagina):
+        """Registra o tempo de renderização e o volume lido de uma aplicação"""
+        self.add('render', pagina['tempo_render'])
+        self.payloads += pagina['resumo']['total_apis']
+        self.bytes_lidos += pagina['bytes_lidos']
+        self.aplicacoes[pagina['sigla']] = {
+            'render_segundos': round(pagina['tempo_render'], 4),
+            'payloads': pagina['resumo']['total_apis'],
+            'bytes_lidos': pagina['bytes_lidos']
+        }
+
+    def report(self, sucesso, manifest):
+        """Relatório JSON da execução"""
+        return {
+            'inicio': datetime.fromtimestamp(self.inicio).isoformat(timespec='seconds'),
+            'duracao_segundos': round(time.perf_counter() - self.relogio, 4),
+            'sucesso': sucesso,
+            'aplicacoes_renderizadas': len(self.aplicacoes),
+            'payloads': self.payloads,
+            'bytes_lidos': self.bytes_lidos,
+            'arquivos': manifest.stats,
+            'fases': {nome: {'segundos': round(fase['segundos'], 4), 'chamadas': fase['chamadas']}
+                      for nome, fase in self.fases.items()},
+            'aplicacoes': dict(sorted(self.aplicacoes.items()))
+        }
+
+    @staticmethod
+    def prometheus(report):
+        """Métricas no formato texto do Prometheus (textfile collector do node-exporter)"""
+        def metrica(nome, ajuda, valores):
+            linhas = [f"# HELP {nome} {ajuda}\n", f"# TYPE {nome} gauge\n"]
+            for rotulos, valor in valores:
+                linhas.append(f"{nome}{rotulos} {valor}\n")
+            return ''.join(linhas)
+
+        fases = sorted(report['fases'].items())
+        return ''.join([
+            metrica('api_catalog_last_run_timestamp_seconds', 'Início da última execução do gerador',
+                    [('', int(datetime.fromisoformat(report['inicio']).timestamp()))]),
+            metrica('api_catalog_last_run_success', 'Última execução concluída com sucesso (1/0)',
+                    [('', int(report['sucesso']))]),
+            metrica('api_catalog_run_duration_seconds', 'Duração total da última execução',
+                    [('', report['duracao_segundos'])]),
+            metrica('api_catalog_phase_seconds', 'Tempo gasto em cada fase da última execução',
+                    [(f'{{fase="{nome}"}}', fase['segundos']) for nome, fase in fases]),
+            metrica('api_catalog_phase_calls', 'Vezes que cada fase rodou na última execução',
+                    [(f'{{fase="{nome}"}}', fase['chamadas']) for nome, fase in fases]),
+            metrica('api_catalog_applications_rendered', 'Aplicações renderizadas na última execução',
+                    [('', report['aplicacoes_renderizadas'])]),
+            metrica('api_catalog_payloads', 'Payloads processados na última execução',
+                    [('', report['payloads'])]),
+            metrica('api_catalog_bytes_read', 'Bytes de especificações lidos do banco',
+                    [('', report['bytes_lidos'])]),
+            metrica('api_catalog_bytes_written', 'Bytes gravados em docs/api-catalog',
+                    [('', report['arquivos']['bytes_escritos'])]),
+            metrica('api_catalog_files', 'Arquivos do catálogo por situação na última execução',
+                    [(f'{{situacao="{situacao}"}}', report['arquivos'][situacao])
+                     for situacao in ('escritos', 'inalterados', 'removidos')]),
+        ])
+
+    def save(self, sucesso, manifest, report_file=None, metrics_file=None):
+        """Grava o relatório JSON e, se pedido, o arquivo .prom
+
+        O .prom é gravado em um temporário e renomeado, para o
+        node-exporter nunca ler um arquivo pela metade.
+        """
+        report = self.report(sucesso, manifest)
+        destinos = [(Path(report_file or RUN_REPORT_FILE),
+                     json.dumps(report, indent=2, ensure_ascii=False))]
+        if metrics_file:
+            destinos.append((Path(metrics_file), self.prometheus(report)))
+        for destino, conteudo in destinos:
+            try:
+                destino.parent.mkdir(parents=True, exist_ok=True)
+                temporario = destino.with_name(f".{destino.name}.{os.getpid()}.tmp")
+                with open(temporario, 'w', encoding='utf-8') as f:
+                    f.write(conteudo)
+                os.replace(temporario, destino)
+            except OSError as e:
+                print(f"⚠ Aviso: Não foi possível gravar {destino}: {e}")
+        return report
+
+class MySQLSource:
+    """Origem dos payloads no MySQL (auditoria_db)
+
+    Com pool_size > 0 mantém um pool de conexões (usado pelo modo --watch);
+    fechar a conexão apenas a devolve ao pool.
+    """
+
+    def __init__(self, config=None, pool_size=0):
+        self.config = config or DB_CONFIG
+        self.pool_size = pool_size
+        self.pool = None
+
+    def connect(self):
+        if mysql is None:
+            raise DataSourceError("mysql-connector-python não está instalado (use --sqlite)")
+        if self.pool_size and self.pool is None:
+            self.pool = mysql.connector.pooling.MySQLConnectionPool(
+                pool_name='api_catalog', pool_size=self.pool_size, **self.config
+            )
+            print(f"✓ Pool de {self.pool_size} conexões com {self.config['database']}")
+        if self.pool:
+            return self.pool.get_connection()
+        conn = mysql.connector.connect(**self.config)
+        print(f"✓ Conectado ao banco de dados {self.config['database']}")
+        return conn
+
+    def cursor(self, conn, stream=False):
+        """Cursor de dicionários; stream=True usa cursor não bufferizado (server-side)"""
+        return conn.cursor(dictionary=True, buffered=not stream)
+
+    def execute(self, cursor, query, params=()):
+        cursor.execute(query, params)
+
+    def close(self):
+        self.pool = None
+
+class SQLiteSource:
+    """Origem dos payloads em um arquivo SQLite com o mesmo esquema
+
+    Substitui o MySQL em testes locais e benchmarks: registra MD5 e
+    CONCAT_WS para que as mesmas consultas funcionem sem alteração.
+    """
+
+    def __init__(self, path):
+        self.path = str(path)
+
+    @staticmethod
+    def _md5(valor):
+        return None if valor is None else hashlib.md5(str(valor).encode('utf-8')).hexdigest()
+
+    @staticmethod
+    def _concat_ws(separador, *valores):
+        return separador.join(str(valor) for valor in valores if valor is not None)
+
+    def connect(self):
+        conn = sqlite3.connect(self.path)
+        conn.row_factory = lambda cursor, row: {
+            coluna[0]: valor for coluna, valor in zip(cursor.description, row)
+        }
+        conn.create_function('MD5', 1, self._md5)
+        conn.create_function('CONCAT_WS', -1, self._concat_ws)
+        return conn
+
+    def cursor(self, conn, stream=False):
+        return conn.cursor()
+
+    def execute(self, cursor, query, params=()):
+        cursor.execute(query.replace('%s', '?'), params)
+
+    def close(self):
+        pass
+
+def connect_db(source=None, metrics=None):
     """Conecta ao banco de dados"""
+    source = source or MySQLSource()
+    metrics = metrics or RunMetrics()
     try:
-        conn = mysql.connector.connect(**DB_CONFIG)
-        print(f"✓ Conectado ao banco de dados {DB_CONFIG['database']}")
-        return conn
-    except mysql.connector.Error as err:
+        with metrics.fase('conexao'):
+            return source.connect()
+    except DB_ERRORS as err:
         print(f"✗ Erro ao conectar ao banco: {err}")
         return None
 
-def get_payloads():
+def build_payloads_query(siglas=None):
+    """Monta a consulta de payloads, opcionalmente restrita a algumas aplicações"""
+    if siglas is None:
+        return PAYLOADS_QUERY.format(filtro=''), ()
+    marcadores = ', '.join(['%s'] * len(siglas))
+    return PAYLOADS_QUERY.format(filtro=f"\n      AND a.sigla IN ({marcadores})"), tuple(siglas)
+
+def get_payloads(siglas=None, source=None, metrics=None):
     """Busca todos os payloads com suas aplicações"""
-    conn = connect_db()
+    source = source or MySQLSource()
+    metrics = metrics or RunMetrics()
+    conn = connect_db(source, metrics)
     if not conn:
         return []
     
+    cursor = None
     try:
-        cursor = conn.cursor(dictionary=True)
-        query = """
-            SELECT 
-                p.id,
-                p.aplicacao_id,
-                p.sigla as payload_sigla,
-                p.definicao as descricao_curta,
-                p.descricao as descricao_longa,
-                p.formato_arquivo,
-                p.conteudo_arquivo,
-                p.versao_openapi,
-                p.arquivo_valido,
-                p.data_inicio,
-                p.data_termino,
-                a.sigla as aplicacao_sigla,
-                a.descricao as aplicacao_descricao,
-                a.fase_ciclo_vida,
-                a.criticidade_negocio
-            FROM payloads p
-            INNER JOIN aplicacoes a ON p.aplicacao_id = a.id
-            WHERE p.arquivo_valido = TRUE
-            ORDER BY a.sigla, p.data_inicio DESC
-        """
-        cursor.execute(query)
-        results = cursor.fetchall()
+        with metrics.fase('consulta_payloads'):
+            cursor = source.cursor(conn)
+            source.execute(cursor, *build_payloads_query(siglas))
+            results = cursor.fetchall()
         print(f"✓ Encontrados {len(results)} payloads válidos")
         return results
-    except mysql.connector.Error as err:
+    except DB_ERRORS as err:
         print(f"✗ Erro ao buscar payloads: {err}")
         return []
+    finally:
+        if cursor:
+            cursor.close()
+        conn.close()
+
+def iter_aplicacoes_stream(siglas=None, source=None, metrics=None):
+    """Percorre os payloads em fluxo, uma aplicação por vez
+
+    Usa cursor não bufferizado (server-side) e a ordenação por sigla da
+    consulta para entregar (sigla, payloads) de cada aplicação, mantendo
+    em memória apenas os payloads da aplicação corrente.
+    Erros de banco durante a leitura são propagados ao chamador.
+    """
+    source = source or MySQLSource()
+    metrics = metrics or RunMetrics()
+    conn = connect_db(source, metrics)
+    if not conn:
+        raise DataSourceError("Não foi possível conectar ao banco de dados")
+    
+    cursor = source.cursor(conn, stream=True)
+    try:
+        with metrics.fase('consulta_payloads'):
+            source.execute(cursor, *build_payloads_query(siglas))
+        rows = iter(cursor.fetchone, None)
+        grupos = itertools.groupby(rows, key=lambda row: row['aplicacao_sigla'])
+        while True:
+            # Só o tempo de leitura das linhas conta como consulta
+            with metrics.fase('consulta_payloads'):
+                grupo = next(grupos, None)
+                if grupo is not None:
+                    sigla, payloads = grupo[0], list(grupo[1])
+            if grupo is None:
+                return
+            yield sigla, payloads
     finally:
         cursor.close()
         conn.close()
 
+def get_payloads_metadata(source=None, metrics=None):
+    """Busca o marcador de alteração de cada aplicação (modo --delta)
+
+    Retorna {sigla: {'marcador', 'aplicacao_descricao', 'total_apis'}}, onde
+    o marcador resume ids e marcadores de todos os payloads da aplicação,
+    ou None em caso de erro.
+    """
+    source = source or MySQLSource()
+    metrics = metrics or RunMetrics()
+    conn = connect_db(source, metrics)
+    if not conn:
+        return None
+    
+    cursor = None
+    try:
+        with metrics.fase('metadados'):
+            cursor = source.cursor(conn)
+            source.execute(cursor, PAYLOADS_METADATA_QUERY)
+            rows = cursor.fetchall()
+        aplicacoes = {}
+        for row in rows:
+            app = aplicacoes.setdefault(row['aplicacao_sigla'], {
+                'hash': hashlib.sha256(),
+                'aplicacao_descricao': row['aplicacao_descricao'],
+                'total_apis': 0
+            })
+            app['hash'].update(f"{row['id']}:{row['marcador']};".encode('utf-8'))
+            app['total_apis'] += 1
+        for app in aplicacoes.values():
+            app['marcador'] = app.pop('hash').hexdigest()
+        print(f"✓ Metadados de {sum(a['total_apis'] for a in aplicacoes.values())} payloads "
+              f"em {len(aplicacoes)} aplicações")
+        return aplicacoes
+    except DB_ERRORS as err:
+        print(f"✗ Erro ao buscar metadados dos payloads: {err}")
+        return None
+    finally:
+        if cursor:
+            cursor.close()
+        conn.close()
+
+def get_catalog_fingerprint(source):
+    """Impressão digital barata (total e últimas atualizações) para o modo --watch"""
+    conn = connect_db(source)
+    if not conn:
+        return None
+    
+    cursor = None
+    try:
+        cursor = source.cursor(conn)
+        source.execute(cursor, CATALOG_FINGERPRINT_QUERY)
+        row = cursor.fetchone()
+        return tuple(str(valor) for valor in row.values())
+    except DB_ERRORS as err:
+        print(f"✗ Erro ao verificar alterações: {err}")
+        return None
+    finally:
+        if cursor:
+            cursor.close()
+        conn.close()
+
+def render_fingerprint(args, templates):
+    """Impressão digital do que, além dos payloads, muda a saída gerada
+
+    Opções de renderização, fontes dos templates e versão do cache de specs.
+    Quando difere da gravada no estado, o --delta regenera todas as aplicações.
+    """
+    opcoes = {
+        'cache_versao': SPEC_CACHE_VERSION,
+        'precompress': bool(args.precompress),
+        'brotli': brotli is not None,
+        'dedup': args.dedup,
+        'shard_threshold': args.shard_threshold,
+        'stream_json_threshold': args.stream_json_threshold,
+        'search_index': args.search_index,
+        'templates': {nome: template.template for nome, template in sorted(templates.items())},
+    }
+    return hashlib.sha256(
+        json.dumps(opcoes, sort_keys=True, ensure_ascii=False).encode('utf-8')
+    ).hexdigest()
+
+def load_delta_state():
+    """Carrega o estado da última execução --delta: marcadores por aplicação e impressão digital"""
+    try:
+        with open(STATE_FILE, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+    except (OSError, ValueError) as e:
+        print(f"⚠ Estado inválido, regenerando tudo: {e}")
+        return {}
+
+def save_delta_state(metadados, impressao):
+    """Persiste os marcadores por aplicação e a impressão digital para a próxima execução --delta"""
+    data = {
+        'atualizado_em': datetime.now().isoformat(timespec='seconds'),
+        'opcoes': impressao,
+        'aplicacoes': {sigla: app['marcador'] for sigla, app in sorted(metadados.items())}
+    }
+    try:
+        with open(STATE_FILE, 'w', encoding='utf-8') as f:
+            json.dump(data, f, indent=2, ensure_ascii=False)
+    except OSError as e:
+        print(f"⚠ Aviso: Não foi possível salvar o estado: {e}")
+
+def agrupar_por_aplicacao(payloads):
+    """Agrupa a lista completa de payloads por sigla da aplicação"""
+    aplicacoes_map = {}
+    for payload in payloads:
+        sigla = payload['aplicacao_sigla']
+        if sigla not in aplicacoes_map:
+            aplicacoes_map[sigla] = []
+        aplicacoes_map[sigla].append(payload)
+    return aplicacoes_map
+
+def resumir_aplicacao(payloads):
+    """Dados de uma aplicação necessários para a página índice"""
+    return {
+        'aplicacao_descricao': payloads[0]['aplicacao_descricao'],
+        'total_apis': len(payloads)
+    }
+
 def format_date(date_obj):
     """Formata data para exibição"""
     if not date_obj:
@@ -102,241 +1024,1101 @@ def get_status(fase_ciclo_vida, data_termino):
     
     return status_map.get(fase_ciclo_vida, '⚪ Indefinido')
 
+def set_output_dir(path):
+    """Redireciona a saída do catálogo (padrão: docs/api-catalog)"""
+    global DOCS_DIR, OPENAPI_DIR, SEARCH_DIR, MANIFEST_FILE, STATE_FILE
+    DOCS_DIR = Path(path).resolve()
+    OPENAPI_DIR = DOCS_DIR / 'openapi'
+    SEARCH_DIR = DOCS_DIR / 'search'
+    MANIFEST_FILE = DOCS_DIR / '.catalog-manifest.json'
+    STATE_FILE = DOCS_DIR / '.catalog-state.json'
+
 def ensure_directories():
     """Garante que os diretórios existam"""
     DOCS_DIR.mkdir(parents=True, exist_ok=True)
     OPENAPI_DIR.mkdir(parents=True, exist_ok=True)
+    SEARCH_DIR.mkdir(parents=True, exist_ok=True)
     print(f"✓ Diretórios criados: {DOCS_DIR}")
 
-def save_openapi_file(payload):
-    """Salva o arquivo OpenAPI no diretório apropriado"""
+def summarize_openapi(spec):
+    """Extrai o resumo de uma especificação OpenAPI já parseada
+
+    Seções com o tipo errado (ex.: paths: [] ou components: null) contam
+    como vazias: a spec é gravada como veio, só sem esses totais.
+    """
+    if not isinstance(spec, dict):
+        return None
+
+    def secao(chave, tipo, origem=spec):
+        valor = origem.get(chave)
+        return valor if isinstance(valor, tipo) else tipo()
+
+    paths = secao('paths', dict)
+    endpoints = [
+        [metodo.upper(), str(path), str(operacao.get('operationId') or ''),
+         str(operacao.get('summary') or ''), [str(tag) for tag in secao('tags', list, operacao)]]
+        for path, item in paths.items() if isinstance(item, dict)
+        for metodo, operacao in item.items()
+        if isinstance(metodo, str) and metodo.lower() in HTTP_METHODS and isinstance(operacao, dict)
+    ]
+    schemas = secao('schemas', dict, secao('components', dict)) or secao('definitions', dict)
+    return {
+        'operacoes': len(endpoints),
+        'endpoints': endpoints,
+        'paths': len(paths),
+        'tags': [tag.get('name') for tag in secao('tags', list) if isinstance(tag, dict)],
+        'schemas': len(schemas),
+        'servers': [srv.get('url') for srv in secao('servers', list) if isinstance(srv, dict)]
+    }
+
+# Tokens do JSON para iter_json_events (mesma gramática aceita por json.loads)
+JSON_WHITESPACE = re.compile(r'[ \t\n\r]*')
+JSON_SCALAR = re.compile(
+    r'(-?(?:0|[1-9]\d*))(\.\d+)?([eE][-+]?\d+)?|(true|false|null|NaN|Infinity|-Infinity)'
+)
+JSON_CONSTANTS = {
+    'true': True, 'false': False, 'null': None,
+    'NaN': float('nan'), 'Infinity': float('inf'), '-Infinity': float('-inf')
+}
+
+class LargeJSONSpec:
+    """Spec JSON acima de --stream-json-threshold
+
+    Carrega o conteúdo original; a versão reformatada não é montada em
+    memória, e sim gravada em partes por write_json_stream na hora de salvar.
+    """
+
+    __slots__ = ('conteudo', '_digest')
+
+    def __init__(self, conteudo):
+        self.conteudo = conteudo
+        self._digest = None
+
+    def digest(self):
+        """SHA-256 do conteúdo original (calculado em blocos)"""
+        if self._digest is None:
+            sha = hashlib.sha256()
+            for inicio in range(0, len(self.conteudo), 1 << 20):
+                sha.update(self.conteudo[inicio:inicio + (1 << 20)].encode('utf-8'))
+            self._digest = sha.hexdigest()
+        return self._digest
+
+    def events(self):
+        return iter_json_events(self.conteudo)
+
+def iter_json_events(texto):
+    """Percorre um documento JSON sem montar os objetos
+
+    Gera ('{',), ('}',), ('[',), (']',), ('k', chave) e ('v', valor escalar).
+    Lança ValueError com a posição se o JSON for inválido.
+    """
+    pilha = []
+    estado = 'valor'
+    pos = 0
+    while True:
+        pos = JSON_WHITESPACE.match(texto, pos).end()
+        c = texto[pos:pos + 1]
+        if estado == 'apos_valor':
+            if not pilha:
+                if c:
+                    raise ValueError(f"JSON inválido: conteúdo extra na posição {pos}")
+                return
+            if c == ',':
+                estado = 'chave' if pilha[-1] == '{' else 'valor'
+            elif c == ('}' if pilha[-1] == '{' else ']'):
+                pilha.pop()
+                yield (c,)
+            else:
+                raise ValueError(f"JSON inválido: esperado ',' ou fechamento na posição {pos}")
+            pos += 1
+        elif estado in ('chave', 'chave_ou_fim'):
+            if c == '}' and estado == 'chave_ou_fim':
+                pilha.pop()
+                yield ('}',)
+                pos += 1
+                estado = 'apos_valor'
+                continue
+            if c != '"':
+                raise ValueError(f"JSON inválido: esperada chave na posição {pos}")
+            chave, pos = scanstring(texto, pos + 1)
+            pos = JSON_WHITESPACE.match(texto, pos).end()
+            if texto[pos:pos + 1] != ':':
+                raise ValueError(f"JSON inválido: esperado ':' na posição {pos}")
+            pos += 1
+            yield ('k', chave)
+            estado = 'valor'
+        elif c == ']' and estado == 'valor_ou_fim':
+            pilha.pop()
+            yield (']',)
+            pos += 1
+            estado = 'apos_valor'
+        elif c in ('{', '['):
+            pilha.append(c)
+            yield (c,)
+            pos += 1
+            estado = 'chave_ou_fim' if c == '{' else 'valor_ou_fim'
+        elif c == '"':
+            valor, pos = scanstring(texto, pos + 1)
+            yield ('v', valor)
+            estado = 'apos_valor'
+        else:
+            match = JSON_SCALAR.match(texto, pos)
+            if not match:
+                raise ValueError(f"JSON inválido: valor inesperado na posição {pos}")
+            inteiro, fracao, expoente, constante = match.groups()
+            if constante:
+                valor = JSON_CONSTANTS[constante]
+            elif fracao or expoente:
+                valor = float(match.group())
+            else:
+                valor = int(inteiro)
+            yield ('v', valor)
+            pos = match.end()
+            estado = 'apos_valor'
+
+def write_json_stream(eventos, saida, indent=2):
+    """Grava os eventos de iter_json_events em `saida` (binário), em blocos
+
+    Com indent=2 o resultado é idêntico a json.dumps(indent=2,
+    ensure_ascii=False); com indent=None, ao JSON compacto.
+    """
+    partes = []
+    filhos = []  # itens já escritos em cada container aberto
+    apos_chave = False
+    separador_chave = ': ' if indent is not None else ':'
+    
+    def quebra(nivel):
+        return '\n' + ' ' * (indent * nivel) if indent is not None else ''
+    
+    for evento in eventos:
+        tipo = evento[0]
+        if tipo in ('}', ']'):
+            if filhos.pop():
+                partes.append(quebra(len(filhos)))
+            partes.append(tipo)
+        else:
+            if apos_chave:
+                apos_chave = False
+            elif filhos:
+                partes.append((',' if filhos[-1] else '') + quebra(len(filhos)))
+                filhos[-1] += 1
+            if tipo == 'k':
+                partes.append(json.dumps(evento[1], ensure_ascii=False) + separador_chave)
+                apos_chave = True
+            elif tipo == 'v':
+                partes.append(json.dumps(evento[1], ensure_ascii=False))
+            else:
+                partes.append(tipo)
+                filhos.append(0)
+        if len(partes) >= 8192:
+            saida.write(''.join(partes).encode('utf-8'))
+            partes.clear()
+    saida.write(''.join(partes).encode('utf-8'))
+
+def summary_path_needed(caminho):
+    """Se o valor em `caminho` é usado por summarize_openapi"""
+    if not caminho:
+        return True
+    raiz = caminho[0]
+    if raiz in ('tags', 'servers'):
+        return True
+    if raiz == 'paths':
+        return len(caminho) <= 3 or caminho[3] in ('operationId', 'summary', 'tags')
+    if raiz == 'components':
+        return len(caminho) == 1 or (len(caminho) == 2 and caminho[1] == 'schemas')
+    return raiz == 'definitions' and len(caminho) == 1
+
+def summarize_openapi_stream(eventos):
+    """Resumo de uma spec grande a partir dos eventos de iter_json_events
+
+    Monta só as partes lidas por summarize_openapi (operações, tags,
+    servers e nomes dos schemas); o restante vira None sem ser construído.
+    """
+    raiz = []
+    pilha = []  # [container, chave pendente]
+    ignorando = 0
+
+    def adicionar(valor):
+        if not pilha:
+            raiz.append(valor)
+        elif isinstance(pilha[-1][0], dict):
+            pilha[-1][0][pilha[-1][1]] = valor
+        else:
+            pilha[-1][0].append(valor)
+
+    for evento in eventos:
+        tipo = evento[0]
+        if ignorando:
+            if tipo in ('{', '['):
+                ignorando += 1
+            elif tipo in ('}', ']'):
+                ignorando -= 1
+                if not ignorando:
+                    adicionar(None)
+        elif tipo == 'k':
+            pilha[-1][1] = evento[1]
+        elif tipo in ('}', ']'):
+            adicionar(pilha.pop()[0])
+        else:
+            caminho = [chave if isinstance(container, dict) else len(container)
+                       for container, chave in pilha]
+            if not summary_path_needed(caminho):
+                if tipo == 'v':
+                    adicionar(None)
+                else:
+                    ignorando = 1
+            elif tipo == 'v':
+                adicionar(evento[1])
+            else:
+                pilha.append([{} if tipo == '{' else [], None])
+    return summarize_openapi(raiz[0] if raiz else None)
+
+def render_openapi_file(payload, cache=None, json_stream_threshold=None):
+    """Renderiza o arquivo OpenAPI, retornando (nome do arquivo, conteúdo, resumo)"""
     formato = payload['formato_arquivo'].lower()
     filename = f"{payload['aplicacao_sigla']}_{payload['payload_sigla']}.{formato}"
+    conteudo = payload['conteudo_arquivo']
+    
+    key = SpecCache.key(formato, conteudo) if cache else None
+    cached = cache.get(key) if cache else None
+    if cached:
+        content, resumo = cached
+        if content is None and formato == 'json':
+            # Spec grande: o cache guarda só o resumo
+            return filename, LargeJSONSpec(conteudo), resumo
+        return filename, content if content is not None else conteudo, resumo
+    
+    if formato == 'json' and json_stream_threshold and len(conteudo) > json_stream_threshold:
+        # Spec grande: resumo a partir dos eventos, reformatação na gravação
+        spec = LargeJSONSpec(conteudo)
+        resumo = summarize_openapi_stream(spec.events())
+        if cache:
+            cache.put(key, None, resumo)
+        return filename, spec, resumo
+    
+    if formato == 'json':
+        # Formatar JSON para melhor legibilidade
+        spec = json.loads(conteudo)
+        content = json.dumps(spec, indent=2, ensure_ascii=False)
+    else:
+        # YAML já vem formatado; o parse serve apenas para o resumo
+        content = conteudo
+        try:
+            spec = yaml.safe_load(conteudo)
+        except yaml.YAMLError:
+            spec = None
+    
+    resumo = summarize_openapi(spec)
+    if cache:
+        cache.put(key, content if content is not conteudo else None, resumo)
+    return filename, content, resumo
+
+def compress_blocks(blocos, saida, formato):
+    """Comprime os blocos para `saida` em 'gz' (mtime=0: saída determinística) ou 'br'"""
+    if formato == 'gz':
+        with gzip.GzipFile(fileobj=saida, mode='wb', compresslevel=9, mtime=0) as compactado:
+            for bloco in blocos:
+                compactado.write(bloco)
+    else:
+        compressor = brotli.Compressor(quality=11)
+        for bloco in blocos:
+            saida.write(compressor.process(bloco))
+        saida.write(compressor.finish())
+
+def compress_bytes(data, formato):
+    saida = io.BytesIO()
+    compress_blocks([data], saida, formato)
+    return saida.getvalue()
+
+def minified_filename(filename):
+    """Nome do .min.json de uma spec
+
+    Mantém a extensão da spec (APP_X.yaml.min.json): specs JSON e YAML com a
+    mesma sigla de payload não gravam o mesmo arquivo.
+    """
+    return f"{filename}.min.json"
+
+def render_spec_variants(filename, content):
+    """Variantes estáticas de uma spec: [(nome, bytes)]
+
+    Gera <spec>.min.json (JSON compacto, também para specs YAML) e, para a
+    spec e para o .min.json, os irmãos .gz e .br (brotli, se instalado),
+    para o servidor entregar sem comprimir a cada download.
+    """
+    data = content.encode('utf-8')
+    arquivos = [(filename, data)]
+    try:
+        spec = json.loads(content) if filename.endswith('.json') else yaml.safe_load(content)
+        minificado = json.dumps(spec, ensure_ascii=False, separators=(',', ':'), default=str)
+        arquivos.append((minified_filename(filename), minificado.encode('utf-8')))
+    except (ValueError, yaml.YAMLError) as e:
+        print(f"⚠ {filename}: .min.json não gerado ({e})")
+    
+    variantes = arquivos[1:]
+    for nome, conteudo in arquivos:
+        if len(conteudo) < PRECOMPRESS_MIN_BYTES:
+            continue
+        for formato in ('gz', 'br') if brotli else ('gz',):
+            variantes.append((f"{nome}.{formato}", compress_bytes(conteudo, formato)))
+    return variantes
+
+def compress_file(caminho, saida, formato):
+    """Comprime um arquivo em blocos para `saida`"""
+    with open(caminho, 'rb') as origem:
+        compress_blocks(iter(lambda: origem.read(1 << 20), b''), saida, formato)
+
+def write_large_spec_variants(filename, spec, manifest, aplicacao=None):
+    """Variantes de uma LargeJSONSpec, geradas em partes a partir do disco. Retorna os nomes."""
+    origem = spec.digest()
+    minificado = minified_filename(filename)
+    manifest.write_stream(OPENAPI_DIR / minificado, origem,
+                          lambda f: write_json_stream(spec.events(), f, indent=None), aplicacao)
+    nomes = [minificado]
+    for nome in (filename, minificado):
+        if (OPENAPI_DIR / nome).stat().st_size < PRECOMPRESS_MIN_BYTES:
+            continue
+        for formato in ('gz', 'br') if brotli else ('gz',):
+            manifest.write_stream(OPENAPI_DIR / f"{nome}.{formato}", origem,
+                                  lambda f, nome=nome, formato=formato:
+                                      compress_file(OPENAPI_DIR / nome, f, formato),
+                                  aplicacao)
+            nomes.append(f"{nome}.{formato}")
+    return nomes
+
+def write_spec_file(filepath, content, manifest, aplicacao=None, dedup=None):
+    """Grava uma spec ou variante; com dedup ('hardlink'/'symlink'), como link para o blob"""
+    if isinstance(content, LargeJSONSpec):
+        # Reformatada em partes direto no disco (não passa pela deduplicação)
+        return manifest.write_stream(filepath, content.digest(),
+                                     lambda f: write_json_stream(content.events(), f), aplicacao)
+    if dedup:
+        return manifest.link(filepath, content, aplicacao, dedup)
+    return manifest.write(filepath, content, aplicacao)
+
+def save_spec_variants(filename, content, manifest, aplicacao=None, alterada=True, dedup=None):
+    """Grava as variantes de uma spec (--precompress)
+
+    Se a spec não mudou e as variantes registradas no manifesto ainda
+    existem, nada é recalculado.
+    """
+    filepath = OPENAPI_DIR / filename
+    registradas = manifest.derived(filepath)
+    # Variantes com o nome antigo (<sigla>.min.json, sem a extensão) são refeitas
+    if not alterada and registradas is not None \
+            and all(nome.startswith(f"{filename}.") for nome in registradas) \
+            and all([manifest.reuse(OPENAPI_DIR / nome) for nome in registradas]):
+        return
+    
+    if isinstance(content, LargeJSONSpec):
+        manifest.set_derived(filepath, write_large_spec_variants(filename, content, manifest, aplicacao))
+        return
+    
+    variantes = render_spec_variants(filename, content)
+    for nome, conteudo in variantes:
+        write_spec_file(OPENAPI_DIR / nome, conteudo, manifest, aplicacao, dedup)
+    manifest.set_derived(filepath, [nome for nome, _ in variantes])
+
+def save_openapi_file(filename, content, manifest, aplicacao=None, precompress=False, dedup=None):
+    """Salva o arquivo OpenAPI no diretório apropriado"""
     filepath = OPENAPI_DIR / filename
     
     try:
-        with open(filepath, 'w', encoding='utf-8') as f:
-            if formato == 'json':
-                # Formatar JSON para melhor legibilidade
-                content = json.loads(payload['conteudo_arquivo'])
-                json.dump(content, f, indent=2, ensure_ascii=False)
-            else:
-                # YAML já vem formatado
-                f.write(payload['conteudo_arquivo'])
-        
+        alterada = write_spec_file(filepath, content, manifest, aplicacao, dedup)
+        if precompress:
+            save_spec_variants(filename, content, manifest, aplicacao, alterada, dedup)
         return f"openapi/{filename}"
     except Exception as e:
         print(f"✗ Erro ao salvar arquivo OpenAPI {filename}: {e}")
         return None
 
-def generate_aplicacao_page(aplicacao_sigla, payloads):
-    """Gera página markdown para uma aplicação"""
-    # Pegar informações da primeira payload (todas são da mesma aplicação)
-    first = payloads[0]
-    aplicacao_desc = first['aplicacao_descricao']
-    criticidade = first['criticidade_negocio']
-    
-    # Criar conteúdo da página
-    content = f"""# {aplicacao_sigla} - Catálogo de APIs
+def tokenize(texto):
+    """Termos de busca de um texto (quebra camelCase, separadores e caixa)"""
+    texto = re.sub(r'([a-z0-9])([A-Z])', r'\1 \2', str(texto))
+    return {termo for termo in re.split(r'[\W_]+', texto.lower()) if len(termo) >= 2}
 
-## Aplicação: {aplicacao_sigla}
+def search_shard_filename(aplicacao_sigla):
+    return f"{aplicacao_sigla.lower()}.json"
 
-**Descrição:** {aplicacao_desc}  
-**Criticidade:** {criticidade}  
-**Total de APIs:** {len(payloads)}
+def payload_page_filenames(aplicacao_sigla, payload_siglas):
+    """Caminhos (relativos a DOCS_DIR) das páginas individuais dos payloads, na mesma ordem
 
----
+    O slug perde caracteres ("A.B" e "A-B" viram "a-b"): siglas diferentes
+    com o mesmo slug recebem o início do SHA-1 da sigla original como
+    sufixo, para uma página não sobrescrever a outra.
+    """
+    slugs = [re.sub(r'[^a-z0-9_-]+', '-', sigla.lower()).strip('-') or 'payload'
+             for sigla in payload_siglas]
+    siglas_por_slug = {}
+    for slug, sigla in zip(slugs, payload_siglas):
+        siglas_por_slug.setdefault(slug, set()).add(sigla)
+    
+    filenames = []
+    for slug, sigla in zip(slugs, payload_siglas):
+        if len(siglas_por_slug[slug]) > 1:
+            slug = f"{slug}-{hashlib.sha1(sigla.encode('utf-8')).hexdigest()[:8]}"
+        filenames.append(f"{aplicacao_sigla.lower()}/{slug}.md")
+    return filenames
 
-## APIs Disponíveis
+def render_search_shard(aplicacao_sigla, operacoes, paginas=None):
+    """Renderiza o shard de busca de uma aplicação
 
-"""
+    operacoes: [payload, método, path, operationId, summary, tags, spec].
+    Retorna (JSON compacto com as operações e o índice invertido
+    termo -> posições, termos ordenados). paginas mapeia payload -> URL
+    quando a aplicação tem uma página por payload.
+    """
+    indice = {}
+    for posicao, (payload_sigla, metodo, path, operation_id, summary, tags, _) in enumerate(operacoes):
+        termos = tokenize(' '.join([payload_sigla, metodo, path, operation_id, summary, *tags]))
+        for termo in termos:
+            indice.setdefault(termo, []).append(posicao)
+    shard = {
+        'aplicacao': aplicacao_sigla,
+        'pagina': f"{aplicacao_sigla.lower()}/",
+        'operacoes': operacoes,
+        'termos': dict(sorted(indice.items()))
+    }
+    if paginas:
+        shard['paginas'] = paginas
+    return json.dumps(shard, ensure_ascii=False, separators=(',', ':')), sorted(indice)
+
+def render_aplicacao_page(aplicacao_sigla, payloads, templates=None, cache_file=None,
+                          shard_threshold=None, json_stream_threshold=None):
+    """Renderiza a página markdown e as especificações de uma aplicação
+
+    Não grava nada em disco nem depende de estado global, para poder
+    rodar em um processo do pool (--workers). A página é montada em uma
+    única passada, acumulando os trechos em uma lista.
+    Com mais de shard_threshold payloads, a página da aplicação vira um
+    resumo com links e cada payload ganha sua própria página.
+    Specs JSON maiores que json_stream_threshold saem como LargeJSONSpec.
+    """
+    inicio = time.perf_counter()
+    templates = templates or load_templates()
+    cache = get_spec_cache(cache_file)
+    bytes_lidos = 0
+    # Pegar informações da primeira payload (todas são da mesma aplicação)
+    first = payloads[0]
+    specs = []
+    erros = []
+    operacoes = []
+    sharded = bool(shard_threshold) and len(payloads) > shard_threshold
+    pagina_aplicacao = f"{aplicacao_sigla.lower()}.md"
+    paginas_payload = []
+    paginas_busca = {}
+    filenames = payload_page_filenames(
+        aplicacao_sigla, [payload['payload_sigla'] for payload in payloads]) if sharded else None
     
-    for payload in payloads:
-        status = get_status(payload['fase_ciclo_vida'], payload['data_termino'])
-        data_inicio = format_date(payload['data_inicio'])
+    partes = [templates['aplicacao'].safe_substitute(
+        aplicacao_sigla=aplicacao_sigla,
+        aplicacao_descricao=first['aplicacao_descricao'],
+        criticidade=first['criticidade_negocio'],
+        total_apis=len(payloads)
+    )]
+    
+    for posicao, payload in enumerate(payloads):
+        conteudo = payload['conteudo_arquivo'] or ''
+        bytes_lidos += len(conteudo.encode('utf-8') if isinstance(conteudo, str) else conteudo)
         data_termino = format_date(payload['data_termino'])
+        status = get_status(payload['fase_ciclo_vida'], payload['data_termino'])
         
-        content += f"""### {payload['payload_sigla']}
-
-**Status:** {status}  
-**Descrição Curta:** {payload['descricao_curta']}  
-"""
-        
-        if payload['descricao_longa']:
-            content += f"""**Descrição Longa:** {payload['descricao_longa']}  
-"""
+        # Renderizar arquivo OpenAPI e gerar referência
+        openapi_secao = ''
+        endpoints_linha = ''
+        try:
+            spec_filename, spec_content, spec_resumo = render_openapi_file(
+                payload, cache, json_stream_threshold)
+            specs.append((spec_filename, spec_content))
+            if spec_resumo:
+                endpoints_linha = templates['payload_endpoints'].safe_substitute(spec_resumo)
+                operacoes.extend(
+                    [payload['payload_sigla'], *endpoint, f"openapi/{spec_filename}"]
+                    for endpoint in spec_resumo.get('endpoints', [])
+                )
+            openapi_secao = templates['payload_openapi'].safe_substitute(
+                openapi_path=f"openapi/{spec_filename}"
+            )
+        except Exception as e:
+            erros.append(f"✗ Erro ao salvar arquivo OpenAPI "
+                         f"{payload['aplicacao_sigla']}_{payload['payload_sigla']}: {e}")
         
-        content += f"""**Versão OpenAPI:** {payload['versao_openapi']}  
-**Data de Início:** {data_inicio}  
-"""
+        bloco = templates['payload'].safe_substitute(
+            payload_sigla=payload['payload_sigla'],
+            status=status,
+            descricao_curta=payload['descricao_curta'],
+            descricao_longa_linha=templates['payload_descricao_longa'].safe_substitute(
+                descricao_longa=payload['descricao_longa']
+            ) if payload['descricao_longa'] else '',
+            versao_openapi=payload['versao_openapi'],
+            data_inicio=format_date(payload['data_inicio']),
+            data_termino_linha=templates['payload_data_termino'].safe_substitute(
+                data_termino=data_termino
+            ) if data_termino != "N/A" else '',
+            endpoints_linha=endpoints_linha,
+            openapi_secao=openapi_secao
+        )
         
-        if data_termino != "N/A":
-            content += f"""**Data de Término:** {data_termino}  
-"""
+        if not sharded:
+            partes.append(bloco)
+            continue
         
-        # Salvar arquivo OpenAPI e gerar referência
-        openapi_path = save_openapi_file(payload)
-        if openapi_path:
-            content += f"""
-#### Especificação OpenAPI
-
-```yaml
-Arquivo: {openapi_path}
-```
-
-!!! tip "Testar API"
-    Para testar esta API interativamente, você pode:
+        filename = filenames[posicao]
+        paginas_payload.append((filename, templates['payload_pagina'].safe_substitute(
+            aplicacao_sigla=aplicacao_sigla,
+            payload_sigla=payload['payload_sigla'],
+            aplicacao_pagina=pagina_aplicacao
+        ) + bloco))
+        paginas_busca[payload['payload_sigla']] = filename[:-len('.md')] + '/'
+        partes.append(templates['aplicacao_shard_item'].safe_substitute(
+            payload_sigla=payload['payload_sigla'],
+            pagina=filename,
+            status=status,
+            descricao_curta=payload['descricao_curta']
+        ))
     
-    1. Baixar o arquivo OpenAPI: [{openapi_path}](/{openapi_path})
-    2. Importar no [Swagger Editor](https://editor.swagger.io/)
-    3. Ou usar ferramentas como Postman, Insomnia ou curl
+    busca, termos = render_search_shard(aplicacao_sigla, operacoes, paginas_busca)
+    if cache:
+        # Uma transação por aplicação (cada processo do pool tem seu cache)
+        cache.flush()
+    return {
+        'sigla': aplicacao_sigla,
+        'filename': pagina_aplicacao,
+        'content': ''.join(partes),
+        'paginas_payload': paginas_payload,
+        'specs': specs,
+        'erros': erros,
+        'resumo': resumir_aplicacao(payloads),
+        'busca': busca,
+        'termos': termos,
+        'bytes_lidos': bytes_lidos,
+        'tempo_render': time.perf_counter() - inicio
+    }
 
-"""
-        
-        content += "---\n\n"
+def write_aplicacao_page(pagina, manifest, busca=True, metrics=None, precompress=False,
+                         dedup=None):
+    """Grava a página e as especificações renderizadas de uma aplicação"""
+    metrics = metrics or RunMetrics()
+    for erro in pagina['erros']:
+        print(erro)
+    with metrics.fase('gravacao_specs'):
+        for spec_filename, spec_content in pagina['specs']:
+            save_openapi_file(spec_filename, spec_content, manifest, pagina['sigla'],
+                              precompress, dedup)
+    
+    with metrics.fase('gravacao_paginas'):
+        for payload_filename, payload_content in pagina['paginas_payload']:
+            try:
+                manifest.write(DOCS_DIR / payload_filename, payload_content, pagina['sigla'])
+            except Exception as e:
+                print(f"✗ Erro ao gerar página {payload_filename}: {e}")
+    
+    if busca:
+        try:
+            with metrics.fase('gravacao_busca'):
+                manifest.write(SEARCH_DIR / search_shard_filename(pagina['sigla']),
+                               pagina['busca'], pagina['sigla'])
+        except Exception as e:
+            print(f"✗ Erro ao gravar índice de busca de {pagina['sigla']}: {e}")
     
     # Salvar página
-    filename = f"{aplicacao_sigla.lower()}.md"
+    filename = pagina['filename']
     filepath = DOCS_DIR / filename
     
     try:
-        with open(filepath, 'w', encoding='utf-8') as f:
-            f.write(content)
-        print(f"✓ Página gerada: {filename}")
+        with metrics.fase('gravacao_paginas'):
+            gravada = manifest.write(filepath, pagina['content'], pagina['sigla'])
+        if gravada:
+            extras = len(pagina['paginas_payload'])
+            print(f"✓ Página gerada: {filename}" + (f" (+{extras} páginas de payload)" if extras else ''))
+        else:
+            print(f"= Página inalterada: {filename}")
         return filename
     except Exception as e:
         print(f"✗ Erro ao gerar página {filename}: {e}")
         return None
 
-def generate_index_page(aplicacoes_map):
-    """Gera página índice do catálogo"""
-    content = """# Catálogo de APIs - Governança e Testes
-
-## Visão Geral
-
-Este catálogo apresenta todas as APIs documentadas no formato OpenAPI, organizadas por aplicação.
-
-### Governança
-
-Cada API possui:
-
-- ✅ **Status operacional**: Indica se a API está ativa, em desenvolvimento ou depreciada
-- 📋 **Metadados**: Nome, sigla, versão, datas de início e término
-- 📖 **Documentação**: Descrição curta e longa para contexto completo
-- 🔧 **Especificação OpenAPI**: Arquivo JSON/YAML para integração e testes
-
-### Como usar este catálogo
-
-1. Navegue pelas aplicações listadas abaixo
-2. Acesse a página de cada aplicação para ver suas APIs
-3. Baixe os arquivos OpenAPI para integração
-4. Use ferramentas como Swagger Editor ou Postman para testar
-
----
+def generate_aplicacao_page(aplicacao_sigla, payloads, manifest, templates=None, cache_file=None,
+                            shard_threshold=None, json_stream_threshold=None):
+    """Gera página markdown para uma aplicação"""
+    return write_aplicacao_page(
+        render_aplicacao_page(aplicacao_sigla, payloads, templates, cache_file, shard_threshold,
+                              json_stream_threshold),
+        manifest
+    )
 
-## Aplicações
+def render_aplicacoes(grupos, workers=1, templates=None, cache_file=None, shard_threshold=None,
+                      json_stream_threshold=None):
+    """Renderiza as aplicações na ordem de entrada
 
-"""
+    Com workers > 1 a renderização (incluindo a reformatação dos JSON)
+    roda em um pool de processos. No máximo 2 × workers aplicações ficam
+    pendentes por vez, e os resultados saem na mesma ordem da execução
+    serial, então a saída gravada é idêntica.
+    """
+    if workers <= 1:
+        for sigla, payloads in grupos:
+            yield render_aplicacao_page(sigla, payloads, templates, cache_file, shard_threshold,
+                                        json_stream_threshold)
+        return
     
-    total_apis = 0
-    for sigla, payloads in sorted(aplicacoes_map.items()):
-        count = len(payloads)
-        total_apis += count
-        desc = payloads[0]['aplicacao_descricao']
-        
-        content += f"""### [{sigla}]({sigla.lower()}.md)
-
-**Descrição:** {desc}  
-**APIs disponíveis:** {count}
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        pendentes = deque()
+        for sigla, payloads in grupos:
+            pendentes.append(executor.submit(
+                render_aplicacao_page, sigla, payloads, templates, cache_file, shard_threshold,
+                json_stream_threshold
+            ))
+            if len(pendentes) >= workers * 2:
+                yield pendentes.popleft().result()
+        while pendentes:
+            yield pendentes.popleft().result()
 
-"""
+def render_index_page(resumos, templates=None, busca=True):
+    """Renderiza a página índice do catálogo a partir dos resumos por aplicação"""
+    templates = templates or load_templates()
+    partes = [templates['index'].safe_substitute(
+        total_aplicacoes=len(resumos),
+        total_apis=sum(resumo['total_apis'] for resumo in resumos.values()),
+        busca_secao=templates['index_busca'].safe_substitute() if busca else ''
+    )]
     
-    content = content.replace("## Aplicações\n\n", f"""## Aplicações
-
-**Total de Aplicações:** {len(aplicacoes_map)}  
-**Total de APIs:** {total_apis}
+    for sigla, resumo in sorted(resumos.items()):
+        partes.append(templates['index_aplicacao'].safe_substitute(
+            aplicacao_sigla=sigla,
+            pagina=f"{sigla.lower()}.md",
+            aplicacao_descricao=resumo['aplicacao_descricao'],
+            total_apis=resumo['total_apis']
+        ))
+    
+    return ''.join(partes)
 
-""")
+def generate_index_page(resumos, manifest, templates=None, busca=True):
+    """Gera página índice do catálogo a partir dos resumos por aplicação"""
+    content = render_index_page(resumos, templates, busca)
     
     filepath = DOCS_DIR / 'index.md'
     try:
-        with open(filepath, 'w', encoding='utf-8') as f:
-            f.write(content)
-        print(f"✓ Índice gerado: index.md")
+        if manifest.write(filepath, content):
+            print(f"✓ Índice gerado: index.md")
+        else:
+            print("= Índice inalterado: index.md")
     except Exception as e:
         print(f"✗ Erro ao gerar índice: {e}")
 
-def update_mkdocs_nav():
-    """Atualiza mkdocs.yml para incluir catálogo de APIs"""
-    mkdocs_file = Path(__file__).parent.parent / 'mkdocs.yml'
+def generate_search_index(siglas, termos_por_aplicacao, manifest):
+    """Gera search/index.json, que indica em quais shards cada termo aparece
+
+    O navegador carrega só este arquivo e depois, sob demanda, os shards
+    das aplicações que contêm os termos buscados. Aplicações não
+    regeneradas nesta execução (--delta) têm os termos lidos do shard atual.
+    """
+    shards = []
+    roteamento = {}
+    for posicao, sigla in enumerate(sorted(siglas)):
+        filename = search_shard_filename(sigla)
+        termos = termos_por_aplicacao.get(sigla)
+        if termos is None:
+            try:
+                with open(SEARCH_DIR / filename, 'r', encoding='utf-8') as f:
+                    shard = json.load(f)
+                termos = list(shard['termos'])
+            except (OSError, ValueError, KeyError) as e:
+                print(f"⚠ Shard de busca ausente para {sigla}: {e}")
+                continue
+        shards.append([sigla, filename])
+        for termo in termos:
+            roteamento.setdefault(termo, []).append(len(shards) - 1)
+    
+    content = json.dumps({
+        'versao': 1,
+        'shards': shards,
+        'termos': dict(sorted(roteamento.items()))
+    }, ensure_ascii=False, separators=(',', ':'))
+    
+    try:
+        if manifest.write(SEARCH_DIR / 'index.json', content):
+            print(f"✓ Índice de busca gerado: {len(shards)} shards, {len(roteamento)} termos")
+        else:
+            print("= Índice de busca inalterado")
+    except Exception as e:
+        print(f"✗ Erro ao gerar índice de busca: {e}")
+
+def render_nav_block(nav_aplicacoes, indent):
+    """Linhas do bloco gerado do nav: uma entrada por aplicação, e uma
+    subseção com resumo + páginas de payload para aplicações divididas"""
+    linhas = [f"{indent}{NAV_INICIO} (gerado por scripts/generate-api-catalog.py)\n",
+              f"{indent}- \"Aplicações\":\n"]
+    for sigla, paginas in sorted(nav_aplicacoes.items()):
+        principal = f"api-catalog/{sigla.lower()}.md"
+        extras = [f"api-catalog/{pagina}" for pagina in paginas if pagina != f"{sigla.lower()}.md"]
+        if not extras:
+            linhas.append(f"{indent}    - {json.dumps(sigla, ensure_ascii=False)}: {json.dumps(principal)}\n")
+            continue
+        linhas.append(f"{indent}    - {json.dumps(sigla, ensure_ascii=False)}:\n")
+        linhas.append(f"{indent}        - {json.dumps(principal)}\n")
+        linhas.extend(f"{indent}        - {json.dumps(extra, ensure_ascii=False)}\n" for extra in extras)
+    linhas.append(f"{indent}{NAV_FIM}\n")
+    return linhas
+
+def update_mkdocs_nav(nav_aplicacoes=None, mkdocs_file=None):
+    """Atualiza mkdocs.yml para incluir catálogo de APIs
+
+    nav_aplicacoes ({sigla: [páginas]}) é gravado em um bloco delimitado por
+    NAV_INICIO/NAV_FIM dentro da seção 'Catálogo de APIs', substituído a cada
+    execução. O arquivo só é reescrito se o conteúdo mudar.
+    """
+    mkdocs_file = Path(mkdocs_file or MKDOCS_FILE)
+    nav_aplicacoes = nav_aplicacoes or {}
     
     try:
         with open(mkdocs_file, 'r', encoding='utf-8') as f:
-            content = f.read()
+            original = f.read()
+        linhas = original.splitlines(keepends=True)
+        
+        inicio = next((i for i, l in enumerate(linhas) if l.strip().startswith(NAV_INICIO)), None)
+        fim = next((i for i, l in enumerate(linhas) if l.strip() == NAV_FIM), None)
+        indice = next((i for i, l in enumerate(linhas) if 'api-catalog/index.md' in l), None)
         
-        # Verificar se já existe a seção
-        if 'Catálogo de APIs' in content:
+        if inicio is not None and fim is not None and fim > inicio:
+            # Substituir o bloco gerado anteriormente
+            indent = linhas[inicio][:len(linhas[inicio]) - len(linhas[inicio].lstrip())]
+            linhas[inicio:fim + 1] = render_nav_block(nav_aplicacoes, indent)
+        elif 'Catálogo de APIs' in original and indice is not None:
+            # Inserir o bloco logo após a entrada do índice do catálogo
+            indent = linhas[indice][:len(linhas[indice]) - len(linhas[indice].lstrip())]
+            linhas[indice + 1:indice + 1] = render_nav_block(nav_aplicacoes, indent)
+        elif 'Catálogo de APIs' in original:
             print("✓ Seção 'Catálogo de APIs' já existe em mkdocs.yml")
+            print("  Adicione 'api-catalog/index.md' à seção para gerar o nav das aplicações")
             return
-        
-        # Adicionar antes da última linha do nav
-        nav_section = """
+        else:
+            # Adicionar antes da última linha do nav
+            nav_section = """
   - "Catálogo de APIs":
       - "Visão Geral": "api-catalog/index.md"
-"""
+""" + ''.join(render_nav_block(nav_aplicacoes, '      '))
+            
+            # Encontrar onde inserir (antes de markdown_extensions ou no final do nav)
+            content = ''.join(linhas)
+            if 'markdown_extensions:' in content:
+                content = content.replace('markdown_extensions:', nav_section + '\nmarkdown_extensions:')
+            else:
+                # Inserir no final do arquivo
+                content += nav_section
+            linhas = [content]
         
-        # Encontrar onde inserir (antes de markdown_extensions ou no final do nav)
-        if 'markdown_extensions:' in content:
-            content = content.replace('markdown_extensions:', nav_section + '\nmarkdown_extensions:')
-        else:
-            # Inserir no final do arquivo
-            content += nav_section
+        content = ''.join(linhas)
+        if content == original:
+            print("= Navegação do catálogo inalterada em mkdocs.yml")
+            return
         
         with open(mkdocs_file, 'w', encoding='utf-8') as f:
             f.write(content)
         
-        print("✓ mkdocs.yml atualizado com seção 'Catálogo de APIs'")
+        print("✓ mkdocs.yml atualizado com a navegação do 'Catálogo de APIs'")
     except Exception as e:
         print(f"⚠ Aviso: Não foi possível atualizar mkdocs.yml: {e}")
         print("  Adicione manualmente a seção 'Catálogo de APIs' ao nav")
 
-def main():
-    """Função principal"""
-    print("\n" + "="*60)
-    print("Gerador de Catálogo de APIs - Sistema de Auditoria")
-    print("="*60 + "\n")
+def parse_args(argv=None):
+    """Lê as opções de linha de comando"""
+    parser = argparse.ArgumentParser(description="Gera o catálogo de APIs no MkDocs")
+    parser.add_argument(
+        '--stream', action='store_true',
+        default=os.getenv('CATALOG_STREAM', '').lower() in ('1', 'true', 'sim'),
+        help="Lê os payloads com cursor não bufferizado e gera uma aplicação por vez "
+             "(memória limitada à maior aplicação)")
+    parser.add_argument(
+        '--workers', type=int, metavar='N',
+        default=int(os.getenv('CATALOG_WORKERS', '1')),
+        help="Número de processos para renderizar páginas e especificações (padrão: 1)")
+    parser.add_argument(
+        '--delta', action='store_true',
+        default=os.getenv('CATALOG_DELTA', '').lower() in ('1', 'true', 'sim'),
+        help="Consulta apenas marcadores de alteração e busca o conteúdo somente "
+             "das aplicações alteradas desde a última execução")
+    parser.add_argument(
+        '--templates-dir', metavar='DIR', default=os.getenv('CATALOG_TEMPLATES_DIR'),
+        help="Diretório com templates que sobrescrevem os padrões "
+             "(aplicacao.md, payload.md, index.md, index_aplicacao.md, ...)")
+    parser.add_argument(
+        '--cache-file', metavar='ARQUIVO', default=os.getenv('CATALOG_CACHE_FILE', SPEC_CACHE_FILE),
+        help=f"Cache SQLite das specs processadas (padrão: {SPEC_CACHE_FILE})")
+    parser.add_argument(
+        '--no-cache', action='store_true',
+        help="Não usa o cache de specs (parseia todas novamente)")
+    parser.add_argument(
+        '--no-search-index', dest='search_index', action='store_false',
+        help="Não gera o índice de busca de operações (search/)")
+    parser.add_argument(
+        '--shard-threshold', type=int, metavar='N',
+        default=int(os.getenv('CATALOG_SHARD_THRESHOLD', '0')) or None,
+        help="Aplicações com mais de N payloads ganham uma página por payload "
+             "e uma página de resumo (padrão: desativado)")
+    parser.add_argument(
+        '--stream-json-threshold', type=int, metavar='BYTES',
+        default=int(os.getenv('CATALOG_STREAM_JSON_THRESHOLD', JSON_STREAM_THRESHOLD)),
+        help="Specs JSON maiores que isso são reformatadas em partes direto no disco, "
+             f"sem montar o documento em memória (padrão: {JSON_STREAM_THRESHOLD}; 0 desativa)")
+    parser.add_argument(
+        '--precompress', action='store_true',
+        default=os.getenv('CATALOG_PRECOMPRESS', '').lower() in ('1', 'true', 'sim'),
+        help="Gera <spec>.min.json e irmãos .gz/.br de cada especificação para "
+             "gzip_static/brotli_static (recalculados só quando a spec muda)")
+    parser.add_argument(
+        '--dedup', choices=['hardlink', 'symlink'], default=os.getenv('CATALOG_DEDUP') or None,
+        help="Grava cada conteúdo de spec uma única vez em openapi/.blobs/ e cria os "
+             "arquivos <aplicação>_<payload> como links para ele (cópia se não houver suporte)")
+    parser.add_argument(
+        '--output-dir', metavar='DIR', default=os.getenv('CATALOG_OUTPUT_DIR'),
+        help=f"Diretório de saída do catálogo (padrão: {DOCS_DIR})")
+    parser.add_argument(
+        '--mkdocs-file', metavar='ARQUIVO', default=os.getenv('CATALOG_MKDOCS_FILE', MKDOCS_FILE),
+        help=f"mkdocs.yml cujo nav é atualizado (padrão: {MKDOCS_FILE})")
+    parser.add_argument(
+        '--sqlite', metavar='ARQUIVO', default=os.getenv('CATALOG_SQLITE'),
+        help="Lê payloads de um arquivo SQLite com o mesmo esquema em vez do MySQL "
+             "(testes locais e benchmark)")
+    parser.add_argument(
+        '--report-file', metavar='ARQUIVO', default=os.getenv('CATALOG_REPORT_FILE'),
+        help="Relatório JSON da execução: tempo por fase, payloads, bytes lidos e "
+             f"gravados (padrão: {RUN_REPORT_FILE})")
+    parser.add_argument(
+        '--metrics-file', metavar='ARQUIVO', default=os.getenv('CATALOG_METRICS_FILE'),
+        help="Grava as métricas da execução no formato do textfile collector do "
+             "node-exporter (ex.: /var/lib/node_exporter/textfile/api_catalog.prom)")
+    parser.add_argument(
+        '--timings', action='store_true',
+        default=os.getenv('CATALOG_TIMINGS', '').lower() in ('1', 'true', 'sim'),
+        help="Exibe o tempo por fase ao final da execução")
+    parser.add_argument(
+        '--watch', action='store_true',
+        help="Fica em execução, verificando alterações no banco e regenerando "
+             "apenas as aplicações afetadas (implica --delta)")
+    parser.add_argument(
+        '--interval', type=float, metavar='SEGUNDOS',
+        default=float(os.getenv('CATALOG_WATCH_INTERVAL', '30')),
+        help="Intervalo entre verificações no modo --watch (padrão: 30)")
+    parser.add_argument(
+        '--reconcile-interval', type=float, metavar='SEGUNDOS',
+        default=float(os.getenv('CATALOG_RECONCILE_INTERVAL', '600')),
+        help="No modo --watch, roda a verificação --delta completa ao menos "
+             "a cada N segundos, mesmo sem mudança na impressão digital (padrão: 600)")
+    return parser.parse_args(argv)
+
+def generate_catalog(args, source, templates):
+    """Executa uma geração do catálogo (completa ou --delta). Retorna True se concluída.
+
+    Ao final grava o relatório da execução (tempo por fase, payloads,
+    bytes lidos e gravados) e, com --metrics-file, as métricas para o
+    Prometheus, inclusive quando a geração falha.
+    """
+    manifest = CatalogManifest.load()
+    metrics = RunMetrics()
+    sucesso = False
+    try:
+        sucesso = build_catalog(args, source, templates, manifest, metrics)
+        return sucesso
+    finally:
+        report = metrics.save(sucesso, manifest, args.report_file, args.metrics_file)
+        if args.timings:
+            print_timings(report)
+
+def print_timings(report):
+    """Resumo do tempo por fase no final da execução (--timings)"""
+    print(f"\nTempo por fase ({report['duracao_segundos']:.2f}s no total):")
+    for nome, fase in sorted(report['fases'].items(), key=lambda item: -item[1]['segundos']):
+        print(f"  {nome:<20} {fase['segundos']:>9.3f}s  ({fase['chamadas']}×)")
+    lentas = sorted(report['aplicacoes'].items(), key=lambda item: -item[1]['render_segundos'])[:5]
+    if lentas:
+        print("  Aplicações mais lentas: " + ', '.join(
+            f"{sigla} {app['render_segundos']:.3f}s" for sigla, app in lentas))
+    print(f"  Payloads: {report['payloads']}  lidos: {report['bytes_lidos']} bytes  "
+          f"gravados: {report['arquivos']['bytes_escritos']} bytes")
+
+def build_catalog(args, source, templates, manifest, metrics):
+    """Corpo de generate_catalog: busca, renderiza e grava o catálogo"""
+    cache_file = None if args.no_cache else str(args.cache_file)
     
-    # Criar diretórios
-    ensure_directories()
+    resumos = {}
+    termos_por_aplicacao = {}
+    siglas = None  # None = todas as aplicações
+    if args.delta:
+        # Modo delta: só busca o conteúdo das aplicações alteradas desde a última execução
+        metadados = get_payloads_metadata(source, metrics)
+        if metadados is None:
+            return False
+        if not metadados:
+            print("\n⚠ Nenhum payload válido encontrado. Encerrando.")
+            return False
+        
+        estado = load_delta_state()
+        impressao = render_fingerprint(args, templates)
+        anteriores = estado.get('aplicacoes', {})
+        marcadores = anteriores
+        if anteriores and estado.get('opcoes') != impressao:
+            print("✓ Opções ou templates mudaram desde a última execução: regenerando todas as aplicações")
+            marcadores = {}
+        siglas = []
+        for sigla, app in metadados.items():
+            if marcadores.get(sigla) == app['marcador'] and manifest.keep(sigla):
+                resumos[sigla] = {
+                    'aplicacao_descricao': app['aplicacao_descricao'],
+                    'total_apis': app['total_apis']
+                }
+            else:
+                siglas.append(sigla)
+        removidas = set(anteriores) - set(metadados)
+        print(f"✓ Delta: {len(siglas)} aplicações alteradas, {len(removidas)} removidas, "
+              f"{len(resumos)} inalteradas\n")
+        if not siglas and not removidas:
+            print("✓ Catálogo já está atualizado")
+            return True
     
-    # Buscar payloads
-    payloads = get_payloads()
-    if not payloads:
-        print("\n⚠ Nenhum payload válido encontrado. Encerrando.")
-        return
+    if siglas == []:
+        grupos = []
+    elif args.stream:
+        # Modo streaming: renderiza e grava cada aplicação assim que lida
+        print("Gerando páginas (modo streaming)...\n")
+        grupos = iter_aplicacoes_stream(siglas, source, metrics)
+    else:
+        # Buscar payloads
+        payloads = get_payloads(siglas, source, metrics)
+        if not payloads:
+            print("\n⚠ Nenhum payload válido encontrado. Encerrando.")
+            return False
+        
+        # Agrupar por aplicação
+        aplicacoes_map = agrupar_por_aplicacao(payloads)
+        print(f"\n✓ Payloads agrupados em {len(aplicacoes_map)} aplicações\n")
+        
+        # Gerar páginas
+        print("Gerando páginas...\n")
+        grupos = aplicacoes_map.items()
     
-    # Agrupar por aplicação
-    aplicacoes_map = {}
-    for payload in payloads:
-        sigla = payload['aplicacao_sigla']
-        if sigla not in aplicacoes_map:
-            aplicacoes_map[sigla] = []
-        aplicacoes_map[sigla].append(payload)
+    if args.workers > 1:
+        print(f"✓ Renderizando com {args.workers} processos\n")
     
-    print(f"\n✓ Payloads agrupados em {len(aplicacoes_map)} aplicações\n")
+    try:
+        for pagina in render_aplicacoes(grupos, args.workers, templates, cache_file,
+                                        args.shard_threshold, args.stream_json_threshold):
+            metrics.aplicacao(pagina)
+            write_aplicacao_page(pagina, manifest, args.search_index, metrics,
+                                 args.precompress, args.dedup)
+            resumos[pagina['sigla']] = pagina['resumo']
+            termos_por_aplicacao[pagina['sigla']] = pagina['termos']
+    except DB_ERRORS as err:
+        # Leitura interrompida: não gerar índice nem remover saídas antigas
+        print(f"✗ Erro ao buscar payloads: {err}")
+        manifest.save()
+        return False
     
-    # Gerar páginas
-    print("Gerando páginas...\n")
-    for sigla, app_payloads in aplicacoes_map.items():
-        generate_aplicacao_page(sigla, app_payloads)
+    if siglas and set(siglas) - set(resumos):
+        # Aplicação alterada que não voltou na busca: manter estado anterior
+        print("✗ Nem todas as aplicações alteradas foram regeneradas; estado não atualizado")
+        manifest.save()
+        return False
+    
+    if not resumos:
+        print("\n⚠ Nenhum payload válido encontrado. Encerrando.")
+        return False
+    if args.stream:
+        print(f"\n✓ {sum(r['total_apis'] for r in resumos.values())} payloads válidos "
+              f"em {len(resumos)} aplicações")
     
     # Gerar índice
     print("\nGerando índice...\n")
-    generate_index_page(aplicacoes_map)
+    with metrics.fase('indice'):
+        generate_index_page(resumos, manifest, templates, args.search_index)
+    if args.search_index:
+        with metrics.fase('indice_busca'):
+            generate_search_index(resumos, termos_por_aplicacao, manifest)
+    
+    # Remover saídas de payloads/aplicações que não existem mais
+    with metrics.fase('limpeza'):
+        manifest.prune()
+        manifest.save()
+        if args.delta:
+            save_delta_state(metadados, impressao)
+        
+        cache = get_spec_cache(cache_file)
+        if cache:
+            cache.purge()
     
     # Atualizar navegação do mkdocs
     print("\nAtualizando mkdocs.yml...\n")
-    update_mkdocs_nav()
+    with metrics.fase('nav'):
+        update_mkdocs_nav({sigla: manifest.pages(sigla) for sigla in resumos}, args.mkdocs_file)
+    
+    if args.dedup:
+        links, unicos = manifest.dedup_stats()
+        print(f"\n✓ Deduplicação: {links} arquivos de spec apontam para {unicos} conteúdos únicos")
+        if manifest.stats.get('copias'):
+            print(f"⚠ {manifest.stats['copias']} specs copiadas: o sistema de arquivos "
+                  f"não suporta {args.dedup}")
+    
+    print(f"\nArquivos escritos: {manifest.stats['escritos']}  "
+          f"inalterados: {manifest.stats['inalterados']}  "
+          f"removidos: {manifest.stats['removidos']}")
+    return True
+
+def watch_catalog(args, source, templates):
+    """Modo --watch: verifica alterações periodicamente e atualiza só o necessário
+
+    A cada intervalo consulta a impressão digital do catálogo; quando ela
+    muda (ou a cada --reconcile-interval segundos) roda uma geração --delta,
+    que reescreve apenas as páginas e specs afetadas. Os templates são
+    relidos a cada geração: uma alteração em --templates-dir regenera tudo
+    na reconciliação seguinte. O `mkdocs serve` do container detecta os
+    arquivos alterados sem precisar de restart.
+    """
+    args.delta = True
+    print(f"👀 Modo watch: verificando alterações a cada {args.interval}s (Ctrl+C para sair)\n")
+    
+    anterior = None
+    ultima_geracao = None
+    try:
+        while True:
+            atual = get_catalog_fingerprint(source)
+            agora = time.monotonic()
+            vencido = ultima_geracao is None or agora - ultima_geracao >= args.reconcile_interval
+            if atual is not None and (atual != anterior or vencido):
+                print(f"[{datetime.now().strftime('%H:%M:%S')}] Verificando catálogo...")
+                templates = load_templates(args.templates_dir, avisar=False)
+                if generate_catalog(args, source, templates):
+                    anterior = atual
+                    ultima_geracao = agora
+                print()
+            time.sleep(args.interval)
+    except KeyboardInterrupt:
+        print("\n✓ Modo watch encerrado")
+    finally:
+        source.close()
+
+def main(argv=None):
+    """Função principal"""
+    args = parse_args(argv)
+    
+    print("\n" + "="*60)
+    print("Gerador de Catálogo de APIs - Sistema de Auditoria")
+    print("="*60 + "\n")
+    
+    # Criar diretórios
+    if args.output_dir:
+        set_output_dir(args.output_dir)
+    ensure_directories()
+    templates = load_templates(args.templates_dir)
+    if args.sqlite:
+        source = SQLiteSource(args.sqlite)
+    else:
+        source = MySQLSource(pool_size=2 if args.watch else 0)
+    
+    if args.watch:
+        watch_catalog(args, source, templates)
+        return
+    
+    if not generate_catalog(args, source, templates):
+        return
     
     print("\n" + "="*60)
     print("✅ Catálogo de APIs gerado com sucesso!")
@@ -12492,6 +12492,203 @@ async function startServer() {
     }
   });
 
+  // Projeto pelo ID ou pelo nome do projeto no Azure DevOps (final de url_projeto),
+  // usado pelos endpoints chamados pelo sync-azure.py
+  const buscarProjetoSync = async (projetoId, projetoNome) => {
+    const [projetos] = projetoId
+      ? await pool.execute(
+          `SELECT id, projeto, nome_time as nomeTime FROM estruturas_projeto WHERE id = ?`,
+          [projetoId]
+        )
+      : await pool.execute(
+          `SELECT id, projeto, nome_time as nomeTime FROM estruturas_projeto
+          WHERE projeto = ? OR url_projeto LIKE ? OR url_projeto LIKE ?
+          ORDER BY projeto = ? DESC
+          LIMIT 1`,
+          [projetoNome, `%/${projetoNome}`, `%/${encodeURIComponent(projetoNome)}`, projetoNome]
+        );
+    return projetos[0] || null;
+  };
+
+  // POST /api/azure-work-items/bulk - Upsert em lote de work items já buscados no Azure DevOps
+  // Usado pelo sync-azure.py: corpo { projetoId | projetoNome, items: [{ id, url, fields }] }.
+  // O lote roda em uma única transação, com um SAVEPOINT por item para que um item
+  // inválido não descarte os demais; a resposta traz o resultado de cada item.
+  // Itens já existentes só têm atualizadas as colunas cujos campos vieram em `fields`.
+  app.post('/api/azure-work-items/bulk', async (req, res) => {
+    const startTime = Date.now();
+    const requestInfo = extractRequestInfo(req);
+    const BULK_MAX_ITEMS = 1000;
+    let connection;
+    
+    try {
+      const { projetoId, projetoNome, items } = req.body || {};
+      
+      if (!Array.isArray(items) || items.length === 0) {
+        return res.status(400).json({ error: 'Informe os work items em "items"' });
+      }
+      
+      if (items.length > BULK_MAX_ITEMS) {
+        return res.status(400).json({ error: `Máximo de ${BULK_MAX_ITEMS} work items por lote` });
+      }
+      
+      if (!projetoId && !projetoNome) {
+        return res.status(400).json({ error: 'Informe projetoId ou projetoNome' });
+      }
+      
+      const projeto = await buscarProjetoSync(projetoId, projetoNome);
+      
+      if (!projeto) {
+        return res.status(404).json({ error: 'Projeto não encontrado' });
+      }
+      
+      // Função auxiliar para converter data ISO para formato MySQL
+      const formatDateForMySQL = (isoDate) => {
+        if (!isoDate) return null;
+        const date = new Date(isoDate);
+        return date.toISOString().slice(0, 19).replace('T', ' ');
+      };
+      
+      // Coluna -> [campo do Azure DevOps, conversão]; as mesmas regras de /sync/:projetoId
+      const colunas = {
+        title: ['System.Title', (v) => v],
+        state: ['System.State', (v) => v],
+        assigned_to: ['System.AssignedTo', (v) => v?.displayName || null],
+        activity: ['Microsoft.VSTS.Common.Activity', (v) => v || null],
+        area_path: ['System.AreaPath', (v) => v || null],
+        iteration_path: ['System.IterationPath', (v) => v || null],
+        changed_date: ['System.ChangedDate', formatDateForMySQL],
+        closed_date: ['System.ClosedDate', formatDateForMySQL],
+        priority: ['Microsoft.VSTS.Common.Priority', (v) => v || null],
+        effort: ['Microsoft.VSTS.Scheduling.Effort', (v) => v || null],
+        remaining_work: ['Microsoft.VSTS.Scheduling.RemainingWork', (v) => v || null],
+        completed_work: ['Microsoft.VSTS.Scheduling.CompletedWork', (v) => v || null],
+        story_points: ['Microsoft.VSTS.Scheduling.StoryPoints', (v) => v || null]
+      };
+      
+      const ids = items.map((wi) => Number(wi?.id)).filter(Number.isInteger);
+      
+      connection = await pool.getConnection();
+      await connection.beginTransaction();
+      
+      const existentes = new Map();
+      if (ids.length > 0) {
+        const [rows] = await connection.query(
+          'SELECT id, work_item_id as workItemId FROM azure_work_items WHERE projeto_id = ? AND work_item_id IN (?)',
+          [projeto.id, ids]
+        );
+        for (const row of rows) {
+          existentes.set(Number(row.workItemId), row.id);
+        }
+      }
+      
+      const results = [];
+      let novos = 0;
+      let atualizados = 0;
+      
+      for (const wi of items) {
+        const workItemId = Number(wi?.id);
+        const fields = wi?.fields;
+        
+        if (!Number.isInteger(workItemId) || !fields || typeof fields !== 'object') {
+          results.push({ id: wi?.id ?? null, success: false, error: 'Work item sem id ou fields' });
+          continue;
+        }
+        
+        const valor = (coluna) => colunas[coluna][1](fields[colunas[coluna][0]]) ?? null;
+        
+        try {
+          await connection.query('SAVEPOINT bulk_item');
+          const existingId = existentes.get(workItemId);
+          
+          if (!existingId) {
+            const novoId = uuidv4();
+            await connection.execute(
+              `INSERT INTO azure_work_items
+              (id, projeto_id, projeto_nome, time_nome, work_item_id, work_item_type,
+               title, state, assigned_to, activity, area_path, iteration_path,
+               created_date, changed_date, closed_date, priority, effort,
+               remaining_work, completed_work, story_points, url, sync_date)
+              VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, NOW())`,
+              [
+                novoId, projeto.id, projeto.projeto, projeto.nomeTime || '',
+                workItemId, fields['System.WorkItemType'] ?? null,
+                valor('title'), valor('state'), valor('assigned_to'), valor('activity'),
+                valor('area_path'), valor('iteration_path'),
+                formatDateForMySQL(fields['System.CreatedDate']),
+                valor('changed_date'), valor('closed_date'), valor('priority'),
+                valor('effort'), valor('remaining_work'), valor('completed_work'),
+                valor('story_points'),
+                wi.url || null
+              ]
+            );
+            existentes.set(workItemId, novoId);
+            novos++;
+            results.push({ id: workItemId, success: true, acao: 'inserido' });
+          } else {
+            const presentes = Object.keys(colunas).filter((coluna) => colunas[coluna][0] in fields);
+            
+            await connection.execute(
+              `UPDATE azure_work_items
+              SET ${[...presentes.map((coluna) => `${coluna} = ?`), 'sync_date = NOW()', 'updated_at = NOW()'].join(', ')}
+              WHERE id = ?`,
+              [...presentes.map(valor), existingId]
+            );
+            atualizados++;
+            results.push({ id: workItemId, success: true, acao: 'atualizado' });
+          }
+          
+          await connection.query('RELEASE SAVEPOINT bulk_item');
+        } catch (itemError) {
+          await connection.query('ROLLBACK TO SAVEPOINT bulk_item');
+          results.push({ id: workItemId, success: false, error: itemError.message });
+        }
+      }
+      
+      await connection.commit();
+      
+      const falhas = results.filter((r) => !r.success).length;
+      const durationMs = Date.now() - startTime;
+      await logAuditoria(pool, {
+        operationType: 'SYNC',
+        entityType: 'azure_work_items',
+        entityId: projeto.id,
+        statusCode: 200,
+        durationMs,
+        newValues: JSON.stringify({ total: items.length, novos, atualizados, falhas }),
+        ...requestInfo
+      });
+      
+      res.json({
+        success: falhas === 0,
+        stats: { total: items.length, novos, atualizados, falhas },
+        results
+      });
+    } catch (error) {
+      if (connection) {
+        await connection.rollback();
+      }
+      
+      const durationMs = Date.now() - startTime;
+      console.error('Erro ao gravar lote de work items:', error);
+      
+      await logAuditoria(pool, {
+        operationType: 'SYNC',
+        entityType: 'azure_work_items',
+        statusCode: 500,
+        durationMs,
+        errorMessage: error.message,
+        ...requestInfo
+      });
+      
+      res.status(500).json({ error: 'Erro ao gravar lote de work items: ' + error.message });
+    } finally {
+      if (connection) {
+        connection.release();
+      }
+    }
+  });
+
   // GET /api/azure-work-items/sync-logs - Buscar logs de sincronização
   app.get('/api/azure-work-items/sync-logs', async (req, res) => {
     const startTime = Date.now();
@@ -12548,6 +12745,81 @@ async function startServer() {
     }
   });
 
+  // POST /api/azure-work-items/sync-logs - Registrar uma sincronização feita pelo sync-azure.py
+  app.post('/api/azure-work-items/sync-logs', async (req, res) => {
+    const startTime = Date.now();
+    const requestInfo = extractRequestInfo(req);
+    
+    try {
+      const {
+        projetoId, projetoNome, inicioSync, fimSync, status,
+        totalWorkItems, novosWorkItems, atualizadosWorkItems, erroMensagem
+      } = req.body || {};
+      
+      if (!projetoId && !projetoNome) {
+        return res.status(400).json({ error: 'Informe projetoId ou projetoNome' });
+      }
+      
+      if (!['sucesso', 'erro'].includes(status)) {
+        return res.status(400).json({ error: 'status deve ser "sucesso" ou "erro"' });
+      }
+      
+      const projeto = await buscarProjetoSync(projetoId, projetoNome);
+      
+      if (!projeto) {
+        return res.status(404).json({ error: 'Projeto não encontrado' });
+      }
+      
+      // Função auxiliar para converter data ISO para formato MySQL
+      const formatDateForMySQL = (isoDate) => {
+        if (!isoDate) return null;
+        const date = new Date(isoDate);
+        return date.toISOString().slice(0, 19).replace('T', ' ');
+      };
+      
+      const syncLogId = uuidv4();
+      await pool.execute(
+        `INSERT INTO azure_sync_log 
+        (id, projeto_id, projeto_nome, inicio_sync, fim_sync, status,
+         total_work_items, novos_work_items, atualizados_work_items, erro_mensagem)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)`,
+        [
+          syncLogId, projeto.id, projeto.projeto,
+          formatDateForMySQL(inicioSync) || formatDateForMySQL(new Date().toISOString()),
+          formatDateForMySQL(fimSync), status,
+          totalWorkItems || 0, novosWorkItems || 0, atualizadosWorkItems || 0,
+          erroMensagem || null
+        ]
+      );
+      
+      const durationMs = Date.now() - startTime;
+      await logAuditoria(pool, {
+        operationType: 'CREATE',
+        entityType: 'azure_sync_log',
+        entityId: syncLogId,
+        statusCode: 201,
+        durationMs,
+        ...requestInfo
+      });
+      
+      res.status(201).json({ success: true, id: syncLogId });
+    } catch (error) {
+      const durationMs = Date.now() - startTime;
+      console.error('Erro ao registrar log de sincronização:', error);
+      
+      await logAuditoria(pool, {
+        operationType: 'CREATE',
+        entityType: 'azure_sync_log',
+        statusCode: 500,
+        durationMs,
+        errorMessage: error.message,
+        ...requestInfo
+      });
+      
+      res.status(500).json({ error: 'Erro ao registrar log: ' + error.message });
+    }
+  });
+
   // POST /api/azure-work-items/sync-all - Sincronizar todos os projetos
   app.post('/api/azure-work-items/sync-all', async (req, res) => {
     const startTime = Date.now();
@@ -0,0 +1,115 @@
+"""Testes de scripts/generate-api-catalog.py"""
+
+import importlib.util
+import os
+from pathlib import Path
+
+import pytest
+
+SCRIPT = Path(__file__).parent.parent / 'scripts' / 'generate-api-catalog.py'
+
+
+def load_catalog():
+    spec = importlib.util.spec_from_file_location('generate_api_catalog', SCRIPT)
+    modulo = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(modulo)
+    return modulo
+
+
+catalog = load_catalog()
+
+
+@pytest.fixture
+def saida(tmp_path, monkeypatch):
+    """Catálogo gerado em tmp_path (os diretórios são globais do módulo)"""
+    for nome in ('DOCS_DIR', 'OPENAPI_DIR', 'SEARCH_DIR', 'MANIFEST_FILE', 'STATE_FILE'):
+        monkeypatch.setattr(catalog, nome, getattr(catalog, nome))
+    catalog.set_output_dir(tmp_path / 'api-catalog')
+    catalog.OPENAPI_DIR.mkdir(parents=True)
+    return catalog.DOCS_DIR
+
+
+def test_write_substitui_link_sem_alterar_o_blob(saida):
+    blob = catalog.OPENAPI_DIR / catalog.SPEC_BLOBS_DIR / 'abc.json'
+    blob.parent.mkdir()
+    blob.write_text('{"versao": 1}', encoding='utf-8')
+    primeira = catalog.OPENAPI_DIR / 'APP_A.json'
+    segunda = catalog.OPENAPI_DIR / 'APP_B.json'
+    os.link(blob, primeira)
+    os.link(blob, segunda)
+
+    # Sem manifesto, write não sabe que primeira é um link para o blob
+    assert catalog.CatalogManifest().write(primeira, '{"versao": 2}')
+
+    assert primeira.read_text(encoding='utf-8') == '{"versao": 2}'
+    assert blob.read_text(encoding='utf-8') == '{"versao": 1}'
+    assert segunda.read_text(encoding='utf-8') == '{"versao": 1}'
+    assert not list(catalog.OPENAPI_DIR.glob('.*.tmp'))
+
+
+def payload(aplicacao, sigla, formato, conteudo):
+    return {
+        'aplicacao_sigla': aplicacao, 'aplicacao_descricao': 'Aplicação de teste',
+        'criticidade_negocio': 'Alta', 'payload_sigla': sigla, 'descricao_curta': 'API de teste',
+        'descricao_longa': None, 'versao_openapi': '3.0.0', 'data_inicio': '01/01/2026',
+        'data_termino': None, 'fase_ciclo_vida': 'Produção',
+        'formato_arquivo': formato, 'conteudo_arquivo': conteudo,
+    }
+
+
+SPEC_YAML_NUMERICA = """\
+openapi: 3.0.0
+info: {title: Numérica, version: '1'}
+paths:
+  /contas:
+    get:
+      operationId: 123
+      summary: 2.0
+      tags: [7]
+"""
+
+
+def test_operation_id_e_summary_numericos(tmp_path):
+    cache = tmp_path / 'specs.sqlite'
+
+    for _ in range(2):  # a segunda renderização vem do cache de specs
+        pagina = catalog.render_aplicacao_page(
+            'APP', [payload('APP', 'NUM', 'yaml', SPEC_YAML_NUMERICA)], cache_file=str(cache))
+
+        assert not pagina['erros']
+        assert catalog.json.loads(pagina['busca'])['operacoes'] == [
+            ['NUM', 'GET', '/contas', '123', '2.0', ['7'], 'openapi/APP_NUM.yaml']]
+        assert {'123', 'contas'} <= set(pagina['termos'])
+
+
+@pytest.mark.parametrize('spec', [
+    'openapi: 3.0.0\npaths: [/a]\ncomponents: null\n',
+    'openapi: 3.0.0\npaths: {/a: {get: {tags: x}}}\ncomponents: {schemas: [1]}\ntags: 1\nservers: {url: x}\n',
+    '{"openapi": "3.0.0", "paths": {"/a": {"200": {}}}, "components": ["schemas"]}',
+])
+def test_spec_com_secoes_de_tipo_inesperado_e_gravada(spec):
+    formato = 'json' if spec.startswith('{') else 'yaml'
+
+    pagina = catalog.render_aplicacao_page('APP', [payload('APP', 'ODD', formato, spec)])
+
+    assert not pagina['erros']
+    assert [nome for nome, _ in pagina['specs']] == [f'APP_ODD.{formato}']
+
+
+def test_variantes_de_specs_json_e_yaml_com_a_mesma_sigla(saida):
+    spec = {'openapi': '3.0.0', 'info': {'title': 'x' * 2048, 'version': '1'}, 'paths': {}}
+    payloads = [
+        payload('APP', 'P', 'json', catalog.json.dumps(dict(spec, info={**spec['info'], 'version': 'json'}))),
+        payload('APP', 'P', 'yaml', catalog.yaml.safe_dump(dict(spec, info={**spec['info'], 'version': 'yaml'}))),
+    ]
+    manifest = catalog.CatalogManifest()
+
+    pagina = catalog.render_aplicacao_page('APP', payloads)
+    catalog.write_aplicacao_page(pagina, manifest, busca=False, precompress=True)
+
+    for formato in ('json', 'yaml'):
+        minificado = catalog.OPENAPI_DIR / f'APP_P.{formato}.min.json'
+        assert catalog.json.loads(minificado.read_text(encoding='utf-8'))['info']['version'] == formato
+        gz = catalog.gzip.decompress((catalog.OPENAPI_DIR / f'APP_P.{formato}.min.json.gz').read_bytes())
+        assert gz == minificado.read_bytes()
+    assert not (catalog.OPENAPI_DIR / 'APP_P.min.json').exists()
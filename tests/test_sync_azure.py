@@ -0,0 +1,350 @@
+"""Testes de data-templates/azure-devops-templates/sync-azure.py contra um Azure DevOps simulado
+
+O servidor simulado (http.server) imita os endpoints usados pelo script:
+WIQL, workitemsbatch e, da API local, /azure-work-items/bulk e sync-logs.
+"""
+
+import importlib.util
+import json
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from urllib.parse import parse_qs, urlparse
+
+import pytest
+
+SCRIPT = Path(__file__).parent.parent / 'data-templates' / 'azure-devops-templates' / 'sync-azure.py'
+
+
+def load_sync_azure():
+    spec = importlib.util.spec_from_file_location('sync_azure', SCRIPT)
+    modulo = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(modulo)
+    return modulo
+
+
+sync_azure = load_sync_azure()
+
+
+class AzureStub:
+    """Estado do servidor simulado: work items, respostas forçadas e requisições recebidas"""
+
+    def __init__(self, total):
+        self.items = {
+            i: {'id': i, 'rev': 1, 'fields': {
+                'System.Title': f'Story {i}',
+                'System.State': 'New',
+                'System.WorkItemType': 'User Story',
+                'System.ChangedDate': '2026-01-01T00:00:00Z',
+            }} for i in range(1, total + 1)
+        }
+        self.requisicoes = []
+        # caminho -> [(status, cabeçalhos)] devolvidos antes da resposta normal
+        self.falhas = {}
+        self.rejeitar_ids = set()
+        self.lock = threading.Lock()
+
+    def alterar(self, id_, **campos):
+        """Nova revisão do work item, alterada depois de qualquer marca d'água"""
+        item = self.items[id_]
+        item['rev'] += 1
+        item['fields'].update(campos, **{'System.ChangedDate': '2999-01-01T00:00:00Z'})
+
+    def chamadas(self, sufixo):
+        return [r for r in self.requisicoes if r['path'].endswith(sufixo)]
+
+
+class Handler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, *args):
+        pass
+
+    def responder(self, status, corpo, headers=None):
+        dados = json.dumps(corpo).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(dados)))
+        for nome, valor in (headers or {}).items():
+            self.send_header(nome, valor)
+        self.end_headers()
+        self.wfile.write(dados)
+
+    def do_POST(self):
+        stub = self.server.stub
+        url = urlparse(self.path)
+        tamanho = int(self.headers.get('Content-Length') or 0)
+        corpo = json.loads(self.rfile.read(tamanho) or b'{}')
+        with stub.lock:
+            stub.requisicoes.append({'path': url.path, 'query': parse_qs(url.query), 'body': corpo,
+                                     'headers': dict(self.headers), 'hora': time.monotonic()})
+            falhas = stub.falhas.get(url.path.rsplit('/', 1)[-1])
+            falha = falhas.pop(0) if falhas else None
+        if falha:
+            return self.responder(falha[0], {'message': 'simulado'}, falha[1])
+
+        if url.path.endswith('/_apis/wit/wiql'):
+            ids = sorted(stub.items)
+            consulta = corpo['query']
+            depois = re.search(r'\[System.Id\] > (\d+)', consulta)
+            if depois:
+                ids = [i for i in ids if i > int(depois.group(1))]
+            alterados = re.search(r"\[System.ChangedDate\] > '([^']+)'", consulta)
+            if alterados:
+                ids = [i for i in ids if stub.items[i]['fields']['System.ChangedDate'] > alterados.group(1)]
+            top = parse_qs(url.query).get('$top')
+            if top:
+                ids = ids[:int(top[0])]
+            return self.responder(200, {'workItems': [{'id': i} for i in ids]})
+
+        if url.path.endswith('/_apis/wit/workitemsbatch'):
+            if len(corpo['ids']) > 200:
+                return self.responder(400, {'message': 'VS403474: mais de 200 ids'})
+            valor = []
+            for i in corpo['ids']:
+                item = stub.items[i]
+                if corpo.get('fields'):
+                    item = dict(item, fields={k: v for k, v in item['fields'].items() if k in corpo['fields']})
+                valor.append(item)
+            return self.responder(200, {'count': len(valor), 'value': valor})
+
+        if url.path == '/api/azure-work-items/bulk':
+            resultados = [
+                {'id': item['id'], 'success': False, 'error': 'rejeitado'} if item['id'] in stub.rejeitar_ids
+                else {'id': item['id'], 'success': True, 'acao': 'inserido'}
+                for item in corpo['items']
+            ]
+            return self.responder(200, {'success': True, 'results': resultados})
+
+        if url.path == '/api/azure-work-items/sync-logs':
+            return self.responder(201, {'success': True, 'id': 'log-1'})
+
+        self.responder(404, {'message': 'não encontrado'})
+
+
+@pytest.fixture
+def azure_stub(monkeypatch):
+    servidor = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+    servidor.daemon_threads = True
+    servidor.stub = AzureStub(total=450)
+    thread = threading.Thread(target=servidor.serve_forever, daemon=True)
+    thread.start()
+    base = f"http://127.0.0.1:{servidor.server_address[1]}"
+    monkeypatch.setattr(sync_azure, 'API_BASE_URL', f"{base}/api")
+    servidor.stub.target = {'org_url': f"{base}/org", 'project': 'Portal', 'pat': 'x', 'projeto_id': 'p1'}
+    yield servidor.stub
+    servidor.shutdown()
+    servidor.server_close()
+
+
+def clientes(retries=2):
+    azure = sync_azure.azure_client(4, sync_azure.RateLimiter(), retries, pat='x')
+    local = sync_azure.local_client(4, retries)
+    return azure, local
+
+
+def test_detalhes_buscados_em_lotes_com_campos_selecionados(azure_stub):
+    azure, local = clientes()
+
+    resultado = sync_azure.sync_to_local_api(
+        None, 100, ['System.Title', 'System.State'], azure, local, concurrency=4,
+        bulk_size=200, flush_interval=0.1, target=azure_stub.target)
+
+    lotes = azure_stub.chamadas('/workitemsbatch')
+    assert len(lotes) == 5
+    assert all(len(lote['body']['ids']) <= 100 for lote in lotes)
+    assert sorted(i for lote in lotes for i in lote['body']['ids']) == list(range(1, 451))
+    assert all(lote['body']['fields'] == ['System.Title', 'System.State'] for lote in lotes)
+    assert not azure_stub.chamadas('/_apis/wit/workitems')
+    assert resultado['consultados'] == 450
+    assert resultado['sincronizados'] == 450
+    assert resultado['erros'] == 0
+    enviados = [item for envio in azure_stub.chamadas('/bulk') for item in envio['body']['items']]
+    assert set(enviados[0]['fields']) == {'System.Title', 'System.State'}
+
+
+def test_lote_limitado_a_200_ids(azure_stub):
+    azure, local = clientes()
+
+    resultado = sync_azure.sync_to_local_api(
+        None, 500, None, azure, local, concurrency=2, target=azure_stub.target)
+
+    assert max(len(lote['body']['ids']) for lote in azure_stub.chamadas('/workitemsbatch')) == 200
+    assert resultado['sincronizados'] == 450
+
+
+def test_429_respeita_retry_after(azure_stub):
+    azure_stub.falhas['workitemsbatch'] = [(429, {'Retry-After': '0.5'})]
+    azure, _ = clientes()
+
+    detalhes = sync_azure.get_work_items_batch([1, 2, 3], None, azure, azure_stub.target)
+
+    assert sorted(detalhes) == [1, 2, 3]
+    tentativas = azure_stub.chamadas('/workitemsbatch')
+    assert len(tentativas) == 2
+    assert tentativas[1]['hora'] - tentativas[0]['hora'] >= 0.45
+
+
+def test_429_pausa_todas_as_threads_do_limitador(azure_stub):
+    limitador = sync_azure.RateLimiter()
+    azure = sync_azure.azure_client(4, limitador, 2, pat='x')
+    azure_stub.falhas['workitemsbatch'] = [(429, {'Retry-After': '0.5'})]
+
+    primeira = threading.Thread(target=sync_azure.get_work_items_batch,
+                                args=([1], None, azure, azure_stub.target))
+    primeira.start()
+    while not azure_stub.chamadas('/workitemsbatch'):
+        time.sleep(0.01)
+    time.sleep(0.05)
+    sync_azure.get_work_items_batch([2], None, azure, azure_stub.target)
+    primeira.join()
+
+    inicio = azure_stub.chamadas('/workitemsbatch')[0]['hora']
+    assert all(chamada['hora'] - inicio >= 0.45 for chamada in azure_stub.chamadas('/workitemsbatch')[1:])
+
+
+def test_retry_after_em_data_http():
+    class Resposta:
+        headers = {'Retry-After': 'Wed, 21 Oct 2015 07:28:00 GMT'}
+
+    assert sync_azure.retry_wait(Resposta(), 0) == 0.0
+    Resposta.headers = {'Retry-After': '7'}
+    assert sync_azure.retry_wait(Resposta(), 0) == 7.0
+
+
+def test_429_esgota_tentativas(azure_stub):
+    azure_stub.falhas['workitemsbatch'] = [(429, {'Retry-After': '0'})] * 3
+    azure, _ = clientes(retries=2)
+
+    with pytest.raises(sync_azure.requests.exceptions.HTTPError):
+        sync_azure.get_work_items_batch([1], None, azure, azure_stub.target)
+    assert len(azure_stub.chamadas('/workitemsbatch')) == 3
+
+
+def executar_projeto(azure_stub, tmp_path, *opcoes):
+    args = sync_azure.parse_args([
+        '--incremental', '--state-file', str(tmp_path / 'estado.json'),
+        '--state-db', str(tmp_path / 'estado.db'), '--retries', '1', '--flush-interval', '0.1',
+        *opcoes])
+    azure, local = clientes(retries=1)
+    return sync_azure.sync_project(azure_stub.target, args, azure, local, [])
+
+
+def test_marca_dagua_limita_a_proxima_execucao(azure_stub, tmp_path):
+    primeira = executar_projeto(azure_stub, tmp_path)
+
+    estado = json.loads((tmp_path / 'estado.json').read_text(encoding='utf-8'))
+    projeto = estado[sync_azure.project_key(azure_stub.target)]
+    assert projeto['watermark'] == projeto['ultima_completa']
+    assert primeira['sincronizados'] == 450
+    consulta = azure_stub.chamadas('/wiql')[0]
+    assert 'ChangedDate' not in consulta['body']['query']
+
+    for i in (7, 300):
+        azure_stub.alterar(i, **{'System.State': 'Active'})
+    azure_stub.requisicoes.clear()
+    segunda = executar_projeto(azure_stub, tmp_path)
+
+    consulta = azure_stub.chamadas('/wiql')[0]
+    desde = sync_azure.incremental_since(projeto)
+    assert f"[System.ChangedDate] > '{desde}'" in consulta['body']['query']
+    assert consulta['query']['timePrecision'] == ['true']
+    assert segunda['consultados'] == 2
+    assert segunda['sincronizados'] == 2
+    assert sorted(i for lote in azure_stub.chamadas('/workitemsbatch') for i in lote['body']['ids']) == [7, 300]
+
+
+def test_marca_dagua_mantida_quando_ha_erros(azure_stub, tmp_path):
+    executar_projeto(azure_stub, tmp_path)
+    arquivo = tmp_path / 'estado.json'
+    anterior = json.loads(arquivo.read_text(encoding='utf-8'))
+
+    azure_stub.alterar(9, **{'System.State': 'Active'})
+    azure_stub.rejeitar_ids.add(9)
+    time.sleep(1)
+    resultado = executar_projeto(azure_stub, tmp_path)
+
+    assert resultado['erros'] == 1
+    assert json.loads(arquivo.read_text(encoding='utf-8')) == anterior
+
+
+def test_incremental_since_aplica_margem_e_reconciliacao():
+    agora = sync_azure.datetime.now(sync_azure.timezone.utc)
+    recente = (agora - sync_azure.timedelta(hours=1)).strftime(sync_azure.WATERMARK_FORMAT)
+    antiga = (agora - sync_azure.timedelta(hours=30)).strftime(sync_azure.WATERMARK_FORMAT)
+
+    assert sync_azure.incremental_since({}) is None
+    assert sync_azure.incremental_since({'watermark': recente, 'ultima_completa': antiga}, 24) is None
+    desde = sync_azure.incremental_since({'watermark': recente, 'ultima_completa': recente}, 24, 300)
+    esperado = (sync_azure.datetime.strptime(recente, sync_azure.WATERMARK_FORMAT)
+                - sync_azure.timedelta(seconds=300)).strftime(sync_azure.WATERMARK_FORMAT)
+    assert desde == esperado
+
+
+@pytest.fixture(scope='module')
+def spans_em_memoria():
+    pytest.importorskip('opentelemetry.sdk')
+    from opentelemetry import trace
+    from opentelemetry.sdk.trace import TracerProvider
+    from opentelemetry.sdk.trace.export import SimpleSpanProcessor
+    from opentelemetry.sdk.trace.export.in_memory_span_exporter import InMemorySpanExporter
+
+    exporter = InMemorySpanExporter()
+    provider = TracerProvider()
+    provider.add_span_processor(SimpleSpanProcessor(exporter))
+    # O provedor global só pode ser definido uma vez por processo
+    trace.set_tracer_provider(provider)
+    yield exporter
+    provider.shutdown()
+
+
+def histograma(texto, operacao):
+    """{le: quantidade} e _count de azure_sync_request_duration_seconds para uma operação"""
+    baldes, total = {}, None
+    for linha in texto.splitlines():
+        if f'operacao="{operacao}"' not in linha:
+            continue
+        nome, valor = linha.rsplit(' ', 1)
+        if nome.startswith('azure_sync_request_duration_seconds_bucket'):
+            baldes[re.search(r'le="([^"]+)"', nome).group(1)] = int(valor)
+        elif nome.startswith('azure_sync_request_duration_seconds_count'):
+            total = int(valor)
+    return baldes, total
+
+
+def test_spans_e_metricas_de_uma_execucao(azure_stub, tmp_path, spans_em_memoria):
+    spans_em_memoria.clear()
+    metricas = tmp_path / 'sync.prom'
+
+    resultado = executar_projeto(azure_stub, tmp_path, '--batch-size', '100', '--bulk-size', '200',
+                                 '--metrics-file', str(metricas))
+
+    spans = spans_em_memoria.get_finished_spans()
+    projeto = [span for span in spans if span.name == 'azure_sync.project']
+    assert len(projeto) == 1
+    assert projeto[0].attributes['azure.project'] == 'Portal'
+    assert projeto[0].attributes['azure.organization'] == azure_stub.target['org_url']
+    filhos = [span for span in spans if span.name != 'azure_sync.project']
+    assert {span.name for span in filhos} == {'azure_sync.wiql', 'azure_sync.detalhes', 'azure_sync.envio'}
+    assert all(span.parent.span_id == projeto[0].context.span_id for span in filhos)
+    detalhes = [span for span in filhos if span.name == 'azure_sync.detalhes']
+    assert sorted(span.attributes['azure.work_items'] for span in detalhes) == [50, 100, 100, 100, 100]
+    envios = [span for span in filhos if span.name == 'azure_sync.envio']
+    assert sum(span.attributes['azure.work_items'] for span in envios) == resultado['sincronizados'] == 450
+    assert [span.attributes['azure.after_id'] for span in filhos if span.name == 'azure_sync.wiql'][0] == 0
+
+    # O envio leva o traceparent do span do envio para a API local
+    trace_id = format(projeto[0].context.trace_id, '032x')
+    assert all(envio['headers']['traceparent'].split('-')[1] == trace_id
+               for envio in azure_stub.chamadas('/bulk'))
+
+    texto = metricas.read_text(encoding='utf-8')
+    for operacao, sufixo in (('wiql', '/wiql'), ('detalhes', '/workitemsbatch'), ('envio', '/bulk')):
+        baldes, total = histograma(texto, operacao)
+        assert total == len(azure_stub.chamadas(sufixo))
+        assert baldes['+Inf'] == total
+        assert list(baldes.values()) == sorted(baldes.values())
+    assert 'azure_sync_items{projeto="%s",resultado="sincronizados"} 450' % sync_azure.project_key(azure_stub.target) in texto
+    assert 'azure_sync_last_run_success{projeto="%s"} 1' % sync_azure.project_key(azure_stub.target) in texto